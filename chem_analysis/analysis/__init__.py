@@ -1,4 +1,6 @@
 import chem_analysis.analysis.peak_picking as peak_picking
 import chem_analysis.analysis.boundary_detection as boundary_detection
+import chem_analysis.analysis.change_detection as change_detection
 import chem_analysis.analysis.multi_component_analysis as mca
 import chem_analysis.analysis.integrate as integrate
+from chem_analysis.analysis.peaks_array import find_peaks_array, ResultPeaksArray
@@ -1,10 +1,12 @@
 import logging
-from typing import Protocol, Iterator
+import math
+from typing import Protocol, Iterator, Sequence
 from collections import OrderedDict
 
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 
-from chem_analysis.analysis.peak import PeakBounded
+from chem_analysis.analysis.peak import PeakBounded, get_peak_stats_array
 from chem_analysis.analysis.peak_picking.peak_picking import ResultPeakPicking
 from chem_analysis.utils.printing_tables import StatsTable
 
@@ -34,7 +36,12 @@ class ResultPeakBound:
     def __len__(self):
         return len(self.peaks)
 
+    def stats_array(self) -> np.ndarray:
+        """ stats of every peak as a structured numpy array (see `get_peak_stats_array`) """
+        return get_peak_stats_array(self.peaks)
+
     def get_stats(self) -> list[OrderedDict]:
+        get_peak_stats_array(self.peaks)  # calculate stats of all peaks together (cached on each peak)
         dicts_ = []
         for peak in self.peaks:
             dicts_.append(peak.get_stats())
@@ -45,6 +52,153 @@ class ResultPeakBound:
         return StatsTable.from_list_dicts(self.get_stats())
 
 
+def get_window_derivatives(
+        x: np.ndarray,
+        y: np.ndarray,
+        n: int = 2,
+        poly_degree: int = 1,
+        deriv_degree: int = None
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Fits a polynomial to every window of `n` points (all windows at once) and evaluates its derivative.
+
+    Parameters
+    ----------
+    x:
+        x values
+    y:
+        y values
+    n:
+        number of points in window
+    poly_degree:
+        degree of polynomial
+    deriv_degree:
+        order of derivative
+        default: poly_degree
+
+    Returns
+    -------
+    derivative_forward:
+        derivative at x[i] of the fit to window [i, i+n) (nan if window does not fit)
+    derivative_backward:
+        derivative at x[i] of the fit to window [i-n, i) (nan if window does not fit)
+    """
+    if deriv_degree is None:
+        deriv_degree = poly_degree
+    derivative_forward = np.full(len(x), np.nan)
+    derivative_backward = np.full(len(x), np.nan)
+    if n > len(x):
+        return derivative_forward, derivative_backward
+
+    x_windows = sliding_window_view(x, n)
+    y_windows = sliding_window_view(y, n)
+    u = x_windows - x_windows[:, :1]  # x relative to first point of window (better conditioned)
+    if poly_degree == 1:  # least squares line (closed form)
+        u_mean = np.mean(u, axis=1)
+        y_mean = np.mean(y_windows, axis=1)
+        u_centered = u - u_mean[:, np.newaxis]
+        slope = np.sum(u_centered * (y_windows - y_mean[:, np.newaxis]), axis=1) / np.sum(u_centered ** 2, axis=1)
+        coefficients = np.stack((y_mean - slope * u_mean, slope), axis=1)
+    else:
+        vandermonde = u[:, :, np.newaxis] ** np.arange(poly_degree + 1)
+        coefficients = np.einsum("mij,mj->mi", np.linalg.pinv(vandermonde), y_windows)
+
+    derivative_forward[:u.shape[0]] = _polynomial_derivative(coefficients, deriv_degree, 0)
+    derivative_backward[n:] = _polynomial_derivative(coefficients[:-1], deriv_degree, x[n:] - x[:-n])
+    return derivative_forward, derivative_backward
+
+
+def _polynomial_derivative(coefficients: np.ndarray, order: int, u: np.ndarray | float) -> np.ndarray:
+    """ derivative of many polynomials (coefficients: [n_polynomials, degree + 1], lowest power first) """
+    result = np.zeros(coefficients.shape[0])
+    for power in range(order, coefficients.shape[1]):
+        factor = math.factorial(power) / math.factorial(power - order)
+        result += factor * coefficients[:, power] * np.power(u, power - order)
+    return result
+
+
+def _run_length(mask: np.ndarray) -> np.ndarray:
+    """ number of consecutive True values ending at each index """
+    index = np.arange(len(mask))
+    last_false = np.maximum.accumulate(np.where(mask, -1, index))
+    return index - last_false
+
+
+def rolling_ball_bounds(
+        peak_indexes: Sequence[int] | np.ndarray,
+        x: np.ndarray,
+        y: np.ndarray,
+        n: int = 2,
+        poly_degree: int = 1,
+        deriv_degree: int = None,
+        max_derivative: float = 0,
+        n_points_with_pos_slope: int = 1,
+        min_height: float = 0.01,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Rolling ball bounds for many peaks of one signal.
+
+    Walks out from each peak until the slope turns up for `n_points_with_pos_slope` points or the signal drops below
+    `min_height`. Slopes of every window are calculated once for the whole signal (`get_window_derivatives`), and
+    the walks become searches of precomputed trigger points, so the cost scales with the signal length.
+
+    Returns
+    -------
+    lb_index: np.ndarray
+        index of lower bound of each peak
+    ub_index: np.ndarray
+        index of upper bound of each peak
+    """
+    peak_indexes = np.asarray(peak_indexes, dtype=np.intp).reshape(-1)
+    number_points = len(x)
+    k = n_points_with_pos_slope
+    derivative_forward, derivative_backward = get_window_derivatives(x, y, n, poly_degree, deriv_degree)
+    index = np.arange(number_points)
+
+    # lower bound walks backwards: triggers at i if slope is going down at i, i+1, ..., i+k-1 (i > 0)
+    trigger_lower = np.flip(_run_length(np.flip(derivative_forward < max_derivative))) >= k
+    trigger_lower[0] = False
+    last_trigger_lower = np.maximum.accumulate(np.where(trigger_lower, index, -1))
+    # upper bound walks forwards: triggers at i if slope is going up at i-k+1, ..., i
+    trigger_upper = _run_length(derivative_backward > max_derivative) >= k
+    next_trigger_upper = np.flip(np.minimum.accumulate(np.flip(np.where(trigger_upper, index, number_points))))
+
+    lb_indexes = np.empty_like(peak_indexes)
+    ub_indexes = np.empty_like(peak_indexes)
+    for p, peak_index in enumerate(peak_indexes):
+        height = min_height * y[peak_index]
+
+        # lower bound
+        start = peak_index - n
+        if start <= 0:
+            lb_indexes[p] = peak_index
+        else:
+            trigger = last_trigger_lower[start - k + 1] if start - k + 1 >= 1 else -1
+            below = np.flatnonzero(y[max(trigger, 0) + 1:start + 1] < height)  # height checked after slope
+            if below.size:
+                lb_indexes[p] = max(trigger, 0) + 1 + below[-1]
+            elif trigger >= 1:
+                lb_indexes[p] = trigger + k
+            else:
+                lb_indexes[p] = 0
+
+        # upper bound
+        start = peak_index + n
+        if start >= number_points:
+            ub_indexes[p] = peak_index
+        else:
+            trigger = next_trigger_upper[start + k - 1] if start + k - 1 < number_points else number_points
+            below = np.flatnonzero(y[start:trigger] < height)
+            if below.size:
+                ub_indexes[p] = start + below[0]
+            elif trigger < number_points:
+                ub_indexes[p] = trigger + k
+            else:
+                ub_indexes[p] = number_points
+
+    return lb_indexes, ub_indexes
+
+
 def rolling_ball_n_points(
         peak_index: int,
         x: np.ndarray,
@@ -65,58 +219,9 @@ def rolling_ball_n_points(
     ub_index: int
         index of upper bound
     """
-    min_height = min_height * y[peak_index]
-    if deriv_degree is None:
-        deriv_degree = poly_degree
-
-    # lower bound
-    if peak_index - n <= 0:
-        lb_index = peak_index
-    else:
-        points_with_positive_slope = 0
-        for i in range(peak_index-n, 0, -1):
-            coefficients = np.polyfit(x[i:i+n], y[i:i+n], poly_degree)
-            poly = np.polynomial.Polynomial(list(reversed(coefficients)))
-            derivative_value = poly.deriv(deriv_degree)(x[i])
-            if derivative_value < max_derivative:  #flip as walking backwards
-                points_with_positive_slope += 1
-                if points_with_positive_slope >= n_points_with_pos_slope:
-                    lb_index = i + points_with_positive_slope
-                    break
-            else:
-                points_with_positive_slope = 0
-
-            if y[i] < min_height:
-                lb_index = i
-                break
-        else:
-            lb_index = 0
-
-    # upper bound
-    if peak_index + n >= len(x):
-        ub_index = peak_index
-    else:
-        points_with_positive_slope = 0
-        for i in range(peak_index + n, len(x)):
-            coefficients = np.polyfit(x[i-n:i], y[i-n:i], poly_degree)
-            poly = np.polynomial.Polynomial(list(reversed(coefficients)))
-            derivative_value = poly.deriv(deriv_degree)(x[i])
-            if derivative_value > max_derivative:
-                points_with_positive_slope += 1
-                if points_with_positive_slope >= n_points_with_pos_slope:
-                    ub_index = i + points_with_positive_slope
-                    break
-            else:
-                points_with_positive_slope = 0
-
-            if y[i] < min_height:
-                ub_index = i
-                break
-
-        else:
-            ub_index = len(x)
-
-    return lb_index, ub_index
+    lb_index, ub_index = rolling_ball_bounds([peak_index], x, y, n, poly_degree, deriv_degree, max_derivative,
+                                             n_points_with_pos_slope, min_height)
+    return int(lb_index[0]), int(ub_index[0])
 
 
 def rolling_ball(
@@ -146,10 +251,10 @@ def rolling_ball(
         logger.warning("No peaks to do boundary detection for.")
         return result
 
-    for i, index in enumerate(picking_result.indexes):
-        lb_index, ub_index = rolling_ball_n_points(index, result.signal.x, result.signal.y, n, poly_degree,
-                                                   deriv_degree, max_derivative,  n_points_with_pos_slope, min_height)
-
+    lb_indexes, ub_indexes = rolling_ball_bounds(picking_result.indexes, result.signal.x, result.signal.y, n,
+                                                 poly_degree, deriv_degree, max_derivative, n_points_with_pos_slope,
+                                                 min_height)
+    for i, (index, lb_index, ub_index) in enumerate(zip(picking_result.indexes, lb_indexes, ub_indexes)):
         if not check_end_points(result.signal.y, index, lb_index, ub_index):
             # TODO: improve checks
             continue
@@ -157,7 +262,7 @@ def rolling_ball(
         result.peaks.append(
             picking_result.signal._peak_type(
                 parent=picking_result.signal,
-                bounds=slice(lb_index, ub_index),
+                bounds=slice(int(lb_index), int(ub_index)),
                 id_=i
             )
         )
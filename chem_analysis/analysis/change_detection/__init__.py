@@ -0,0 +1 @@
+from chem_analysis.analysis.change_detection.change_detection import CUSUM, ChangeEvent
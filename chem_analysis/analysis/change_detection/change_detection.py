@@ -1,8 +1,20 @@
+import dataclasses
 import enum
+from typing import Iterable, Iterator
 
 import numpy as np
 
-from chembot.utils.buffers.buffer_ring import BufferRing
+
+@dataclasses.dataclass(slots=True)
+class ChangeEvent:
+    """
+    index: sample number (starting at 0) the change was detected at
+    channel: channel that changed (e.g. index of the wavenumber)
+    state: new state
+    """
+    index: int
+    channel: int
+    state: "CUSUM.States"
 
 
 class CUSUM:
@@ -11,6 +23,8 @@ class CUSUM:
     https://www.mathworks.com/help/signal/ref/cusum.html
     https://en.wikipedia.org/wiki/CUSUM
 
+    Mean and standard deviation over the last `n` samples are updated in O(1) per sample (Welford's algorithm with
+    a sliding window), and every channel (e.g. every point of a spectrum) is tracked at once.
 
     """
     class States(enum.Enum):
@@ -18,6 +32,8 @@ class CUSUM:
         down = 1
         up = 2
 
+    min_samples = 4  # samples needed before the sums are updated
+
     def __init__(self, c_limit: float | int = 3, n: int = 31, sigma: int | float = 4):
         """
         Parameters
@@ -30,57 +46,137 @@ class CUSUM:
             Minimum mean shift to detect; is the number of standard deviations from the mean that make a
             shift detectable.
         """
+        if n < 2:
+            raise ValueError(f"'CUSUM.n' must be 2 or greater.\n\tgiven: {n}")
         self.c_limit = c_limit
         self.n = n
         self.sigma = sigma
+        self.reset()
 
-        self._state = self.States.init
-        self._prior_state = self.States.init
-        self._up_sum = 0
-        self._low_sum = 0
-        self._mean = 0
-        self._standard_deviation = 0
-        self._data = None
+    def reset(self):
         self._count = 0
+        self._buffer = None  # last n samples; [n, n_channels]
+        self._mean = None
+        self._m2 = None  # sum of squared differences from the mean
+        self._up_sum = None
+        self._low_sum = None
+        self._state = None
 
     @property
-    def state(self) -> States:
-        return self._state
+    def count(self) -> int:
+        """ number of samples added """
+        return self._count
+
+    @property
+    def mean(self) -> np.ndarray | None:
+        return self._mean
+
+    @property
+    def standard_deviation(self) -> np.ndarray | None:
+        if self._m2 is None:
+            return None
+        return np.sqrt(self._m2 / min(self._count, self.n))
 
-    def _init_data(self, data: np.ndarray) -> None:
-        try:  # try loop used for performance
-            self._data.add_data(data)
-        except AttributeError:
-            self._data = BufferRing(length=self.n)
-            self._data.add_data(data)
+    @property
+    def state(self) -> States | np.ndarray | None:
+        """ state of the channel (single channel) or the value of the state of each channel """
+        if self._state is None:
+            return None
+        if self._state.shape[0] == 1:
+            return self.States(int(self._state[0]))
+        return self._state
 
-        if self._count > 3:
-            self._mean = np.mean(self._data.buffer[:self._count])
-            self._standard_deviation = np.std(self._data.buffer[:self._count])
+    def _init_channels(self, n_channels: int):
+        self._buffer = np.empty((self.n, n_channels))
+        self._mean = np.zeros(n_channels)
+        self._m2 = np.zeros(n_channels)
+        self._up_sum = np.zeros(n_channels)
+        self._low_sum = np.zeros(n_channels)
+        self._state = np.full(n_channels, self.States.init.value, dtype=np.int8)
 
-            self._up_sum = np.max((0, self._up_sum + data - self._mean - 1/2*self.sigma*self._standard_deviation))
-            self._low_sum = np.min((0, self._low_sum + data - self._mean + 1/2*self.sigma*self._standard_deviation))
+    def update(self, data: float | np.ndarray) -> np.ndarray:
+        """
+        Add one sample for every channel.
 
+        Parameters
+        ----------
+        data:
+            shape: [n_channels] or scalar
+
+        Returns
+        -------
+        changed:
+            shape: [n_channels]
+            True where the state of the channel changed
+        """
+        data = np.asarray(data, dtype=np.float64).reshape(-1)
+        if self._buffer is None:
+            self._init_channels(data.shape[0])
+        elif data.shape[0] != self._buffer.shape[1]:
+            raise ValueError(f"Number of channels changed.\n\tExpected: {self._buffer.shape[1]}"
+                             f"\n\tGiven: {data.shape[0]}")
+
+        index = self._count % self.n
+        if self._count < self.n:  # window filling up
+            delta = data - self._mean
+            self._mean += delta / (self._count + 1)
+            self._m2 += delta * (data - self._mean)
+        else:  # replace oldest sample
+            old = self._buffer[index]
+            mean = self._mean + (data - old) / self.n
+            self._m2 += (data - old) * (data - mean + old - self._mean)
+            np.maximum(self._m2, 0, out=self._m2)  # round off
+            self._mean = mean
+        self._buffer[index] = data
         self._count += 1
 
-    def add_data(self, data: np.ndarray) -> States | None:
-        if self._count < self.n:
-            self._init_data(data)
-            return
+        if self._count <= self.min_samples:
+            return np.zeros(data.shape[0], dtype=bool)
+
+        standard_deviation = self.standard_deviation
+        shift = 1/2 * self.sigma * standard_deviation
+        self._up_sum = np.maximum(0, self._up_sum + data - self._mean - shift)
+        self._low_sum = np.minimum(0, self._low_sum + data - self._mean + shift)
+        if self._count <= self.n:
+            return np.zeros(data.shape[0], dtype=bool)
+
+        state = self._state.copy()
+        state[self._up_sum > self.c_limit * standard_deviation] = self.States.up.value
+        state[self._low_sum < -self.c_limit * standard_deviation] = self.States.down.value
+        changed = state != self._state
+        self._state = state
+        return changed
+
+    def add_data(self, data: float | np.ndarray) -> States | np.ndarray | None:
+        """
+        Add one sample.
 
-        self._data.add_data(data)
-        self._mean = np.mean(self._data.buffer)
-        self._standard_deviation = np.std(self._data.buffer)
+        Returns
+        -------
+        single channel: new state if it changed, else None
+        multiple channels: indices of channels whose state changed
+        """
+        changed = self.update(data)
+        if changed.shape[0] == 1:
+            return self.States(int(self._state[0])) if changed[0] else None
+        return np.flatnonzero(changed)
 
-        self._up_sum = np.max((0, self._up_sum + data - self._mean - 1/2*self.sigma*self._standard_deviation))
-        self._low_sum = np.min((0, self._low_sum + data - self._mean + 1/2*self.sigma*self._standard_deviation))
+    def stream(self, data: Iterable[float | np.ndarray]) -> Iterator[ChangeEvent]:
+        """
+        Consume samples (e.g. spectra as they are acquired, or the rows of `SignalArray.data`) and yield
+        change events as they are detected.
 
-        if self._up_sum > self.c_limit*self._standard_deviation:
-            self._state = self.States.up
-        if self._low_sum < - self.c_limit * self._standard_deviation:
-            self._state = self.States.down
+        Parameters
+        ----------
+        data:
+            each item is one sample for every channel
 
-        if self._state != self._prior_state:
-            self._prior_state = self._state
-            return self._state
-        return None  # no event detected
\ No newline at end of file
+        Yields
+        ------
+        event:
+            one per channel that changed state
+        """
+        for row in data:
+            index = self._count
+            for channel in np.flatnonzero(self.update(row)):
+                yield ChangeEvent(index, int(channel), self.States(int(self._state[channel])))
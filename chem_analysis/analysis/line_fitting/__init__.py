@@ -1,4 +1,4 @@
-from chem_analysis.analysis.line_fitting.fitting import peak_deconvolution, peak_deconvolution_with_n_peaks, \
-    peak_deconvolution_auto
+from chem_analysis.analysis.line_fitting.fitting import PeaksMultiple, ResultPeakFitting, ResultPeakFittingArray, \
+    peak_deconvolution, peak_deconvolution_array, peak_deconvolution_with_n_peaks, peak_deconvolution_auto
 from chem_analysis.analysis.line_fitting.peak_models import DistributionNormal, DistributionCauchy, DistributionVoigt, \
     DistributionNormalPeak, DistributionCauchyPeak, DistributionVoigtPeak
@@ -1,3 +1,6 @@
+import copy
+import functools
+import logging
 from typing import Sequence
 from itertools import chain
 
@@ -5,21 +8,58 @@ import numpy as np
 from scipy.optimize import curve_fit
 
 from chem_analysis.analysis.line_fitting.peak_models import PeakModel
+from chem_analysis.base_obj.signal_array import SignalArray
+from chem_analysis.processing.executors import Executor, SerialExecutor
+
+logger = logging.getLogger("chem_analysis.line_fitting")
 
 
 class PeaksMultiple:
+    """
+    Sum of peaks.
+
+    Peaks of the same model are evaluated together (one vectorized call per model), and the jacobian is analytic,
+    so `curve_fit` does not need finite differences.
+    Flat args are the args of each peak in order (same as `get_args`).
+    """
     def __init__(self, peaks: Sequence[PeakModel]):
         self.peaks = peaks
 
-    def __call__(self, x: np.ndarray, *args) -> np.ndarray:
-        self.set_args(args)
+        # indexes into the flat args for each model; shape: [n_peaks_of_model, n_args]
+        self._groups: dict[type, np.ndarray] = {}
+        groups: dict[type, list[np.ndarray]] = {}
+        start = 0
+        for peak in peaks:
+            groups.setdefault(type(peak), []).append(np.arange(start, start + peak.number_args))
+            start += peak.number_args
+        for model, indexes in groups.items():
+            self._groups[model] = np.array(indexes)
+        self.number_args = start
 
-        y = np.zeros_like(x, dtype=x.dtype)
-        for i, peak in enumerate(self.peaks):
-            y += peak(x)
+    def __call__(self, x: np.ndarray, *args) -> np.ndarray:
+        return self.evaluate(x, np.asarray(args, dtype=np.float64))
 
+    def evaluate(self, x: np.ndarray, args: np.ndarray) -> np.ndarray:
+        """ y for flat args (peaks are not changed) """
+        y = np.zeros(x.shape, dtype=np.float64)
+        for model, indexes in self._groups.items():
+            y += np.sum(model.function(x, args[indexes]), axis=0)
         return y
 
+    def jacobian(self, x: np.ndarray, *args) -> np.ndarray:
+        """
+        Returns
+        -------
+        jacobian:
+            shape: [n_x, n_args]
+        """
+        args = np.asarray(args, dtype=np.float64)
+        jacobian = np.empty((x.shape[0], self.number_args), dtype=np.float64)
+        for model, indexes in self._groups.items():
+            jacobian_model = model.jacobian(x, args[indexes])  # [n_peaks, n_args, n_x]
+            jacobian[:, indexes.reshape(-1)] = jacobian_model.reshape(-1, x.shape[0]).T
+        return jacobian
+
     def get_args(self) -> tuple:
         return tuple(chain(*(peak.get_args() for peak in self.peaks)))
 
@@ -35,49 +75,338 @@ class PeaksMultiple:
         if len(args) != 0:
             raise IndexError("not all args used")
 
-    def get_bounds(self) -> list[tuple[float, float]]:
+    def get_arg_names(self) -> tuple[str]:
+        return tuple(chain(*(peak._args for peak in self.peaks)))
+
+    def get_bounds(self) -> tuple[np.ndarray, np.ndarray]:
+        """ (lower bounds, upper bounds) of the flat args (format of `curve_fit`) """
         bounds = []
         for peak in self.peaks:
             bounds += peak.get_bounds()
 
-        return bounds
+        bounds = np.array(bounds, dtype=np.float64).reshape(-1, 2)
+        return bounds[:, 0], bounds[:, 1]
 
 
 class ResultPeakFitting:
     def __init__(self):
         self.multipeak: PeaksMultiple | None = None
         self.covariance = None
+        self.residual: float | None = None  # sum of squared residuals
+        self.number_of_starts: int = 1
+        self.number_of_failed_starts: int = 0
 
     @property
     def peaks(self) -> Sequence:
         return self.multipeak.peaks
 
 
+def get_starts(
+        multipeak: PeaksMultiple,
+        x: np.ndarray,
+        n_starts: int,
+        rng: np.random.Generator
+) -> np.ndarray:
+    """
+    Starting points for multi-start fitting; the first is the current args of the peaks.
+    Locations ('mean') are shifted by up to 10% of the x range; every other arg is scaled by 0.5 to 2.
+    Starts are clipped into the bounds.
+
+    Returns
+    -------
+    starts:
+        shape: [n_starts, n_args]
+    """
+    p0 = np.array(multipeak.get_args(), dtype=np.float64)
+    lower, upper = multipeak.get_bounds()
+    is_location = np.array([name == "mean" for name in multipeak.get_arg_names()])
+
+    starts = np.repeat(p0[np.newaxis, :], n_starts, axis=0)
+    n_random = n_starts - 1
+    x_range = np.max(x) - np.min(x)
+    shifts = rng.uniform(-0.1, 0.1, (n_random, len(p0))) * x_range
+    factors = np.exp(rng.uniform(np.log(0.5), np.log(2), (n_random, len(p0))))
+    starts[1:] = np.where(is_location, p0 + shifts, p0 * factors)
+
+    # keep strictly inside finite bounds ('curve_fit' requires p0 within bounds)
+    span = np.where(np.isfinite(upper - lower), upper - lower, 1)
+    return np.clip(starts, lower + 1e-9 * span, upper - 1e-9 * span)
+
+
+def _fit_start(
+        multipeak: PeaksMultiple,
+        xdata: np.ndarray,
+        ydata: np.ndarray,
+        kwargs: dict,
+        p0: np.ndarray
+) -> tuple[float, np.ndarray, np.ndarray] | None:
+    """ fit from one start (runs in a worker); None if the fit failed """
+    try:
+        args, covariance = curve_fit(f=multipeak, xdata=xdata, ydata=ydata, p0=p0, bounds=multipeak.get_bounds(),
+                                     **kwargs)
+    except (RuntimeError, ValueError) as e:
+        logger.debug(f"Fit failed: {e}")
+        return None
+    residual = float(np.sum((multipeak.evaluate(xdata, args) - ydata) ** 2))
+    return residual, args, covariance
+
+
 def peak_deconvolution(
         peaks: Sequence[PeakModel],
         xdata: np.ndarray,
         ydata: np.ndarray,
+        n_starts: int = 1,
+        executor: Executor = None,
+        seed: int = None,
         **kwargs
 ) -> ResultPeakFitting:
-    result = ResultPeakFitting()
+    """
+    Fit a sum of peaks to a signal.
+
+    Parameters
+    ----------
+    peaks:
+        peak models; their current args are the initial guess and are set to the best fit
+    xdata:
+        x values
+    ydata:
+        y values
+    n_starts:
+        number of starting points (multi-start); the fit with the smallest sum of squared residuals is kept.
+        See `get_starts`.
+    executor:
+        how starts are split across workers (e.g. `ProcessExecutor()`)
+        default: serial
+    seed:
+        seed for random starts
+    kwargs:
+        passed to `scipy.optimize.curve_fit`
+        default: jac = analytic jacobian
+
+    Returns
+    -------
+    result:
+        best fit
+    """
+    if n_starts < 1:
+        raise ValueError(f"'n_starts' must be 1 or greater.\n\tgiven: {n_starts}")
+    if executor is None:
+        executor = SerialExecutor()
+    xdata = np.asarray(xdata, dtype=np.float64)
+    ydata = np.asarray(ydata, dtype=np.float64)
+
     multipeak = PeaksMultiple(peaks)
+    kwargs.setdefault("jac", multipeak.jacobian)
+    starts = get_starts(multipeak, xdata, n_starts, np.random.default_rng(seed))
 
-    output = curve_fit(
-        f=multipeak,
-        xdata=xdata,
-        ydata=ydata,
-        p0=multipeak.get_args(),
-        bounds=multipeak.get_bounds(),
-        **kwargs
-    )
-    args, covariance = output
+    function = functools.partial(_fit_start, multipeak, xdata, ydata, kwargs)
+    results = executor.map(function, starts)
+    fits = [result for result in results if result is not None]
+    if not fits:
+        raise RuntimeError(f"All fits failed. (starts: {n_starts})")
+
+    residual, args, covariance = min(fits, key=lambda fit: fit[0])
     multipeak.set_args(args)
 
+    result = ResultPeakFitting()
     result.multipeak = multipeak
     result.covariance = covariance
+    result.residual = residual
+    result.number_of_starts = n_starts
+    result.number_of_failed_starts = n_starts - len(fits)
     return result
 
 
+class ResultPeakFittingArray:
+    """
+    Fit of the same peaks to every row of a SignalArray.
+
+    Attributes
+    ----------
+    args:
+        shape: [n_rows, n_args] (flat args; see `PeaksMultiple.get_args`); nan where the fit failed
+    covariance:
+        shape: [n_rows, n_args, n_args]
+    residual:
+        shape: [n_rows]; sum of squared residuals
+    success:
+        shape: [n_rows]
+    """
+    def __init__(self,
+                 multipeak: PeaksMultiple,
+                 time_: np.ndarray,
+                 args: np.ndarray,
+                 covariance: np.ndarray,
+                 residual: np.ndarray,
+                 success: np.ndarray
+                 ):
+        self.multipeak = multipeak
+        self.time = time_
+        self.args = args
+        self.covariance = covariance
+        self.residual = residual
+        self.success = success
+
+    def __str__(self):
+        return f"fit of {len(self.multipeak.peaks)} peaks to {len(self.time)} rows " \
+               f"(failed: {np.count_nonzero(~self.success)})"
+
+    def __repr__(self):
+        return self.__str__()
+
+    @property
+    def arg_names(self) -> tuple[str]:
+        return self.multipeak.get_arg_names()
+
+    def get_arg(self, peak: int, name: str) -> np.ndarray:
+        """ one arg of one peak for every row (e.g. get_arg(0, "scale") is the area of the first peak) """
+        start = sum(peak_.number_args for peak_ in self.multipeak.peaks[:peak])
+        index = start + self.multipeak.peaks[peak]._args.index(name)
+        return self.args[:, index]
+
+    def get_peaks(self, row: int) -> list[PeakModel]:
+        """ copies of the peaks with the args of one row """
+        peaks = copy.deepcopy(self.multipeak.peaks)
+        PeaksMultiple(peaks).set_args(self.args[row])
+        return peaks
+
+
+def _get_warm_start(args: np.ndarray, covariance: np.ndarray, p0: np.ndarray, bounds: tuple) -> np.ndarray:
+    """
+    start for the next row: args of this fit, except args on a bound or poorly determined (std >= |arg|), which go
+    back to the initial guess (e.g. a peak that is not present yet would otherwise stay stuck)
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        determined = np.sqrt(np.diag(covariance)) < np.abs(args)
+    keep = determined & (args > bounds[0]) & (args < bounds[1])
+    return np.where(keep, args, p0)
+
+
+def _fit_row(
+        multipeak: PeaksMultiple,
+        xdata: np.ndarray,
+        ydata: np.ndarray,
+        p0: np.ndarray,
+        bounds: tuple,
+        kwargs: dict,
+        row: int
+) -> tuple[np.ndarray, np.ndarray, float] | None:
+    """ fit one row; returns (args, covariance, residual) or None if the fit failed """
+    try:
+        args, covariance = curve_fit(f=multipeak, xdata=xdata, ydata=ydata, p0=p0, bounds=bounds, **kwargs)
+    except (RuntimeError, ValueError) as e:
+        logger.debug(f"Fit of row {row} failed: {e}")
+        return None
+    return args, covariance, np.sum((multipeak.evaluate(xdata, args) - ydata) ** 2)
+
+
+def _fit_rows(
+        multipeak: PeaksMultiple,
+        p0: np.ndarray,
+        warm_start: bool,
+        restart_tolerance: float,
+        kwargs: dict,
+        xdata: np.ndarray,
+        chunk: tuple[int, np.ndarray]
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """ fit a chunk of rows (first row, rows) in order (runs in a worker) """
+    first_row, z = chunk
+    n_args = len(p0)
+    args = np.full((z.shape[0], n_args), np.nan)
+    covariance = np.full((z.shape[0], n_args, n_args), np.nan)
+    residual = np.full(z.shape[0], np.nan)
+    success = np.zeros(z.shape[0], dtype=bool)
+
+    bounds = multipeak.get_bounds()
+    start = p0
+    previous_residual = np.inf
+    for i, ydata in enumerate(z):
+        fit = None
+        if warm_start and start is not p0:
+            fit = _fit_row(multipeak, xdata, ydata, start, bounds, kwargs, first_row + i)
+        # fall back to the initial guess if the warm start fails or fits much worse than the previous row
+        # (e.g. a wrong peak carried forward from an earlier row); keep the better of the two fits
+        if fit is None or fit[2] > (1 + restart_tolerance) * previous_residual:
+            fit_p0 = _fit_row(multipeak, xdata, ydata, p0, bounds, kwargs, first_row + i)
+            if fit is None or (fit_p0 is not None and fit_p0[2] < fit[2]):
+                fit = fit_p0
+        if fit is None:
+            continue
+
+        args[i], covariance[i], residual[i] = fit
+        success[i] = True
+        previous_residual = residual[i]
+        if warm_start:
+            start = _get_warm_start(args[i], covariance[i], p0, bounds)
+
+    return args, covariance, residual, success
+
+
+def peak_deconvolution_array(
+        peaks: Sequence[PeakModel],
+        array: SignalArray,
+        processed: bool = True,
+        executor: Executor = None,
+        warm_start: bool = True,
+        restart_tolerance: float = 0.1,
+        **kwargs
+) -> ResultPeakFittingArray:
+    """
+    Fit the same sum of peaks to every row of a SignalArray (e.g. to follow peak areas through a kinetics run).
+
+    Rows are fit in order and each row starts from the fit of the previous row (warm start; see `_get_warm_start`).
+    With an executor,
+    rows are split into chunks that are fit in parallel; the first row of each chunk starts from the args of
+    `peaks`.
+
+    Parameters
+    ----------
+    peaks:
+        peak models; their current args are the initial guess (they are not changed)
+    array:
+        SignalArray
+    processed:
+        True: use processed data; False: use raw data
+    executor:
+        how rows are split across workers (e.g. `ProcessExecutor()`)
+        default: serial
+    warm_start:
+        start each row from the previous row's fit
+    restart_tolerance:
+        a warm start fit with a residual above (1 + restart_tolerance) * the previous row's residual is fit again
+        from the initial guess, and the fit with the lower residual is kept
+    kwargs:
+        passed to `scipy.optimize.curve_fit`
+        default: jac = analytic jacobian
+
+    Returns
+    -------
+    result:
+        args and covariances stacked over rows
+    """
+    if executor is None:
+        executor = SerialExecutor()
+    if processed:
+        x, time_, z = array.x, array.time, array.data
+    else:
+        x, time_, z = array.x_raw, array.time_raw, array.data_raw
+    x = np.asarray(x, dtype=np.float64)
+
+    multipeak = PeaksMultiple(peaks)
+    kwargs.setdefault("jac", multipeak.jacobian)
+    lower, upper = multipeak.get_bounds()
+    p0 = np.clip(np.array(multipeak.get_args(), dtype=np.float64), lower, upper)
+
+    # rows of a chunk are fit in order (warm start); chunks are fit in parallel
+    function = functools.partial(_fit_rows, multipeak, p0, warm_start, restart_tolerance, kwargs, x)
+    results = executor.map(function, [(chunk.start, z[chunk]) for chunk in executor.get_chunks(z.shape[0])])
+    args, covariance, residual, success = (np.concatenate(values) for values in zip(*results))
+    if not np.all(success):
+        logger.warning(f"Fit failed for {np.count_nonzero(~success)} of {len(success)} rows.")
+
+    return ResultPeakFittingArray(multipeak, np.array(time_), args, covariance, residual, success)
+
+
 def peak_deconvolution_with_n_peaks(
         peaks: Sequence[type],
         xdata: np.ndarray,
@@ -4,24 +4,56 @@ import abc
 from typing import Sequence
 
 import numpy as np
-from scipy.special import voigt_profile
+from scipy.special import voigt_profile, wofz
 
 from chem_analysis.analysis.peak import Peak
 
 
 class PeakModel(abc.ABC):
+    """
+    Subclasses implement `function` and `jacobian` for many peaks at once; `params` has one row per peak
+    (columns in the order of `_args`).
+    """
     _args = None
 
     def __init__(self):
         ...
 
-    @abc.abstractmethod
     def __call__(self, x: np.ndarray) -> np.ndarray:
-        ...
+        return self.function(x, np.array([self.get_args()], dtype=np.float64))[0]
+
+    @staticmethod
+    @abc.abstractmethod
+    def function(x: np.ndarray, params: np.ndarray) -> np.ndarray:
+        """
+        Parameters
+        ----------
+        x:
+            shape: [n_x]
+        params:
+            shape: [n_peaks, n_args]
+
+        Returns
+        -------
+        y:
+            shape: [n_peaks, n_x]
+        """
+
+    @staticmethod
+    @abc.abstractmethod
+    def jacobian(x: np.ndarray, params: np.ndarray) -> np.ndarray:
+        """
+        Analytic derivative of `function` with respect to each arg.
+
+        Returns
+        -------
+        jacobian:
+            shape: [n_peaks, n_args, n_x]
+        """
 
     @property
     def number_args(self) -> int:
-        return len(self.__slots__)
+        return len(self._args)
 
     def get_args(self) -> tuple:
         return tuple(getattr(self, arg) for arg in self._args)
@@ -40,7 +72,7 @@ class PeakModel(abc.ABC):
     def get_bounds(self) -> list[tuple[float, float]]:
         bounds = []
         for k in self._args:
-            bounds.append(getattr(self, k + "_bounds"))
+            bounds.append(getattr(self, k + "_bounds", (-np.inf, np.inf)))
         return bounds
 
 
@@ -57,8 +89,18 @@ class DistributionNormal(PeakModel):
         self.mean = mean
         self.sigma = sigma
 
-    def __call__(self, x: np.ndarray) -> np.ndarray:
-        return self.scale / (self.sigma * np.sqrt(2 * np.pi)) * np.exp(-(x - self.mean) ** 2 / (2 * self.sigma ** 2))
+    @staticmethod
+    def function(x: np.ndarray, params: np.ndarray) -> np.ndarray:
+        scale, mean, sigma = params[:, 0:1], params[:, 1:2], params[:, 2:3]
+        return scale / (sigma * np.sqrt(2 * np.pi)) * np.exp(-(x - mean) ** 2 / (2 * sigma ** 2))
+
+    @staticmethod
+    def jacobian(x: np.ndarray, params: np.ndarray) -> np.ndarray:
+        scale, mean, sigma = params[:, 0:1], params[:, 1:2], params[:, 2:3]
+        distance = x - mean
+        normal = np.exp(-distance ** 2 / (2 * sigma ** 2)) / (sigma * np.sqrt(2 * np.pi))
+        y = scale * normal
+        return np.stack((normal, y * distance / sigma ** 2, y * (distance ** 2 / sigma ** 3 - 1 / sigma)), axis=1)
 
     def convert_to_peak(self, x: np.ndarray) -> DistributionNormalPeak:
         return DistributionNormalPeak(x, self.scale, self.mean, self.sigma)
@@ -71,7 +113,7 @@ class DistributionNormalPeak(DistributionNormal, Peak):
                  mean: int | float = 0,
                  sigma: int | float = 1,
                  scale_bounds: tuple[float, float] = (0, np.inf),
-                 mean_bounds: tuple[float, float] = (np.inf, np.inf),
+                 mean_bounds: tuple[float, float] = (-np.inf, np.inf),
                  sigma_bounds: tuple[float, float] = (0, np.inf),
                  id_: int = None
                  ):
@@ -91,7 +133,6 @@ class DistributionNormalPeak(DistributionNormal, Peak):
         return self._x
 
 
-
 # from scipy.stats import cauchy
 class DistributionCauchy(PeakModel):
     _args = ("scale", "mean", "gamma")
@@ -106,8 +147,19 @@ class DistributionCauchy(PeakModel):
         self.mean = mean
         self.gamma = gamma
 
-    def __call__(self, x: np.ndarray) -> np.ndarray:
-        return self.scale / (np.pi * self.gamma * (1 + ((x - self.mean) / 2) ** 2))
+    @staticmethod
+    def function(x: np.ndarray, params: np.ndarray) -> np.ndarray:
+        scale, mean, gamma = params[:, 0:1], params[:, 1:2], params[:, 2:3]
+        return scale / (np.pi * gamma * (1 + ((x - mean) / gamma) ** 2))
+
+    @staticmethod
+    def jacobian(x: np.ndarray, params: np.ndarray) -> np.ndarray:
+        scale, mean, gamma = params[:, 0:1], params[:, 1:2], params[:, 2:3]
+        t = (x - mean) / gamma
+        denominator = gamma * (1 + t ** 2)
+        cauchy = 1 / (np.pi * denominator)
+        y = scale * cauchy
+        return np.stack((cauchy, y * 2 * t / denominator, y * (t ** 2 - 1) / denominator), axis=1)
 
 
 class DistributionCauchyPeak(DistributionCauchy, Peak):
@@ -117,7 +169,7 @@ class DistributionCauchyPeak(DistributionCauchy, Peak):
                  mean: int | float = 0,
                  gamma: int | float = 1,
                  scale_bounds: tuple[float, float] = (0, np.inf),
-                 mean_bounds: tuple[float, float] = (np.inf, np.inf),
+                 mean_bounds: tuple[float, float] = (-np.inf, np.inf),
                  gamma_bounds: tuple[float, float] = (0, np.inf),
                  id_: int = None
                  ):
@@ -138,6 +190,8 @@ class DistributionCauchyPeak(DistributionCauchy, Peak):
 
 
 class DistributionVoigt(PeakModel):
+    _args = ("scale", "mean", "sigma", "gamma")
+
     def __init__(self,
                  scale: int | float = 1,
                  mean: int | float = 0,
@@ -154,13 +208,27 @@ class DistributionVoigt(PeakModel):
         self.sigma = sigma
         self.gamma = gamma
 
-    def __call__(self, x: np.ndarray) -> np.ndarray:
-        return self.scale * voigt_profile(x - self.mean, sigma=self.sigma, gamma=self.gamma)
+    @staticmethod
+    def function(x: np.ndarray, params: np.ndarray) -> np.ndarray:
+        scale, mean, sigma, gamma = params[:, 0:1], params[:, 1:2], params[:, 2:3], params[:, 3:4]
+        return scale * voigt_profile(x - mean, sigma, gamma)
+
+    @staticmethod
+    def jacobian(x: np.ndarray, params: np.ndarray) -> np.ndarray:
+        # voigt = Re[w(z)] / (sigma sqrt(2 pi)), z = (x - mean + i gamma) / (sigma sqrt(2)); w'(z) = -2 z w + 2i/sqrt(pi)
+        scale, mean, sigma, gamma = params[:, 0:1], params[:, 1:2], params[:, 2:3], params[:, 3:4]
+        z = (x - mean + 1j * gamma) / (sigma * np.sqrt(2))
+        w = wofz(z)
+        w_prime = -2 * z * w + 2j / np.sqrt(np.pi)
+        normalization = 1 / (sigma * np.sqrt(2 * np.pi))
+        voigt = w.real * normalization
+        d_mean = (w_prime * (-1 / (sigma * np.sqrt(2)))).real * normalization
+        d_gamma = (w_prime * (1j / (sigma * np.sqrt(2)))).real * normalization
+        d_sigma = (w_prime * (-z / sigma)).real * normalization - voigt / sigma
+        return np.stack((voigt, scale * d_mean, scale * d_sigma, scale * d_gamma), axis=1)
 
 
 class DistributionVoigtPeak(DistributionVoigt, Peak):
-    _args = ("scale", "mean", "sigma", "gamma")
-
     def __init__(self,
                  x: np.ndarray,
                  scale: int | float = 1,
@@ -168,7 +236,7 @@ class DistributionVoigtPeak(DistributionVoigt, Peak):
                  sigma: int | float = 1,
                  gamma: int | float = 1,
                  scale_bounds: tuple[float, float] = (0, np.inf),
-                 mean_bounds: tuple[float, float] = (np.inf, np.inf),
+                 mean_bounds: tuple[float, float] = (-np.inf, np.inf),
                  sigma_bounds: tuple[float, float] = (0, np.inf),
                  gamma_bounds: tuple[float, float] = (0, np.inf),
                  id_: int = None
@@ -3,3 +3,4 @@ from chem_analysis.analysis.multi_component_analysis.muti_component_analysis imp
 from chem_analysis.analysis.multi_component_analysis.regressors import *
 from chem_analysis.analysis.multi_component_analysis.metrics import *
 from chem_analysis.analysis.multi_component_analysis.constraints import *
+from chem_analysis.analysis.multi_component_analysis.pca import randomized_svd, ResultPCA
@@ -4,24 +4,77 @@ from typing import Iterable
 import numpy as np
 
 
+def _row_sums(A: np.ndarray) -> np.ndarray:
+    """ A.sum(axis=1); matrix-vector product is much faster for the narrow matrices of MCA """
+    return A @ np.ones(A.shape[1], dtype=A.dtype)
+
+
+def _scale_rows(A: np.ndarray, scale: np.ndarray) -> np.ndarray:
+    """ A *= scale[:, None] in place; loops over the shorter axis (C and S^T have few components) """
+    if A.shape[0] <= A.shape[1]:
+        for i in range(A.shape[0]):
+            A[i] *= scale[i]
+    else:
+        for i in range(A.shape[1]):
+            A[:, i] *= scale
+    return A
+
+
+def _clip_columns(A: np.ndarray, lower: np.ndarray, upper: np.ndarray) -> np.ndarray:
+    """ clip each column to its bounds in place; one full-array op where every column shares a bound """
+    for bound, function in ((lower, np.maximum), (upper, np.minimum)):
+        finite = np.isfinite(bound)
+        if np.all(finite) and np.all(bound == bound[0]):
+            function(A, bound[0], out=A)
+        else:
+            for i in np.flatnonzero(finite):
+                function(A[:, i], bound[i], out=A[:, i])
+    return A
+
+
 class Constraint(abc.ABC):
     """ Abstract class for constraints
 
+    Subclasses implement `transform_inplace` (overwrites A, avoiding temporary arrays the size of A);
+    `transform` copies A first if `copy` is True. Subclasses that need a scratch array the size of A set
+    `uses_work` and take it as `transform_inplace(A, work)` (allocated per call if not given; `ConstraintPipeline`
+    reuses one across calls).
+
     Parameters
     ----------
     copy : bool
         Make copy of input data, A; otherwise, overwrite (if mutable)
     """
 
+    uses_work = False
+
     def __init__(self, copy=True):
         self.copy = copy
 
-    @abc.abstractmethod
     def transform(self, A):
         """ Transform A input based on constraint """
+        if self.copy:
+            A = np.array(A, dtype=np.result_type(A.dtype, np.float64))
+        return self.transform_inplace(A)
+
+    @abc.abstractmethod
+    def transform_inplace(self, A):
+        """ Transform A input based on constraint (overwrites A) """
 
 
-class ConstraintNonneg(Constraint):
+class ConstraintBounds(Constraint, abc.ABC):
+    """ Constraints that clip each column to a range; consecutive ones are fused (see `ConstraintPipeline`) """
+
+    @abc.abstractmethod
+    def get_bounds(self, n_columns: int) -> tuple[np.ndarray, np.ndarray]:
+        """ (lower, upper) bound of each column """
+
+    def transform_inplace(self, A):
+        lower, upper = self.get_bounds(A.shape[1])
+        return _clip_columns(A, lower, upper)
+
+
+class ConstraintNonneg(ConstraintBounds):
     """
     Non-negativity constraint. All negative entries made 0.
     """
@@ -31,20 +84,16 @@ class ConstraintNonneg(Constraint):
         super().__init__(copy)
         self.index = index
 
-    def transform(self, A):
+    def get_bounds(self, n_columns: int) -> tuple[np.ndarray, np.ndarray]:
+        lower = np.full(n_columns, -np.inf)
+        lower[slice(None) if self.index is None else self.index] = 0
+        return lower, np.full(n_columns, np.inf)
+
+    def transform_inplace(self, A):
         """ Apply nonnegative constraint"""
         if self.index is not None:
-            if self.copy:
-                A = np.copy(A)
-            selected_columns = A[:, self.index]
-            A[:, self.index] = selected_columns * (selected_columns > 0)
-            return A
-
-        if self.copy:
-            return A * (A > 0)
-        else:
-            A *= (A > 0)
-            return A
+            return super().transform_inplace(A)
+        return np.maximum(A, 0, out=A)
 
 
 class ConstraintCumsumNonneg(Constraint):
@@ -53,20 +102,18 @@ class ConstraintCumsumNonneg(Constraint):
      entries made 0.
 
     """
+    uses_work = True
 
     def __init__(self, axis=-1, copy=False):
         """ A must be non-negative"""
         super().__init__(copy)
         self.axis = axis
 
-    def transform(self, A):
+    def transform_inplace(self, A, work: np.ndarray = None):
         """ Apply cumsum nonnegative constraint"""
-
-        if self.copy:
-            return A * (np.cumsum(A, self.axis) > 0)
-        else:
-            A *= (np.cumsum(A, self.axis) > 0)
-            return A
+        cumsum = np.cumsum(A, self.axis, out=np.empty(A.shape, dtype=A.dtype) if work is None else work)
+        np.copyto(A, 0, where=cumsum <= 0)
+        return A
 
 
 class ConstraintZeroEndPoints(Constraint):
@@ -74,6 +121,7 @@ class ConstraintZeroEndPoints(Constraint):
     Enforce the endpoints (or the mean over a range) is zero
 
     """
+    uses_work = True
 
     def __init__(self, axis=-1, span=1, copy=False):
         """
@@ -94,49 +142,25 @@ class ConstraintZeroEndPoints(Constraint):
         self.axis = axis
         self.span = span
 
-    def transform(self, A):
+    def transform_inplace(self, A, work: np.ndarray = None):
         """ Apply cumsum nonnegative constraint"""
-
-        pix_vec = np.arange(A.shape[self.axis])
-        if (self.axis == 0):
-            if self.span == 1:
-                slope = (A[-1, :] - A[0, :]) / (pix_vec[-1] - pix_vec[0])
-                intercept = A[0, :]
-            else:
-                slope = ((A[-self.span:, :].mean(axis=0) -
-                          A[:self.span, :].mean(axis=0)) /
-                         (pix_vec[-self.span:].mean() -
-                          pix_vec[:self.span].mean()))
-                intercept = (A[:self.span, :] -
-                             np.dot(pix_vec[:self.span, None],
-                                     slope[None, :])).mean(axis=0)
-            if self.copy:
-                return A - np.dot(pix_vec[:, None],
-                                   slope[None, :]) - intercept[None, :]
-            else:
-                A -= (np.dot(pix_vec[:, None],
-                              slope[None, :]) + intercept[None, :])
-                return A
+        # work along the last axis; for axis 0, operate on the transposed view
+        A_ = A.T if self.axis == 0 else A
+        pix_vec = np.arange(A_.shape[-1], dtype=A.dtype)
+        if self.span == 1:
+            slope = (A_[:, -1] - A_[:, 0]) / (pix_vec[-1] - pix_vec[0])
+            intercept = A_[:, 0].copy()
         else:
-            if self.span == 1:
-                slope = (A[:, -1] - A[:, 0]) / (pix_vec[-1] - pix_vec[0])
-                intercept = A[:, 0]
-            else:
-                slope = ((A[:, -self.span:].mean(axis=1) -
-                          A[:, :self.span].mean(axis=1)) /
-                         (pix_vec[-self.span:].mean() -
-                          pix_vec[:self.span].mean()))
-                intercept = (A[:, :self.span] -
-                             np.dot(slope[:, None],
-                                     pix_vec[None, :self.span])).mean(axis=1)
-
-            if self.copy:
-                return A - np.dot(slope[:, None],
-                                   pix_vec[None, :]) - intercept[:, None]
-            else:
-                A -= (np.dot(slope[:, None],
-                              pix_vec[None, :]) + intercept[:, None])
-                return A
+            slope = ((A_[:, -self.span:].mean(axis=1) - A_[:, :self.span].mean(axis=1)) /
+                     (pix_vec[-self.span:].mean() - pix_vec[:self.span].mean()))
+            intercept = A_[:, :self.span].mean(axis=1) - slope * pix_vec[:self.span].mean()
+
+        if work is None:
+            work = np.empty(A.shape, dtype=A.dtype)
+        line = np.multiply.outer(slope, pix_vec, out=work.T if self.axis == 0 else work)
+        A_ -= line
+        A_ -= intercept[:, None]
+        return A
 
 
 class ConstraintZeroCumSumEndPoints(Constraint):
@@ -170,58 +194,22 @@ class ConstraintZeroCumSumEndPoints(Constraint):
 
         self.axis = axis
 
-    def transform(self, A):
+    def transform_inplace(self, A):
         """ Apply cumsum nonnegative constraint"""
-
-        meaner = A.mean(self.axis)
-
+        # work along the last axis; for axis 0, operate on the transposed view
+        A_ = A.T if self.axis == 0 else A
+        length = A_.shape[-1]
+        nodes = {0}
         if self.nodes:
-            self.nodes = set(self.nodes)
-            self.nodes.update({0, A.shape[self.axis]})
-            self.nodes.discard(-1)
-            self.nodes = list(self.nodes)
-
-            if (self.axis == 0):
-                if self.copy:
-                    temp = 1.0 * A
-                    for num in range(len(self.nodes) - 1):
-                        n0 = self.nodes[num]
-                        n1 = self.nodes[num + 1]
-                        temp[n0:n1, :] -= temp[n0:n1, :].mean(self.axis)[None, :]
-                    return temp
-                else:
-                    for num in range(len(self.nodes) - 1):
-                        n0 = self.nodes[num]
-                        n1 = self.nodes[num + 1]
-                        A[n0:n1, :] -= A[n0:n1, :].mean(self.axis)[None, :]
-                    return A
-            else:
-                if self.copy:
-                    temp = 1.0 * A
-                    for num in range(len(self.nodes) - 1):
-                        n0 = self.nodes[num]
-                        n1 = self.nodes[num + 1]
-                        temp[:, n0:n1] -= temp[:, n0:n1].mean(self.axis)[:, None]
-                    return temp
-                else:
-                    for num in range(len(self.nodes) - 1):
-                        n0 = self.nodes[num]
-                        n1 = self.nodes[num + 1]
-                        A[:, n0:n1] -= A[:, n0:n1].mean(self.axis)[:, None]
-                    return A
-        else:
-            if (self.axis == 0):
-                if self.copy:
-                    return A - meaner[None, :]
-                else:
-                    A -= meaner[None, :]
-                    return A
-            else:
-                if self.copy:
-                    return A - meaner[:, None]
-                else:
-                    A -= meaner[:, None]
-                    return A
+            nodes.update(node for node in self.nodes if 0 < node < length)
+        starts = np.array(sorted(nodes))
+
+        # mean of each segment between nodes (one pass), subtracted from every point of the segment
+        stops = np.append(starts[1:], length)
+        means = np.add.reduceat(A_, starts, axis=-1) / (stops - starts)
+        for i, (start, stop) in enumerate(zip(starts, stops)):  # loop over segments (few)
+            A_[:, start:stop] -= means[:, i:i + 1]
+        return A
 
 
 class ConstraintNorm(Constraint):
@@ -277,69 +265,30 @@ class ConstraintNorm(Constraint):
             raise ValueError('Axis must be 0,1, or -1')
         self.axis = axis
 
-    def transform(self, A):
+    def transform_inplace(self, A):
         """ Apply normalization constraint """
+        if not np.issubdtype(A.dtype, np.floating):
+            raise TypeError('A.dtype must be float for in-place math (copy=False)')
 
-        if self.copy:
-            if self.axis == 0:
-                if not self.fix:  # No fixed axes
-                    return A / A.sum(axis=self.axis)[None, :]
-                else:  # Fixed axes
-                    fix_locs = self.fix
-                    not_fix_locs = [v for v in np.arange(A.shape[0]).tolist()
-                                    if self.fix.count(v) == 0]
-                    scaler = np.ones(A.shape)
-                    div = A[not_fix_locs, :].sum(axis=0)[None, :]
-                    div[div == 0] = 1
-                    scaler[not_fix_locs, :] = ((1 - A[fix_locs, :].sum(axis=0)[None, :]) / div)
-
-                    return A * scaler
-            else:  # Axis = 1 / -1
-                if not self.fix:  # No fixed axes
-                    return A / A.sum(axis=self.axis)[:, None]
-                else:  # Fixed axis
-                    fix_locs = self.fix
-                    not_fix_locs = [v for v in np.arange(A.shape[-1]).tolist()
-                                    if self.fix.count(v) == 0]
-                    scaler = np.ones(A.shape)
-                    div = A[:, not_fix_locs].sum(axis=-1)[:, None]
-                    div[div == 0] = 1
-                    scaler[:, not_fix_locs] = ((1 - A[:, fix_locs].sum(axis=-1)[:, None]) / div)
-
-                    return A * scaler
-        else:  # Overwrite original data
-            if A.dtype != float:
-                raise TypeError('A.dtype must be float for',
-                                'in-place math (copy=False)')
+        # normalize each row of A_ (across the last axis); for axis 0, operate on the transposed view
+        A_ = A.T if self.axis == 0 else A
+        if not self.fix:  # No fixed axes
+            _scale_rows(A_, 1 / _row_sums(A_))
+            return A
 
-            if self.axis == 0:
-                if not self.fix:  # No fixed axes
-                    A /= A.sum(axis=self.axis)[None, :]
-                    return A
-                else:  # Fixed axes
-                    fix_locs = self.fix
-                    not_fix_locs = [v for v in np.arange(A.shape[0]).tolist()
-                                    if self.fix.count(v) == 0]
-                    scaler = np.ones(A.shape)
-                    div = A[not_fix_locs, :].sum(axis=0)[None, :]
-                    div[div == 0] = 1
-                    scaler[not_fix_locs, :] = ((1 - A[fix_locs, :].sum(axis=0)[None, :]) / div)
-                    A *= scaler
-                    return A
-            else:  # Axis = 1 / -1
-                if not self.fix:  # No fixed axes
-                    A /= A.sum(axis=self.axis)[:, None]
-                    return A
-                else:  # Fixed axis
-                    fix_locs = self.fix
-                    not_fix_locs = [v for v in np.arange(A.shape[-1]).tolist()
-                                    if self.fix.count(v) == 0]
-                    scaler = np.ones(A.shape)
-                    div = A[:, not_fix_locs].sum(axis=-1)[:, None]
-                    div[div == 0] = 1
-                    scaler[:, not_fix_locs] = ((1 - A[:, fix_locs].sum(axis=-1)[:, None]) / div)
-                    A *= scaler
-                    return A
+        # loops are over components (few); fancy indexing would copy A
+        not_fix_locs = [v for v in range(A_.shape[-1]) if v not in self.fix]
+        div = np.zeros(A_.shape[0], dtype=A.dtype)
+        for loc in not_fix_locs:
+            div += A_[:, loc]
+        div[div == 0] = 1
+        scaler = np.ones(A_.shape[0], dtype=A.dtype)
+        for loc in self.fix:
+            scaler -= A_[:, loc]
+        scaler /= div
+        for loc in not_fix_locs:
+            A_[:, loc] *= scaler
+        return A
 
 
 class ConstraintReplaceZeros(Constraint):
@@ -388,30 +337,19 @@ class ConstraintReplaceZeros(Constraint):
             raise ValueError('Axis must be 0,1, or -1')
         self.axis = axis
 
-    def transform(self, A):
+    def transform_inplace(self, A):
         """ Apply constraint """
-
         if self.feature:
             replacement = np.zeros(A.shape[self.axis])
             replacement[self.feature] = self.fval
             replacement /= replacement.sum()
             replacement *= self.fval
 
-            if self.copy:
-                A_out = 1 * A
-                if self.axis == 0:
-                    A_out[:, A_out.sum(axis=0) == 0] = replacement[:, None]
-                else:  # Axis 1 / -1
-                    A_out[A_out.sum(axis=-1) == 0] = replacement
-                return A_out
-            else:
-                if self.axis == 0:
-                    A[:, A.sum(axis=0) == 0] = replacement[:, None]
-                else:  # Axis 1 / -1
-                    A[A.sum(axis=-1) == 0] = replacement
-                return A
-        else:
-            return A
+            if self.axis == 0:
+                A[:, _row_sums(A.T) == 0] = replacement[:, None]
+            else:  # Axis 1 / -1
+                A[_row_sums(A) == 0] = replacement
+        return A
 
 
 class ConstraintPlanarize(Constraint):
@@ -490,56 +428,38 @@ class ConstraintPlanarize(Constraint):
         self._X = self._X.ravel()
         self._Y = self._Y.ravel()
 
-    def transform(self, A):
+    def transform_inplace(self, A):
         """ Set targets, t, to fit planes """
-
         if (self.scaler is None) | (self.recalc):
             self._setup_xy(1e3 * np.abs(A.max() - A.min()))
 
-        if self.copy:
-            A2 = 1 * A
-
         for t in self.target:
-            X2 = 1 * self._X
-            Y2 = 1 * self._Y
-            Z2 = 1 * A[:, t]
-
-            Stack = np.vstack((X2, Y2, Z2))
-
+            X2, Y2, Z2 = self._X, self._Y, A[:, t]
             if self.use_above is not None:
-                X2 = X2[Z2 > self.use_above]
-                Y2 = Y2[Z2 > self.use_above]
-                Z2 = Z2[Z2 > self.use_above]
-                Stack = np.vstack((X2, Y2, Z2))
-
+                mask = Z2 > self.use_above
+                X2, Y2, Z2 = X2[mask], Y2[mask], Z2[mask]
             if self.use_below is not None:
-                X2 = X2[Z2 < self.use_below]
-                Y2 = Y2[Z2 < self.use_below]
-                Z2 = Z2[Z2 < self.use_below]
-                Stack = np.vstack((X2, Y2, Z2))
-
-            Stack = Stack - Stack.mean(axis=-1)[:, None]
+                mask = Z2 < self.use_below
+                X2, Y2, Z2 = X2[mask], Y2[mask], Z2[mask]
 
-            U, s, Vh = np.linalg.svd(Stack, full_matrices=False)
-            norm_to_plane = 1 * U[:, -1]
+            # normal to the plane: singular vector of the smallest singular value of the centered (X, Y, Z) stack
+            # (eigenvector of the 3x3 scatter matrix; avoids an SVD of the 3xN stack)
+            means = np.array([X2.mean(), Y2.mean(), Z2.mean()])
+            Stack = np.vstack((X2, Y2, Z2)) - means[:, None]
+            _, vectors = np.linalg.eigh(Stack @ Stack.T)
+            norm_to_plane = vectors[:, 0]
 
-            plane = (((-norm_to_plane[0] * (self._X - X2.mean())) -
-                      (norm_to_plane[1] * (self._Y - Y2.mean()))) /
-                     norm_to_plane[2]) + Z2.mean()
+            plane = (((-norm_to_plane[0] * (self._X - means[0])) -
+                      (norm_to_plane[1] * (self._Y - means[1]))) /
+                     norm_to_plane[2]) + means[2]
 
             if self.lims_to_plane:
                 if self.use_above is not None:
                     plane[plane < self.use_above] = self.use_above
                 if self.use_below is not None:
                     plane[plane > self.use_below] = self.use_below
-            if not self.copy:
-                A[:, t] = plane
-            else:
-                A2[:, t] = plane
-        if self.copy:
-            return A2
-        else:
-            return A
+            A[:, t] = plane
+        return A
 
 
 class ConstraintConv(Constraint):
@@ -551,26 +471,22 @@ class ConstraintConv(Constraint):
         super().__init__(copy)
         self.index = index
 
-    def transform(self, A):
+    def transform_inplace(self, A):
         """ Apply nonnegative constraint"""
         if self.index is not None:
-            if self.copy:
-                A = np.copy(A)
-            selected_columns = A[:, self.index]
-            row_sums = selected_columns.sum(axis=1)
-            selected_columns /= row_sums[:, np.newaxis]
-            A[:, self.index] = selected_columns
+            index = np.arange(A.shape[1])[self.index].reshape(-1)
+            row_sums = np.zeros(A.shape[0], dtype=A.dtype)
+            for i in index:  # loop over components (few); fancy indexing would copy A
+                row_sums += A[:, i]
+            scale = 1 / row_sums
+            for i in index:
+                A[:, i] *= scale
             return A
 
-        row_sums = A.sum(axis=1)
-        if self.copy:
-            return A / row_sums[:, np.newaxis]
-        else:
-            A /= row_sums[:, np.newaxis]
-            return A
+        return _scale_rows(A, 1 / _row_sums(A))
 
 
-class ConstraintRange(Constraint):
+class ConstraintRange(ConstraintBounds):
     """
     values must stay within range
     """
@@ -594,18 +510,69 @@ class ConstraintRange(Constraint):
         super().__init__(copy)
         self.range_ = range_
 
-    def transform(self, A):
-        """ Apply nonnegative constraint"""
-        if self.copy:
-            A = np.copy(A)
-
+    def get_bounds(self, n_columns: int) -> tuple[np.ndarray, np.ndarray]:
+        lower = np.full(n_columns, -np.inf)
+        upper = np.full(n_columns, np.inf)
         for i, r in enumerate(self.range_):
             if r is not None:
                 if r[0] is not None:
-                    mask = A[:, i] < r[0]
-                    A[mask, i] = r[0]
+                    lower[i] = r[0]
                 if r[1] is not None:
-                    mask = A[:, i] > r[1]
-                    A[mask, i] = r[1]
+                    upper[i] = r[1]
+        return lower, upper
+
+
+class ConstraintPipeline(Constraint):
+    """
+    Applies constraints in order, in place, with one pass over A for each run of consecutive `ConstraintBounds`
+    (their clips compose into a single clip).
+    Used by `MultiComponentAnalysis` on the regressor output (which it owns, so 'copy' of each constraint is ignored);
+    it makes a new pipeline for every fit, so the scratch array kept here is never shared between fits.
+    """
+    uses_work = True
 
+    def __init__(self, constraints: Iterable[Constraint], copy=False):
+        super().__init__(copy)
+        self.constraints = list(constraints)
+        self._steps = None
+        self._n_columns = None
+        self._work = None
+
+    def __repr__(self):
+        return f"ConstraintPipeline({[type(constraint).__name__ for constraint in self.constraints]})"
+
+    def _build(self, n_columns: int):
+        """ fuse consecutive bounds: clip(clip(x, l1, u1), l2, u2) = clip(x, clip(l1, l2, u2), clip(u1, l2, u2)) """
+        steps = []
+        for constraint in self.constraints:
+            if not isinstance(constraint, ConstraintBounds):
+                steps.append(constraint)
+                continue
+            lower, upper = constraint.get_bounds(n_columns)
+            if steps and isinstance(steps[-1], tuple):
+                lower_previous, upper_previous = steps[-1]
+                steps[-1] = (np.clip(lower_previous, lower, upper), np.clip(upper_previous, lower, upper))
+            else:
+                steps.append((lower, upper))
+
+        self._steps = steps
+        self._n_columns = n_columns
+
+    def _get_work(self, A: np.ndarray) -> np.ndarray:
+        """ scratch array reused between calls """
+        if self._work is None or self._work.shape != A.shape or self._work.dtype != A.dtype:
+            self._work = np.empty(A.shape, dtype=A.dtype)
+        return self._work
+
+    def transform_inplace(self, A, work: np.ndarray = None):
+        if self._steps is None or self._n_columns != A.shape[1]:
+            self._build(A.shape[1])
+
+        for step in self._steps:
+            if isinstance(step, tuple):
+                _clip_columns(A, *step)
+            elif step.uses_work:
+                A = step.transform_inplace(A, self._get_work(A) if work is None else work)
+            else:
+                A = step.transform_inplace(A)
         return A
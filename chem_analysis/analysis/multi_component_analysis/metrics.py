@@ -16,6 +16,31 @@ def mean_square_error(D_actual: np.ndarray, D_calculated: np.ndarray) -> float:
     return ((D_actual - D_calculated)**2).sum()/D_actual.size
 
 
+def mean_square_error_gram(D_actual: np.ndarray, C: np.ndarray, ST: np.ndarray, D_norm: float = None) -> float:
+    """
+    Mean square error of D_calculated = C S^T without forming D_calculated
+    ||D - CS^T||^2 = ||D||^2 - 2 tr(C^T D S) + tr(C^T C S^T S)
+
+    Loses precision when the error is very small compared to ||D||^2 (~1e-16 * ||D||^2).
+
+    Parameters
+    ----------
+    D_actual:
+        shape: [n_samples, n_features]
+    C:
+        shape: [n_samples, n_components]
+    ST:
+        shape: [n_components, n_features]
+    D_norm:
+        ||D||^2 (if already known)
+    """
+    if D_norm is None:
+        D_norm = np.vdot(D_actual, D_actual)
+    cross = np.vdot(C, D_actual @ ST.T)
+    gram = np.vdot(C.T @ C, ST @ ST.T)
+    return max(D_norm - 2 * cross + gram, 0) / D_actual.size
+
+
 def wassersein_distance_1D(D_actual: np.ndarray, D_calculated: np.ndarray, axis: int = 0) -> float:
     """
     This distance is also known as the earth mover’s distance, since it can be seen as the minimum amount
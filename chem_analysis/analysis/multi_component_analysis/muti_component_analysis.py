@@ -1,11 +1,15 @@
+import copy
+import functools
 import logging
-from typing import Callable, Iterable
+from typing import Callable, Iterable, Sequence
 
 import numpy as np
 
-from chem_analysis.analysis.multi_component_analysis.constraints import Constraint
+from chem_analysis.processing.executors import Executor, SerialExecutor
+from chem_analysis.analysis.multi_component_analysis.constraints import Constraint, ConstraintPipeline
 from chem_analysis.analysis.multi_component_analysis.regressors import LinearRegressor, LeastSquares
-from chem_analysis.analysis.multi_component_analysis.metrics import MetricType, mean_square_error
+from chem_analysis.analysis.multi_component_analysis.metrics import MetricType, mean_square_error, \
+    mean_square_error_gram
 
 logger = logging.getLogger(__name__)
 
@@ -13,9 +17,8 @@ logger = logging.getLogger(__name__)
 class MCAResult:
     """
 
-    err: list
-        List of calculated errors (from error_function) after each least squares (ie
-        twice per iter)
+    error: np.ndarray
+        error (from error_function) of each iter (last half iter)
     C_: ndarray [n_samples, n_targets]
         Most recently calculated C matrix (that did not cause a tolerance
         failure)
@@ -45,6 +48,10 @@ class MCAResult:
     exit_tolerance_n_above_min: bool
         Exited iters due to maximum number of half-iters for which
         the error metric increased above the minimum error
+    abandoned: bool
+        Stopped early by `MultiComponentAnalysis.fit_many` as the error was much worse than the best run
+    history: list[tuple[int, ndarray, ndarray]]
+        (iter, C, S^T) every `history_every` iters (see `MultiComponentAnalysis`); empty by default
     """
 
     def __init__(self):
@@ -59,10 +66,22 @@ class MCAResult:
         self.exit_tolerance_n_increase = False
         self.exit_tolerance_error_change = False
         self.exit_tolerance_n_above_min = False
+        self.abandoned = False
+        self.history = []
+
+    def __repr__(self):
+        return f"MCAResult: error {self.min_error:.4e} (iters: {self.total_iters}, optimal: {self.optimal_iter})"
+
+    @property
+    def min_error(self) -> float:
+        """ error of the optimal C and S^T """
+        if self.error is None or self.optimal_iter is None:
+            return np.inf
+        return float(self.error[self.optimal_iter])
 
     @property
     def D(self):
-        """ D matrix with optimal C and S^T matrices """
+        """ D matrix with optimal C and S^T matrices (calculated on every access; not stored) """
         return np.dot(self.C, self.ST)
 
 
@@ -86,7 +105,9 @@ class MultiComponentAnalysis:
                  error_function: MetricType = mean_square_error,
                  tolerance_increase: float = 0.0,
                  tolerance_error_change: float = None,
-                 iters_above_min: int = 10
+                 iters_above_min: int = 10,
+                 low_memory: bool = False,
+                 history_every: int = None
                  ):
         """
         Parameters
@@ -112,6 +133,13 @@ class MultiComponentAnalysis:
         iters_above_min: int
             Number of half-iters that can be performed without reaching a
             new error-minimu
+        low_memory: bool
+            Calculate the error from C and S^T without forming D_calc = CS^T (Gram matrix identity
+            ||D - CS^T||^2 = ||D||^2 - 2 tr(C^T D S) + tr(C^T C S^T S)). Only for error_function = mean_square_error.
+            Callbacks get D_calc = None.
+        history_every: int
+            Keep a copy of C and S^T every `history_every` iters (MCAResult.history).
+            None: error curve only
 
         Notes
         -----
@@ -130,6 +158,13 @@ class MultiComponentAnalysis:
         self.c_regressor = c_regressor
         self.st_regressor = st_regressor
 
+        if low_memory and error_function is not mean_square_error:
+            raise ValueError("'low_memory' requires 'error_function' = mean_square_error.")
+        if history_every is not None and history_every < 1:
+            raise ValueError(f"'history_every' must be 1 or greater.\n\tgiven: {history_every}")
+        self.low_memory = low_memory
+        self.history_every = history_every
+
     def fit(self,
             D: np.ndarray,
             C: np.ndarray = None,
@@ -182,6 +217,11 @@ class MultiComponentAnalysis:
         # Both C and ST provided. special_skip_c comes into play below
         both_condition = ST is not None and C is not None and not c_first
 
+        D_norm = np.vdot(D, D) if self.low_memory else None  # ||D||^2
+        # regressor outputs are new arrays, so constraints are applied in place
+        c_constraints = ConstraintPipeline(self.c_constraints)
+        st_constraints = ConstraintPipeline(self.st_constraints)
+
         result = MCAResult()
         result.error = np.zeros(self.max_iters, dtype=np.float64)
         iters_with_increase = 0
@@ -197,21 +237,21 @@ class MultiComponentAnalysis:
                     C_temp[:, c_fix] = C[:, c_fix]
 
                 # Apply c-constraints
-                for constraint in self.c_constraints:
-                    C_temp = constraint.transform(C_temp)
+                C_temp = c_constraints.transform_inplace(C_temp)
 
                 # Apply fixed C's
                 if c_fix:
                     C_temp[:, c_fix] = C[:, c_fix]
 
-                D_calc = np.dot(C_temp, ST)
+                error, D_calc = self._calculate_error(D, C_temp, ST, D_norm)
 
-                if self._check_stopping_half_iter(result, D, D_calc, C_temp, ST, iter_, iters_with_increase):
+                if self._check_stopping_half_iter(result, error, C_temp, ST, iter_, iters_with_increase):
                     break
                 C = C_temp  # self.ST_ = 1 * ST_temp
 
                 if half_step_callback is not None:
                     half_step_callback(C, ST, D, D_calc)
+                del D_calc
 
             if C is not None:
                 ST_temp = self.st_regressor.fit(C, D).T
@@ -221,31 +261,116 @@ class MultiComponentAnalysis:
                     ST_temp[st_fix] = ST[st_fix]
 
                 # Apply ST-constraints
-                for constraint in self.st_constraints:
-                    ST_temp = constraint.transform(ST_temp.T).T
+                ST_temp = st_constraints.transform_inplace(ST_temp.T).T
 
                 # Apply fixed ST's
                 if st_fix:
                     ST_temp[st_fix] = ST[st_fix]
 
-                D_calc = np.dot(C, ST_temp)
+                error, D_calc = self._calculate_error(D, C, ST_temp, D_norm)
 
-                if self._check_stopping_half_iter(result, D, D_calc, C, ST_temp, iter_, iters_with_increase):
+                if self._check_stopping_half_iter(result, error, C, ST_temp, iter_, iters_with_increase):
                     break
                 ST = ST_temp
 
                 if callback is not None:
                     callback(C, ST, D, D_calc)
+                del D_calc
+
+            if self.history_every is not None and iter_ % self.history_every == 0:
+                result.history.append((iter_, np.copy(C), np.copy(ST)))
 
             if self._check_stopping(iter_, result):
-                return result
+                break
         else:
             logger.info('Max iters reached ({}).'.format(self.max_iters + 1))
             result.exit_max_iters_reached = True
 
         result.total_iters = iter_
+        result.error = result.error[:iter_ + 1]
         return result
 
+    def fit_many(self,
+                 D: np.ndarray,
+                 ST: Sequence[np.ndarray] = None,
+                 C: Sequence[np.ndarray] = None,
+                 previous: MCAResult = None,
+                 executor: Executor = None,
+                 abandon_after: int = None,
+                 abandon_tolerance: float = 0.5,
+                 **kwargs
+                 ) -> list[MCAResult]:
+        """
+        Perform MCR-AR from many initial estimates (e.g. from SIMPLISMA, EFA, random) to avoid local minima.
+
+        With `abandon_after`, runs are done in rounds of `abandon_after` iters; after each round, runs whose error is
+        more than (1 + abandon_tolerance) times the best error are stopped (`MCAResult.abandoned`), and the rest
+        continue from their optimal S^T.
+
+        Parameters
+        ----------
+        D:
+            D matrix
+        ST:
+            Initial S^T matrix estimates (a sequence, or stacked in one array [n_estimates, ...])
+        C:
+            Initial C matrix estimates (a sequence, or stacked in one array [n_estimates, ...])
+        previous:
+            Warm start from a previous result (e.g. after new spectra were appended to D); its S^T is added as the
+            first estimate.
+        executor:
+            how runs are split across workers (e.g. `ProcessExecutor()`)
+            default: serial
+        abandon_after:
+            number of iters per round
+            default: no abandonment
+        abandon_tolerance:
+            error increase over the best run (fraction) at which a run is abandoned
+        kwargs:
+            passed to `fit`
+
+        Returns
+        -------
+        results:
+            one per run; ranked best (lowest error) first; abandoned runs last
+        """
+        if executor is None:
+            executor = SerialExecutor()
+        if abandon_after is not None and abandon_after < 1:
+            raise ValueError(f"'abandon_after' must be 1 or greater.\n\tgiven: {abandon_after}")
+
+        starts = []  # (C, ST) of each run
+        if previous is not None:
+            starts.append((None, previous.ST))
+        starts += [(None, np.asanyarray(ST_)) for ST_ in ([] if ST is None else ST)]
+        starts += [(np.asanyarray(C_), None) for C_ in ([] if C is None else C)]
+        if not starts:
+            raise TypeError('C or ST estimates (or previous) must be provided')
+        resume_with_C = kwargs.get("c_fix") is not None and kwargs.get("st_fix") is not None
+
+        D = np.asanyarray(D)
+        results: list[MCAResult | None] = [None] * len(starts)
+        active = list(range(len(starts)))
+        iters_left = self.max_iters
+        while active and iters_left > 0:
+            round_iters = min(abandon_after or iters_left, iters_left)
+            iters_left -= round_iters
+            function = functools.partial(_fit_run, self, round_iters, kwargs, D)
+            round_results = executor.map(function, [starts[i] for i in active])
+            for i, result in zip(active, round_results):
+                results[i] = _merge_results(results[i], result)
+                starts[i] = (results[i].C if resume_with_C else None, results[i].ST)
+
+            active = [i for i in active if results[i].exit_max_iters_reached]  # others converged/stopped
+            best = min(result.min_error for result in results)
+            for i in active:
+                if results[i].min_error > best * (1 + abandon_tolerance):
+                    results[i].abandoned = True
+                    logger.info(f'Run {i} abandoned (error: {results[i].min_error:.4e}, best: {best:.4e}).')
+            active = [i for i in active if not results[i].abandoned]
+
+        return sorted(results, key=lambda result: (result.abandoned, result.min_error))
+
     def _check_stopping(self, current_error_index: int, result: MCAResult):
         # Check if err changed (absolute value), per iter, less than abs(tolerance_error_change)
         if self.tolerance_error_change is not None and current_error_index > 2:
@@ -257,17 +382,23 @@ class MultiComponentAnalysis:
 
         return False
 
+    def _calculate_error(self, D: np.ndarray, C: np.ndarray, ST: np.ndarray, D_norm: float | None) \
+            -> tuple[float, np.ndarray | None]:
+        """ error and D_calc (None in low memory mode) """
+        if self.low_memory:
+            return mean_square_error_gram(D, C, ST, D_norm), None
+
+        D_calc = np.dot(C, ST)
+        return self.error_function(D, D_calc), D_calc
+
     def _check_stopping_half_iter(self,
                                   result: MCAResult,
-                                  D: np.ndarray,
-                                  D_calc: np.ndarray,
+                                  error: float,
                                   C: np.ndarray,
                                   ST: np.ndarray,
                                   iter_: int,
                                   iters_with_increase: int
                                   ) -> bool:
-        # calculate error
-        error = self.error_function(D, D_calc)
         result.error[iter_] = error
 
         # check for tolerance increase
@@ -285,7 +416,7 @@ class MultiComponentAnalysis:
         # iter_above_min
         if self.iters_above_min is not None and iters_with_increase > self.iters_above_min:
             logger.info(f'Stop: Error increased for {iters_with_increase} times.')
-            result.exit_iters_above_min = True
+            result.exit_tolerance_n_above_min = True
             return True
 
         # tolerance_increase
@@ -296,3 +427,36 @@ class MultiComponentAnalysis:
                 return True
 
         return False
+
+
+def _fit_run(
+        mca: MultiComponentAnalysis,
+        max_iters: int,
+        kwargs: dict,
+        D: np.ndarray,
+        start: tuple[np.ndarray | None, np.ndarray | None]
+) -> MCAResult:
+    """ fit one run from (C, ST) (runs in a worker); constraints are copied too as some keep state between calls """
+    mca = copy.deepcopy(mca)
+    mca.max_iters = max_iters
+    C, ST = start
+    return mca.fit(D, C=C, ST=ST, **kwargs)
+
+
+def _merge_results(previous: MCAResult | None, result: MCAResult) -> MCAResult:
+    """ append a result that continued from `previous` """
+    if previous is None:
+        return result
+
+    offset = previous.total_iters + 1
+    if result.min_error < previous.min_error:
+        previous.C = result.C
+        previous.ST = result.ST
+        previous.optimal_iter = result.optimal_iter + offset
+    previous.error = np.concatenate((previous.error, result.error))
+    previous.history += [(iter_ + offset, C, ST) for iter_, C, ST in result.history]
+    previous.total_iters = offset + result.total_iters
+    for name in ("exit_max_iters_reached", "exit_tolerance_increase", "exit_tolerance_n_increase",
+                 "exit_tolerance_error_change", "exit_tolerance_n_above_min"):
+        setattr(previous, name, getattr(result, name))
+    return previous
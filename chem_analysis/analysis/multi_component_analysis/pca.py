@@ -0,0 +1,244 @@
+"""
+Principal component analysis by randomized SVD (Halko, Martinsson, Tropp).
+
+Only the first few components are computed, so it is much faster and lighter than a full SVD of D. When D is memory
+mapped (np.memmap, or a view of a memory mapped file, e.g. `SignalArray.from_file(..., mmap_mode="r")`), larger
+than `CHUNK_MEMORY`, or `chunk_rows` is given, D is only ever read in blocks of rows (out-of-core), so it never has
+to fit in memory; each power iteration is two passes over D.
+
+N. Halko, P. G. Martinsson, J. A. Tropp, SIAM Rev. 53 (2011) 217-288. https://doi.org/10.1137/090771806
+"""
+import logging
+
+import numpy as np
+from scipy.linalg import qr, svd
+
+from chem_analysis.base_obj.signal_array import SignalArray
+from chem_analysis.utils.npy_dir_format import CHUNK_MEMORY, get_chunk_rows, is_memory_mapped
+
+logger = logging.getLogger(__name__)
+
+
+class ResultPCA:
+    """
+    Attributes
+    ----------
+    U: ndarray [n_samples, n_components]
+        left singular vectors
+    singular_values: ndarray [n_components]
+    VT: ndarray [n_components, n_features]
+        right singular vectors (principal components)
+    mean: ndarray [n_features] | None
+        column mean subtracted before the SVD (None if not centered)
+    total_variance: float
+        sum of squares of (centered) D; all components together
+    shape: tuple[int, int]
+        shape of D
+    """
+    def __init__(self,
+                 U: np.ndarray,
+                 singular_values: np.ndarray,
+                 VT: np.ndarray,
+                 mean: np.ndarray | None,
+                 total_variance: float,
+                 shape: tuple[int, int]
+                 ):
+        self.U = U
+        self.singular_values = singular_values
+        self.VT = VT
+        self.mean = mean
+        self.total_variance = total_variance
+        self.shape = shape
+
+    def __repr__(self):
+        return f"ResultPCA: {len(self.singular_values)} components " \
+               f"(explained variance: {np.sum(self.explained_variance_ratio):.4f})"
+
+    @property
+    def number_of_components(self) -> int:
+        return len(self.singular_values)
+
+    @property
+    def scores(self) -> np.ndarray:
+        """ D projected onto the components; shape: [n_samples, n_components] """
+        return self.U * self.singular_values
+
+    @property
+    def explained_variance(self) -> np.ndarray:
+        """ sum of squares explained by each component """
+        return self.singular_values ** 2
+
+    @property
+    def explained_variance_ratio(self) -> np.ndarray:
+        if self.total_variance == 0:
+            return np.zeros_like(self.singular_values)
+        return self.explained_variance / self.total_variance
+
+    def estimate_number_of_components(self, method: str = "ind", threshold: float = 0.99) -> int:
+        """
+        Estimate the number of significant components.
+
+        Parameters
+        ----------
+        method:
+            "ind": minimum of Malinowski's indicator function (no parameters; needs the noise to be random)
+            "variance": fewest components whose explained variance ratio adds up to 'threshold'
+        threshold:
+            for method="variance"
+
+        Returns
+        -------
+        number_of_components:
+            at most the number of components calculated (minus 1 for "ind")
+        """
+        if method == "variance":
+            cumulative = np.cumsum(self.explained_variance_ratio)
+            return int(min(np.searchsorted(cumulative, threshold) + 1, self.number_of_components))
+        if method == "ind":
+            return int(np.argmin(self.indicator_function()) + 1)
+
+        raise ValueError(f"Invalid 'method'.\n\tgiven: {method}\n\toptions: 'ind', 'variance'")
+
+    def indicator_function(self) -> np.ndarray:
+        """
+        Malinowski's indicator function for 1 to (n_components - 1) components; minimum at the number of
+        significant components. Eigenvalues not calculated are accounted for through the total variance.
+
+        E. R. Malinowski, Anal. Chem. 49 (1977) 612-617. https://doi.org/10.1021/ac50012a027
+        """
+        rows, columns = max(self.shape), min(self.shape)
+        n = np.arange(1, self.number_of_components)
+        residual = self.total_variance - np.cumsum(self.explained_variance)[:-1]
+        real_error = np.sqrt(np.maximum(residual, 0) / (rows * (columns - n)))
+        return real_error / (columns - n) ** 2
+
+    def get_ST(self, number_of_components: int = None) -> np.ndarray:
+        """
+        Initial S^T estimates for `MultiComponentAnalysis.fit`: the principal components with the sign that makes
+        them mostly positive, and negative values set to zero.
+
+        Parameters
+        ----------
+        number_of_components:
+            default: `estimate_number_of_components()`
+
+        Returns
+        -------
+        ST:
+            shape: [number_of_components, n_features]
+        """
+        if number_of_components is None:
+            number_of_components = self.estimate_number_of_components()
+        if not 1 <= number_of_components <= self.number_of_components:
+            raise ValueError(f"'number_of_components' must be between 1 and {self.number_of_components}."
+                             f"\n\tgiven: {number_of_components}")
+
+        ST = self.VT[:number_of_components].copy()
+        signs = np.sign(np.sum(ST, axis=1))
+        signs[signs == 0] = 1
+        ST *= signs[:, np.newaxis]
+        np.maximum(ST, 0, out=ST)
+        return ST
+
+
+def _column_stats(D: np.ndarray, chunk_rows: int) -> tuple[np.ndarray, float]:
+    """ column sums and total sum of squares (one pass) """
+    sums = np.zeros(D.shape[1])
+    sum_squares = 0.0
+    for start in range(0, D.shape[0], chunk_rows):
+        block = np.asarray(D[start:start + chunk_rows], dtype=np.float64)
+        sums += np.sum(block, axis=0)
+        sum_squares += np.vdot(block, block)
+    return sums, sum_squares
+
+
+def _matmul(D: np.ndarray, B: np.ndarray, mean: np.ndarray | None, chunk_rows: int) -> np.ndarray:
+    """ (D - mean) @ B, reading D in blocks of rows """
+    out = np.empty((D.shape[0], B.shape[1]))
+    for start in range(0, D.shape[0], chunk_rows):
+        out[start:start + chunk_rows] = np.asarray(D[start:start + chunk_rows], dtype=np.float64) @ B
+    if mean is not None:
+        out -= mean @ B
+    return out
+
+
+def _rmatmul(D: np.ndarray, Q: np.ndarray, mean: np.ndarray | None, chunk_rows: int) -> np.ndarray:
+    """ (D - mean).T @ Q, reading D in blocks of rows """
+    out = np.zeros((D.shape[1], Q.shape[1]))
+    for start in range(0, D.shape[0], chunk_rows):
+        out += np.asarray(D[start:start + chunk_rows], dtype=np.float64).T @ Q[start:start + chunk_rows]
+    if mean is not None:
+        out -= np.outer(mean, np.sum(Q, axis=0))
+    return out
+
+
+def randomized_svd(
+        D: np.ndarray | SignalArray,
+        number_of_components: int = 10,
+        center: bool = False,
+        number_oversamples: int = 10,
+        number_power_iterations: int = 4,
+        chunk_rows: int = None,
+        processed: bool = True,
+        seed: int = None
+) -> ResultPCA:
+    """
+    Truncated SVD/PCA of D by random projection.
+
+    Parameters
+    ----------
+    D:
+        data; shape [n_samples, n_features] (a SignalArray uses its data)
+    number_of_components:
+        number of singular values/vectors to calculate
+    center:
+        subtract the mean of each column first (PCA); MCA uses the un-centered data (False)
+    number_oversamples:
+        extra random vectors (improves accuracy)
+    number_power_iterations:
+        power iterations (improves accuracy when singular values decay slowly); each is two passes over D
+    chunk_rows:
+        read D in blocks of this many rows (out-of-core)
+        default: blocks of `CHUNK_MEMORY` for memory-mapped D or D larger than `CHUNK_MEMORY`; all at once otherwise
+    processed:
+        SignalArray only; True: use processed data; False: use raw data
+    seed:
+        seed for the random projection
+
+    Returns
+    -------
+    result:
+        singular values/vectors, explained variance and component estimates
+    """
+    if isinstance(D, SignalArray):
+        D = D.data if processed else D.data_raw
+    if D.ndim != 2:
+        raise ValueError(f"'D' must be 2D.\n\tgiven shape: {D.shape}")
+    number_of_components = min(number_of_components, *D.shape)
+    if number_of_components < 1:
+        raise ValueError(f"'number_of_components' must be 1 or greater.\n\tgiven: {number_of_components}")
+    if chunk_rows is None:
+        out_of_core = is_memory_mapped(D) or D.nbytes > CHUNK_MEMORY
+        chunk_rows = get_chunk_rows(D.shape[1], 8) if out_of_core else max(D.shape[0], 1)
+
+    sums, sum_squares = _column_stats(D, chunk_rows)
+    if center:
+        mean = sums / D.shape[0]
+        total_variance = sum_squares - D.shape[0] * np.vdot(mean, mean)
+    else:
+        mean = None
+        total_variance = sum_squares
+
+    rng = np.random.default_rng(seed)
+    size = min(number_of_components + number_oversamples, *D.shape)
+    Q, _ = qr(_matmul(D, rng.standard_normal((D.shape[1], size)), mean, chunk_rows), mode="economic")
+    for _ in range(number_power_iterations):
+        Z, _ = qr(_rmatmul(D, Q, mean, chunk_rows), mode="economic")
+        Q, _ = qr(_matmul(D, Z, mean, chunk_rows), mode="economic")
+
+    B = _rmatmul(D, Q, mean, chunk_rows).T  # Q^T D; shape [size, n_features]
+    U_B, singular_values, VT = svd(B, full_matrices=False)
+    U = Q @ U_B[:, :number_of_components]
+
+    return ResultPCA(U, singular_values[:number_of_components], VT[:number_of_components], mean,
+                     float(total_variance), D.shape)
@@ -1,9 +1,12 @@
 import abc
+import logging
 
 import numpy as np
-from scipy.linalg import lstsq
+from scipy.linalg import eigh, lstsq, solve, LinAlgError
 from scipy.optimize import nnls
 
+logger = logging.getLogger(__name__)
+
 
 class LinearRegressor(abc.ABC):
     """ Abstract class for linear regression methods """
@@ -59,3 +62,160 @@ class NonNegativeLeastSquares(LinearRegressor):
             x = x.T  # The transposed form of X. This is the formalism of scikit-learn
 
         return x
+
+
+class FastNonNegativeLeastSquares(LinearRegressor):
+    """
+    Non-negative constrained least squares regression for many right-hand sides at once
+
+    argmin_x || Ax - b ||_2 for x>=0
+
+    Block principal pivoting (Kim & Park). A^T A and A^T B are computed once and shared by every column of B;
+    columns with the same passive set are solved together with one factorization. Same solution as
+    `NonNegativeLeastSquares`, but much faster when B has many columns. Rank deficient A, and columns that reach
+    'max_iter', are solved with `scipy.optimize.nnls` (see `nnls_gram`).
+
+    J. Kim, H. Park, SIAM J. Sci. Comput. 33 (2011) 3261-3281. https://doi.org/10.1137/110821172
+
+    """
+    def __init__(self, max_iter: int = None, tolerance: float = 1e-12):
+        """
+
+        Parameters
+        ----------
+        max_iter:
+            maximum number of pivoting iterations
+            default: 5 * number of columns of A
+        tolerance:
+            relative tolerance for a value to count as negative
+        """
+        super().__init__()
+        self.max_iter = max_iter
+        self.tolerance = tolerance
+
+    def fit(self, A: np.ndarray, b: np.ndarray) -> np.ndarray:
+        """ AX = B, solve for X """
+        if b.ndim == 1:
+            return self.fit(A, b[:, np.newaxis])[0]
+
+        AtA = A.T @ A
+        AtB = A.T @ b
+        return nnls_gram(AtA, AtB, self.max_iter, self.tolerance).T  # The transposed form of X
+
+
+def _solve_passive(AtA: np.ndarray, AtB: np.ndarray, passive: np.ndarray, columns: np.ndarray) -> np.ndarray:
+    """ unconstrained solutions restricted to the passive set of each column; columns with the same set together """
+    k = AtA.shape[0]
+    x = np.zeros((k, len(columns)))
+    patterns, group = np.unique(passive[:, columns].T, axis=0, return_inverse=True)
+    for i, pattern in enumerate(patterns):
+        if not np.any(pattern):
+            continue
+        in_group = np.flatnonzero(group.reshape(-1) == i)
+        rows = np.flatnonzero(pattern)
+        AtA_ = AtA[np.ix_(rows, rows)]
+        AtB_ = AtB[np.ix_(rows, columns[in_group])]
+        try:
+            x[np.ix_(rows, in_group)] = solve(AtA_, AtB_, assume_a="pos", check_finite=False)
+        except LinAlgError:  # rank deficient
+            x[np.ix_(rows, in_group)] = lstsq(AtA_, AtB_, check_finite=False)[0]
+    return x
+
+
+def _nnls_gram_active_set(AtA: np.ndarray, AtB: np.ndarray, eig: tuple[np.ndarray, np.ndarray] = None) \
+        -> np.ndarray:
+    """
+    `scipy.optimize.nnls` (active set) of each column from the normal equations; works for rank deficient A^T A.
+    With A^T A = V W V^T, M = W^(1/2) V^T and d = W^(-1/2) V^T A^T b (zero eigenvalues dropped):
+    ||M x - d||^2 = ||A x - b||^2 - constant, as A^T b is in the range of A^T A.
+    """
+    w, v = eigh(AtA, check_finite=False) if eig is None else eig
+    keep = w > w[-1] * AtA.shape[0] * np.finfo(np.float64).eps
+    x = np.zeros(AtB.shape)
+    if not np.any(keep):  # A = 0
+        return x
+
+    sqrt_w = np.sqrt(w[keep])
+    M = sqrt_w[:, np.newaxis] * v[:, keep].T
+    d = (v[:, keep].T @ AtB) / sqrt_w[:, np.newaxis]
+    for i in range(AtB.shape[1]):
+        x[:, i] = nnls(M, d[:, i])[0]
+    return x
+
+
+def nnls_gram(AtA: np.ndarray, AtB: np.ndarray, max_iter: int = None, tolerance: float = 1e-12) -> np.ndarray:
+    """
+    Non-negative least squares for many right-hand sides from the normal equations (block principal pivoting).
+    Rank deficient A^T A, and columns not solved within 'max_iter', are solved with `scipy.optimize.nnls`
+    (see `_nnls_gram_active_set`).
+
+    Parameters
+    ----------
+    AtA:
+        A^T A; shape: [k, k]
+    AtB:
+        A^T B; shape: [k, n]
+    max_iter:
+        maximum number of pivoting iterations
+        default: 5 * k
+    tolerance:
+        relative tolerance for a value to count as negative
+
+    Returns
+    -------
+    X:
+        shape: [k, n]
+    """
+    k, n = AtB.shape
+    if max_iter is None:
+        max_iter = 5 * max(k, 1)
+    threshold = -tolerance * max(np.max(np.abs(AtB), initial=0), np.finfo(np.float64).tiny)
+
+    eig = eigh(AtA, check_finite=False)
+    if eig[0][0] <= eig[0][-1] * k * np.finfo(np.float64).eps:  # rank deficient; pivoting may not terminate
+        logger.debug("nnls_gram: A^T A is rank deficient; solved with scipy.optimize.nnls.")
+        return _nnls_gram_active_set(AtA, AtB, eig)
+
+    passive = np.zeros((k, n), dtype=bool)
+    x = np.zeros((k, n))
+    y = -AtB.copy()  # gradient (A^T A x - A^T b)
+    n_infeasible_best = np.full(n, k + 1)  # fewest infeasible variables seen in each column
+    backup = np.full(n, 3)  # full exchanges allowed without improvement before single exchanges
+
+    for _ in range(max_iter):
+        infeasible = (passive & (x < threshold)) | (~passive & (y < threshold))
+        n_infeasible = np.count_nonzero(infeasible, axis=0)
+        columns = np.flatnonzero(n_infeasible)
+        if len(columns) == 0:
+            break
+
+        # full exchange while the number of infeasible variables decreases (or backup remains); otherwise exchange
+        # only the last infeasible variable (guarantees finite termination)
+        improved = n_infeasible[columns] < n_infeasible_best[columns]
+        n_infeasible_best[columns[improved]] = n_infeasible[columns[improved]]
+        backup[columns[improved]] = 3
+        use_backup = ~improved & (backup[columns] >= 1)
+        backup[columns[use_backup]] -= 1
+        full = columns[improved | use_backup]
+        single = columns[~(improved | use_backup)]
+
+        passive[:, full] ^= infeasible[:, full]
+        if len(single) > 0:
+            last = k - 1 - np.argmax(infeasible[::-1, single], axis=0)
+            passive[last, single] ^= True
+
+        x_columns = _solve_passive(AtA, AtB, passive, columns)
+        y_columns = AtA @ x_columns - AtB[:, columns]
+        y_columns[passive[:, columns]] = 0
+        x[:, columns] = x_columns
+        y[:, columns] = y_columns
+    else:
+        infeasible = (passive & (x < threshold)) | (~passive & (y < threshold))
+        columns = np.flatnonzero(np.any(infeasible, axis=0))
+        if len(columns) > 0:
+            logger.debug(f"nnls_gram: max_iter ({max_iter}) reached for {len(columns)} columns; solved with "
+                         f"scipy.optimize.nnls.")
+            x[:, columns] = _nnls_gram_active_set(AtA, AtB[:, columns], eig)
+
+    np.maximum(x, 0, out=x)
+    return x
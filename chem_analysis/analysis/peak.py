@@ -1,9 +1,11 @@
 import abc
 from collections import OrderedDict
 import dataclasses
+from typing import Sequence
+import weakref
+
 import numpy as np
 
-import chem_analysis.utils.math as general_math
 from chem_analysis.utils.printing_tables import StatsTable, apply_sig_figs
 
 
@@ -94,80 +96,299 @@ class PeakStats:
         asymmetry factor; distance from the center line of the peak to the back slope divided by the distance from the
         center line of the peak to the front slope;
         >1 tailing to larger values; <1 tailing to smaller numbers
+
+    All stats are calculated together (see `get_peak_stats`) the first time one is needed, and cached until the
+    bounds of the peak change or the signal the peak is in is processed again (a new y array). Call `clear_cache`
+    after editing the y of the signal in place.
     """
+    fields = ("max_loc", "max_value", "mean", "std", "skew", "kurtosis", "fwhm", "asym", "area")
+
     def __init__(self, parent: Peak):
         self.parent = parent
-        self._y_norm = None
+        self._values = None
+        self._key = None
+        self._source: weakref.ref | None = None
+
+    def _get_key(self) -> tuple | None:
+        bounds = getattr(self.parent, "bounds", None)
+        if bounds is None:
+            return None
+        return bounds.start, bounds.stop
+
+    def _get_source(self) -> np.ndarray | None:
+        """ y of the signal the peak is in (processing the signal again gives a new array) """
+        signal = getattr(self.parent, "parent", None)
+        return None if signal is None else signal.y
+
+    def _set_key(self):
+        self._key = self._get_key()
+        source = self._get_source()
+        self._source = None if source is None else weakref.ref(source)
+
+    def _is_cached(self) -> bool:
+        if self._values is None or self._get_key() != self._key:
+            return False
+        source = self._get_source()
+        if source is None:
+            return True
+        return self._source is not None and self._source() is source
 
-    def _get_y_norm(self) -> np.ndarray:
-        if self._y_norm is None:
-            self._y_norm = self.parent.y/np.trapz(x=self.parent.x, y=self.parent.y)
+    @property
+    def values(self) -> np.void:
+        """ all stats as a structured numpy record (dtype: STATS_DTYPE) """
+        if not self._is_cached():
+            self._values = get_peak_stats(self.parent.x, self.parent.y)[0]
+            self._set_key()
+        return self._values
 
-        return self._y_norm
+    def set_values(self, values: np.void):
+        """ set stats calculated for many peaks at once (see `get_peak_stats_array`) """
+        self._values = values
+        self._set_key()
 
-    # @property
-    # def min_value(self) -> float:
-    #     return np.min(self.parent.y)
-    #
-    # @property
-    # def min_index(self) -> int:
-    #     return int(np.argmin(self.parent.y))
-    #
-    # @property
-    # def min_location(self) -> float:
-    #     return self.parent.x[self.min_index]
+    def clear_cache(self):
+        self._values = None
 
     @property
     def max_loc(self) -> float:
-        return self.parent.x[int(np.argmax(self.parent.y))]
+        return float(self.values["max_loc"])
 
     @property
     def max_value(self) -> float:
-        return np.max(self.parent.y)
+        return float(self.values["max_value"])
 
     @property
     def mean(self) -> float:
-        return general_math.get_mean_of_pdf(self.parent.x, y_norm=self._get_y_norm())
+        return float(self.values["mean"])
 
     @property
-    def std(self):
-        return general_math.get_standard_deviation_of_pdf(self.parent.x, y_norm=self._get_y_norm(), mean=self.mean)
+    def std(self) -> float:
+        return float(self.values["std"])
 
     @property
-    def skew(self):
-        return general_math.get_skew_of_pdf(self.parent.x, y_norm=self._get_y_norm(), mean=self.mean,
-                                            standard_deviation=self.std)
+    def skew(self) -> float:
+        return float(self.values["skew"])
 
     @property
-    def kurtosis(self):
-        return general_math.get_kurtosis_of_pdf(self.parent.x, y_norm=self._get_y_norm(), mean=self.mean,
-                                                standard_deviation=self.std)
+    def kurtosis(self) -> float:
+        return float(self.values["kurtosis"])
 
     @property
-    def fwhm(self):
+    def fwhm(self) -> float:
         """full_width_half_max"""
-        return general_math.get_full_width_at_height(x=self.parent.x, y=self.parent.y, height=0.5)
+        return float(self.values["fwhm"])
 
     @property
-    def asym(self):
+    def asym(self) -> float:
         """asymmetry_factor"""
-        return general_math.get_asymmetry_factor(x=self.parent.x, y=self.parent.y, height=0.1)
+        return float(self.values["asym"])
 
     @property
-    def area(self, x: np.ndarray = None) -> float:
-        if x is None:
-            x = self.parent.x
-        return np.trapz(x=x, y=self.parent.y)
+    def area(self) -> float:
+        return float(self.values["area"])
 
     def get_stats(self) -> OrderedDict:
-        dict_ = OrderedDict()
-        properties = [attr for attr in self.__dir__() if not attr.startswith("_")]
-        properties.remove("parent")
-        properties.remove("get_stats")
-        properties.remove("stats_table")
-        for stat in properties:
-            dict_[stat] = getattr(self, stat)
-        return dict_
+        values = self.values
+        return OrderedDict((name, float(values[name])) for name in self.fields)
 
     def stats_table(self) -> StatsTable:
         return StatsTable.from_dict(self.get_stats())
+
+
+STATS_DTYPE = np.dtype([(name, np.float64) for name in PeakStats.fields])
+
+
+def get_peak_stats(x: np.ndarray, y: np.ndarray, bounds: Sequence[slice] = None) -> np.ndarray:
+    """
+    Calculate the stats of many peaks of one signal at once.
+
+    Every peak is a slice of the same x/y (slices may have different lengths and may overlap). Areas and moments
+    are trapezoid integrals (same as `np.trapz`) done as weighted sums over all peaks together.
+
+    Parameters
+    ----------
+    x:
+        x values of the signal
+    y:
+        y values of the signal
+    bounds:
+        slice of each peak
+        default: one peak of the whole signal
+
+    Returns
+    -------
+    stats:
+        shape: [n_peaks]
+        dtype: STATS_DTYPE
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if bounds is None:
+        bounds = [slice(None)]
+
+    starts, stops = np.empty(len(bounds), dtype=np.intp), np.empty(len(bounds), dtype=np.intp)
+    for i, bound in enumerate(bounds):
+        starts[i], stops[i], _ = bound.indices(len(x))
+    lengths = np.maximum(stops - starts, 0)
+
+    stats = np.full(len(bounds), np.nan, dtype=STATS_DTYPE)
+    valid = lengths > 0
+    if not np.any(valid):
+        return stats
+    starts, stops, lengths = starts[valid], stops[valid], lengths[valid]
+
+    # flatten peaks into one ragged array
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    peak_id = np.repeat(np.arange(len(lengths)), lengths)
+    index = np.arange(np.sum(lengths)) - offsets[peak_id] + starts[peak_id]
+    x_peaks = x[index]
+    y_peaks = y[index]
+
+    # trapezoid weights: half the distance between neighbors (half interval at the ends of each peak)
+    weights = (x[np.minimum(index + 1, stops[peak_id] - 1)] - x[np.maximum(index - 1, starts[peak_id])]) / 2
+    weighted_y = weights * y_peaks
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        area = np.add.reduceat(weighted_y, offsets)
+        mean = np.add.reduceat(weighted_y * x_peaks, offsets) / area
+        weighted_y_norm = weighted_y / area[peak_id]
+        distance = x_peaks - mean[peak_id]
+        distance_2 = distance ** 2
+        variance = np.add.reduceat(weighted_y_norm * distance_2, offsets)
+        std = np.sqrt(variance)
+        skew = np.add.reduceat(weighted_y_norm * distance_2 * distance, offsets) / std ** 3
+        kurtosis = np.add.reduceat(weighted_y_norm * distance_2 ** 2, offsets) / variance ** 2 - 3
+
+    max_value = np.maximum.reduceat(y_peaks, offsets)
+    max_positions = np.flatnonzero(y_peaks == max_value[peak_id])
+    _, first = np.unique(peak_id[max_positions], return_index=True)  # first max of each peak
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        lower, upper, middle = _get_width_at(x_peaks, y_peaks, peak_id, offsets, lengths, max_value, 0.5)
+        fwhm = np.abs(upper - lower)
+        lower, upper, middle = _get_width_at(x_peaks, y_peaks, peak_id, offsets, lengths, max_value, 0.1)
+        asym = (upper - middle) / (middle - lower)
+
+    stats_valid = stats[valid]
+    stats_valid["max_loc"] = x_peaks[max_positions[first]]
+    stats_valid["max_value"] = max_value
+    stats_valid["mean"] = mean
+    stats_valid["std"] = std
+    stats_valid["skew"] = skew
+    stats_valid["kurtosis"] = kurtosis
+    stats_valid["fwhm"] = fwhm
+    stats_valid["asym"] = asym
+    stats_valid["area"] = area
+    stats[valid] = stats_valid
+    return stats
+
+
+def _get_width_at(
+        x_peaks: np.ndarray,
+        y_peaks: np.ndarray,
+        peak_id: np.ndarray,
+        offsets: np.ndarray,
+        lengths: np.ndarray,
+        max_value: np.ndarray,
+        height: float
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Vectorized `chem_analysis.utils.math.get_width_at` (and x of the max) for every peak of a ragged array.
+
+    The crossing of `height * max_value` on each side of the first max is linearly interpolated between the two
+    points around it. If a side never drops below the height, it is extrapolated with a line fit (x on y) of the
+    points at that end, and a peak with its max at the first point gives (0, 0).
+
+    Returns
+    -------
+    lower:
+        shape: [n_peaks]
+    upper:
+        shape: [n_peaks]
+    middle:
+        x of the max
+        shape: [n_peaks]
+    """
+    position = np.arange(len(x_peaks))
+    local = position - offsets[peak_id]
+    last = offsets + lengths - 1
+
+    # low to high x in every peak (same as `check_for_flip`)
+    flip = x_peaks[offsets] > x_peaks[last]
+    order = np.where(flip[peak_id], last[peak_id] - local, position)
+    x_peaks, y_peaks = x_peaks[order], y_peaks[order]
+
+    max_positions = np.flatnonzero(y_peaks == max_value[peak_id])
+    _, first = np.unique(peak_id[max_positions], return_index=True)
+    index_max = max_positions[first]
+    middle = x_peaks[index_max]
+
+    threshold = max_value * height
+    below = y_peaks < threshold[peak_id]
+    before_max = position < index_max[peak_id]
+    index_low = np.maximum.reduceat(np.where(below & before_max, position, -1), offsets)
+    index_high = np.minimum.reduceat(np.where(below & ~before_max, position, len(position)), offsets)
+    has_low = index_low >= 0
+    has_high = index_high < len(position)
+
+    # interpolate between the last point below and the point after it (first point below and the one before it)
+    i0 = np.where(has_low, index_low, offsets)
+    i1 = np.minimum(i0 + 1, last)
+    lower = x_peaks[i0] + (threshold - y_peaks[i0]) * (x_peaks[i1] - x_peaks[i0]) / (y_peaks[i1] - y_peaks[i0])
+    i1 = np.where(has_high, index_high, last)
+    i0 = np.maximum(i1 - 1, offsets)
+    upper = x_peaks[i0] + (threshold - y_peaks[i0]) * (x_peaks[i1] - x_peaks[i0]) / (y_peaks[i1] - y_peaks[i0])
+
+    # no crossing on a side: line fit (x on y) of the 'n_fit' points at that end
+    n_fit = np.maximum(3, (index_max - offsets) // 10)
+    if not np.all(has_low):
+        fit = _fit_x_at(x_peaks, y_peaks, local < n_fit[peak_id], offsets, threshold)
+        lower = np.where(has_low, lower, fit)
+    if not np.all(has_high):
+        fit = _fit_x_at(x_peaks, y_peaks, local >= (lengths - n_fit)[peak_id], offsets, threshold)
+        upper = np.where(has_high, upper, fit)
+
+    at_start = index_max == offsets
+    lower = np.where(at_start, 0, lower)
+    upper = np.where(at_start, 0, upper)
+    return lower, upper, middle
+
+
+def _fit_x_at(x_peaks: np.ndarray, y_peaks: np.ndarray, mask: np.ndarray, offsets: np.ndarray, y_at: np.ndarray) \
+        -> np.ndarray:
+    """ least squares line (x on y) of the masked points of every peak, evaluated at 'y_at' """
+    n = np.add.reduceat(mask.astype(np.float64), offsets)
+    sum_x = np.add.reduceat(np.where(mask, x_peaks, 0), offsets)
+    sum_y = np.add.reduceat(np.where(mask, y_peaks, 0), offsets)
+    sum_xy = np.add.reduceat(np.where(mask, x_peaks * y_peaks, 0), offsets)
+    sum_yy = np.add.reduceat(np.where(mask, y_peaks ** 2, 0), offsets)
+    slope = (n * sum_xy - sum_x * sum_y) / (n * sum_yy - sum_y ** 2)
+    return (sum_x + slope * (n * y_at - sum_y)) / n
+
+
+def get_peak_stats_array(peaks: Sequence[Peak]) -> np.ndarray:
+    """
+    Calculate stats for many peaks; peaks bounded on the same parent are calculated together.
+    Stats are cached on each peak (`peak.stats`).
+
+    Returns
+    -------
+    stats:
+        shape: [n_peaks]
+        dtype: STATS_DTYPE
+    """
+    stats = np.empty(len(peaks), dtype=STATS_DTYPE)
+    groups: dict[int, list[int]] = {}
+    for i, peak in enumerate(peaks):
+        if isinstance(peak, PeakBounded):
+            groups.setdefault(id(peak.parent), []).append(i)
+        else:
+            stats[i] = peak.stats.values
+
+    for indexes in groups.values():
+        parent = peaks[indexes[0]].parent
+        stats[indexes] = get_peak_stats(parent.x, parent.y, [peaks[i].bounds for i in indexes])
+        for i in indexes:
+            peaks[i].stats.set_values(stats[i])
+
+    return stats
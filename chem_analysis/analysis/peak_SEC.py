@@ -151,8 +151,29 @@ class PeakStatsSEC(PeakStats):
 
     """
 
+    mw_fields = ("mw_max", "mw_mean", "mw_std", "mw_skew", "mw_kurtosis", "mw_fwhm", "mw_asym")
+
     def __init__(self, parent: PeakSEC):
         super().__init__(parent)
+        self._mw_moments = None
+        self._mw_key = None
+
+    def _get_mw_moments(self) -> tuple[float, float, float, float]:
+        """ mean, std, skew, kurtosis of molecular weight distribution (calculated together and cached) """
+        key = self._get_key()
+        if self._mw_moments is None or key != self._mw_key:
+            mw_i, x_i = self.parent.mw_i, self.parent.x_i
+            mean = general_math.get_mean_of_pdf(mw_i, y_norm=x_i)
+            std = general_math.get_standard_deviation_of_pdf(mw_i, y_norm=x_i, mean=mean)
+            skew = general_math.get_skew_of_pdf(mw_i, y_norm=x_i, mean=mean, standard_deviation=std)
+            kurtosis = general_math.get_kurtosis_of_pdf(mw_i, y_norm=x_i, mean=mean, standard_deviation=std)
+            self._mw_moments = (mean, std, skew, kurtosis)
+            self._mw_key = key
+        return self._mw_moments
+
+    def clear_cache(self):
+        super().clear_cache()
+        self._mw_moments = None
 
     @property
     def mw_max(self) -> float:
@@ -160,21 +181,19 @@ class PeakStatsSEC(PeakStats):
 
     @property
     def mw_mean(self) -> float:
-        return general_math.get_mean_of_pdf(self.parent.mw_i, y_norm=self.parent.x_i)
+        return self._get_mw_moments()[0]
 
     @property
     def mw_std(self):
-        return general_math.get_standard_deviation_of_pdf(self.parent.mw_i, y_norm=self.parent.x_i, mean=self.mw_mean)
+        return self._get_mw_moments()[1]
 
     @property
     def mw_skew(self):
-        return general_math.get_skew_of_pdf(self.parent.mw_i, y_norm=self.parent.x_i, mean=self.mw_mean,
-                                            standard_deviation=self.mw_std)
+        return self._get_mw_moments()[2]
 
     @property
     def mw_kurtosis(self):
-        return general_math.get_kurtosis_of_pdf(self.parent.mw_i, y_norm=self.parent.x_i, mean=self.mw_mean,
-                                                standard_deviation=self.mw_std)
+        return self._get_mw_moments()[3]
 
     @property
     def mw_fwhm(self):
@@ -185,3 +204,8 @@ class PeakStatsSEC(PeakStats):
     def mw_asym(self):
         """mw_asymmetry_factor"""
         return general_math.get_asymmetry_factor(x=self.parent.mw_i, y=self.parent.x_i, height=0.1)
+
+    def get_stats(self) -> OrderedDict:
+        dict_ = OrderedDict((name, getattr(self, name)) for name in self.mw_fields)
+        dict_.update(super().get_stats())
+        return dict_
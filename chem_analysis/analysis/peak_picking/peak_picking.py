@@ -34,7 +34,7 @@ class ResultPeakPicking:
         headers = ["peak #", "index", "x", "y"]
         rows = []
         for i, index_ in enumerate(self.indexes):
-            rows.append([i, index_, self.signal.x[i], self.signal.y[i]])
+            rows.append([i, index_, self.signal.x[index_], self.signal.y[index_]])
         return StatsTable(rows, headers)
 
 
@@ -43,14 +43,14 @@ class ResultPeakPickingArray:
         self.array = array
         self.results: list[ResultPeakPicking] = []
 
-    def stats(self):
+    def stats(self) -> StatsTable | None:
         table = None
         for result in self.results:
             if table is None:
                 table = result.stats()
             else:
                 table.join(result.stats())
-        return
+        return table
 
 
 def apply_limits(signal, result: ResultPeakPicking):
@@ -64,7 +64,7 @@ def apply_limits(signal, result: ResultPeakPicking):
         result.indexes = np.delete(result.indexes, remove_index)
 
 
-@wraps(find_peaks)  # TODO: add support for signal array
+@wraps(find_peaks)  # for SignalArray see `chem_analysis.analysis.peaks_array.find_peaks_array`
 def scipy_find_peaks(signal: Signal, ignore_limits: bool = False, weights: DataWeight = None, **kwargs) \
         -> ResultPeakPicking:
     if weights is not None:
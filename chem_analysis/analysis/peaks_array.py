@@ -0,0 +1,152 @@
+"""
+Peak picking, boundary detection and peak stats over every row of a SignalArray in one call.
+
+Results are columnar (one structured numpy array with a row per peak) rather than a Python object per peak.
+"""
+import functools
+import logging
+
+import numpy as np
+from scipy.signal import find_peaks
+
+from chem_analysis.analysis.peak import STATS_DTYPE, get_peak_stats
+from chem_analysis.analysis.boundary_detection.boundary_detection import rolling_ball_bounds, check_end_points
+from chem_analysis.base_obj.signal_array import SignalArray
+from chem_analysis.processing.executors import Executor, SerialExecutor
+from chem_analysis.utils.printing_tables import StatsTable
+
+logger = logging.getLogger("chem_analysis.peaks_array")
+
+PEAKS_ARRAY_DTYPE = np.dtype(
+    [("row", np.int64), ("peak", np.int64), ("time", np.float64), ("index", np.int64),
+     ("lb", np.int64), ("ub", np.int64)] + STATS_DTYPE.descr
+)
+
+
+class ResultPeaksArray:
+    """
+    Peaks of every row of a SignalArray.
+
+    Attributes
+    ----------
+    data: np.ndarray
+        one entry per peak (dtype: PEAKS_ARRAY_DTYPE); sorted by row then peak
+        row: row of the SignalArray
+        peak: peak number within the row
+        time: time of the row
+        index: index of the peak max
+        lb, ub: bounds of the peak (slice(lb, ub))
+        + stats (see `PeakStats`)
+    """
+    def __init__(self, array: SignalArray, data: np.ndarray):
+        self.array = array
+        self.data = data
+
+    def __str__(self):
+        return f"# of Peaks: {len(self.data)} (rows: {self.array.number_of_signals})"
+
+    def __repr__(self):
+        return self.__str__()
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        return self.data[field]
+
+    @property
+    def number_of_peaks(self) -> np.ndarray:
+        """ number of peaks in each row """
+        return np.bincount(self.data["row"], minlength=self.array.number_of_signals)
+
+    def get_row(self, row: int) -> np.ndarray:
+        start, stop = np.searchsorted(self.data["row"], [row, row + 1])
+        return self.data[start:stop]
+
+    def stats_table(self) -> StatsTable:
+        headers = list(self.data.dtype.names)
+        return StatsTable(rows=[list(peak.tolist()) for peak in self.data], headers=headers)
+
+
+def _find_peaks_rows(
+        x: np.ndarray,
+        time_: np.ndarray,
+        z: np.ndarray,
+        first_row: int,
+        boundary_kwargs: dict,
+        find_peaks_kwargs: dict
+) -> np.ndarray:
+    """ peaks of a chunk of rows (runs in a worker) """
+    results = []
+    for i in range(z.shape[0]):
+        y = z[i]
+        indexes, _ = find_peaks(y, **find_peaks_kwargs)
+        lb_indexes, ub_indexes = rolling_ball_bounds(indexes, x, y, **boundary_kwargs)
+        peaks, bounds = [], []
+        for index, lb_index, ub_index in zip(indexes, lb_indexes, ub_indexes):
+            if not check_end_points(y, index, lb_index, min(ub_index, len(y) - 1)):
+                continue
+            peaks.append(index)
+            bounds.append(slice(int(lb_index), int(ub_index)))
+
+        result = np.empty(len(peaks), dtype=PEAKS_ARRAY_DTYPE)
+        result["row"] = first_row + i
+        result["peak"] = np.arange(len(peaks))
+        result["time"] = time_[i]
+        result["index"] = peaks
+        result["lb"] = [bound.start for bound in bounds]
+        result["ub"] = [bound.stop for bound in bounds]
+        stats = get_peak_stats(x, y, bounds)
+        for name in STATS_DTYPE.names:
+            result[name] = stats[name]
+        results.append(result)
+
+    if not results:
+        return np.empty(0, dtype=PEAKS_ARRAY_DTYPE)
+    return np.concatenate(results)
+
+
+def find_peaks_array(
+        array: SignalArray,
+        processed: bool = True,
+        executor: Executor = None,
+        boundary_kwargs: dict = None,
+        **kwargs
+) -> ResultPeaksArray:
+    """
+    Peak picking (`scipy.signal.find_peaks`), boundary detection (rolling ball) and peak stats for every row of
+    a SignalArray.
+
+    Parameters
+    ----------
+    array:
+        SignalArray
+    processed:
+        True: use processed data; False: use raw data
+    executor:
+        how rows are split across workers (e.g. `ProcessExecutor()`)
+        default: serial
+    boundary_kwargs:
+        passed to `rolling_ball_bounds` (n, poly_degree, max_derivative, ...)
+    kwargs:
+        passed to `scipy.signal.find_peaks` (height, prominence, distance, ...)
+
+    Returns
+    -------
+    result:
+        columnar peaks (see `ResultPeaksArray`)
+    """
+    if executor is None:
+        executor = SerialExecutor()
+    if processed:
+        x, time_, z = array.x, array.time, array.data
+    else:
+        x, time_, z = array.x_raw, array.time_raw, array.data_raw
+
+    function = functools.partial(_find_peaks_rows, boundary_kwargs=boundary_kwargs or {}, find_peaks_kwargs=kwargs)
+    results = executor.map_rows(function, x, time_, z)
+    data = np.concatenate(results) if results else np.empty(0, dtype=PEAKS_ARRAY_DTYPE)
+    if len(data) == 0:
+        logger.warning("No peaks found.")
+
+    return ResultPeaksArray(array, data)
@@ -1,8 +1,10 @@
 import logging
+from collections import OrderedDict
 from collections.abc import Sequence
 from typing import Callable
 
 import numpy as np
+from scipy.interpolate import PchipInterpolator
 from scipy.optimize import brentq
 
 
@@ -18,34 +20,118 @@ def check_bounds(bound: Sequence[int | float]) -> tuple[int | float, int | float
     return tuple(bound)
 
 
+def _find_crossing(func: Callable, x: np.ndarray, y: np.ndarray, y_target: float) -> float | None:
+    """ first x where y crosses y_target (bracketed on the grid, then refined with brentq) """
+    diff = y - y_target
+    exact = np.flatnonzero(diff == 0)
+    if len(exact) > 0:
+        return float(x[exact[0]])
+    finite = np.isfinite(diff)
+    crossing = np.flatnonzero((np.signbit(diff[:-1]) != np.signbit(diff[1:])) & finite[:-1] & finite[1:])
+    if len(crossing) == 0:
+        return None
+    i = crossing[0]
+    x_root, result = brentq(lambda x_: func(x_) - y_target, x[i], x[i + 1], full_output=True)
+    if not result.converged:
+        return None
+    return x_root
+
+
 def compute_x_bound_from_y_bound(func: Callable, y_bound: tuple[int | float, int | float]) \
         -> tuple[int | float, int | float] | None:
+    """
+    x values where func reaches y_bound (func is assumed monotonic).
+
+    func is evaluated on a grid starting at x=1 in one vectorized call (the grid is widened up to 4 times by 100x
+    until both bounds are bracketed), then each bound is refined by brentq inside its grid interval.
+
+    Returns
+    -------
+    x_bounds:
+        (lower, upper); None if a bound could not be found
+    """
     b = 100
     for i in range(5):
-        try:
-            lb_x, result_lb = brentq(lambda x: func(x) - y_bound[0], 1, b, full_output=True)
-        except ValueError:
-            b = b*100
-            continue
-        if result_lb.converged:
+        x = np.linspace(1, b, 1001)
+        with np.errstate(over="ignore", invalid="ignore"):
+            y = np.asarray(func(x), dtype=np.float64)
+        x_bounds = [_find_crossing(func, x, y, y_target) for y_target in y_bound]
+        if None not in x_bounds:
             break
+        b = b * 100
     else:
         logging.error("Could not converge Calibration.y_bound calculation. Take cautions using the calibration.")
         return None
 
-    try:
-        ub_x, result_ub = brentq(lambda x: func(x) - y_bound[1], 1, lb_x, full_output=True)
-        if not result_ub.converged:
-            logging.error("Could not converge Calibration.y_bound calculation. Take cautions using the calibration.")
-            return None
-    except ValueError:
-        logging.error("Could not converge Calibration.y_bound calculation. Take cautions using the calibration.")
-        return None
+    return check_bounds(x_bounds)
+
+
+class CalibrationTable:
+    """
+    Calibration compiled into a monotone cubic spline (PCHIP) of func sampled on a dense grid, and the spline of the
+    inverse (x from y). Made by `Calibration.compile`.
+
+    Attributes
+    ----------
+    x_range: tuple[float, float]
+        range of x of the table; values outside are not covered
+    y_range: tuple[float, float]
+        range of y of the table
+    log_y: bool
+        interpolation done on log(y)
+    """
+    def __init__(self, func: Callable, x_range: Sequence[int | float], number_points: int = 4096,
+                 log_y: bool = None):
+        x_range = check_bounds(x_range)
+        x = np.linspace(x_range[0], x_range[1], number_points)
+        with np.errstate(over="ignore", invalid="ignore"):
+            y = np.asarray(func(x), dtype=np.float64)
+        if y.shape != x.shape or not np.all(np.isfinite(y)):
+            raise ValueError(f"Calibration must be finite over 'x_range' to compile.\n\tx_range: {x_range}")
+        step = np.diff(y)
+        if not (np.all(step > 0) or np.all(step < 0)):
+            raise ValueError(f"Calibration must be strictly monotonic over 'x_range' to compile."
+                             f"\n\tx_range: {x_range}")
+        if log_y is None:
+            log_y = bool(np.all(y > 0))
+        elif log_y and not np.all(y > 0):
+            raise ValueError("'log_y' needs y > 0 over 'x_range'.")
 
-    return lb_x, ub_x
+        self.x_range = x_range
+        self.y_range = check_bounds((float(y[0]), float(y[-1])))
+        self.log_y = log_y
+        t = np.log(y) if log_y else y
+        self._forward = PchipInterpolator(x, t, extrapolate=False)
+        order = slice(None) if step[0] > 0 else slice(None, None, -1)
+        self._inverse = PchipInterpolator(t[order], x[order], extrapolate=False)
+
+    def __repr__(self):
+        return f"CalibrationTable(x_range={self.x_range}, y_range={self.y_range})"
+
+    def get_y(self, x: np.ndarray) -> np.ndarray:
+        """ y from x; nan outside 'x_range' """
+        t = self._forward(x)
+        return np.exp(t) if self.log_y else t
+
+    def get_x(self, y: np.ndarray) -> np.ndarray:
+        """ x from y; nan outside 'y_range' """
+        y = np.asarray(y, dtype=np.float64)
+        if self.log_y:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                y = np.log(y)
+        return self._inverse(y)
 
 
 class Calibration:
+    """
+    Calibration of y (e.g., molecular weight) as a function of x (e.g., retention time).
+
+    `compile` replaces calls of func with a dense lookup table (monotone spline) and enables the vectorized inverse
+    `get_x`. Results of `get_y` for arrays are cached for the last few x grids (signals of the same instrument share
+    their x), so repeated calls are a copy.
+    """
+    cache_size = 8
+
     def __init__(self,
                  func: Callable,
                  *,
@@ -58,6 +144,8 @@ class Calibration:
 
         self._x_bounds = None
         self._y_bounds = None
+        self._table: CalibrationTable | None = None
+        self._cache: OrderedDict[tuple, tuple[np.ndarray, np.ndarray]] = OrderedDict()  # key: (x, y)
         self.x_bounds = x_bounds
         self.y_bounds = y_bounds
 
@@ -80,7 +168,8 @@ class Calibration:
         if x_bounds is None:
             return
         self._x_bounds = check_bounds(x_bounds)
-        self._y_bounds = (self.func(x_bounds[0]), self.func(x_bounds[1]))
+        self._y_bounds = check_bounds((float(self.func(self._x_bounds[0])), float(self.func(self._x_bounds[1]))))
+        self._cache.clear()
 
     @property
     def y_bounds(self) -> tuple[int | float, int | float] | None:
@@ -91,7 +180,68 @@ class Calibration:
         if y_bounds is None:
             return
         self._y_bounds = check_bounds(y_bounds)
-        self._x_bounds = compute_x_bound_from_y_bound(self.func, self.y_bounds)
+        x_bounds = None
+        if self._table is not None and self._table.y_range[0] <= self._y_bounds[0] \
+                and self._y_bounds[1] <= self._table.y_range[1]:
+            x_bounds = check_bounds(tuple(float(x) for x in self._table.get_x(np.array(self._y_bounds))))
+        if x_bounds is None:
+            x_bounds = compute_x_bound_from_y_bound(self.func, self._y_bounds)
+        self._x_bounds = x_bounds
+        self._cache.clear()
+
+    @property
+    def table(self) -> CalibrationTable | None:
+        """ lookup table made by `compile` (None if not compiled) """
+        return self._table
+
+    def compile(self, x_range: Sequence[int | float] = None, number_points: int = 4096, log_y: bool = None) \
+            -> CalibrationTable:
+        """
+        Replace calls of func with a monotone cubic spline (PCHIP) of func sampled on a dense grid.
+        Values of x outside 'x_range' are still calculated with func.
+
+        Parameters
+        ----------
+        x_range:
+            range of x covered by the table
+            default: x_bounds
+        number_points:
+            number of points func is sampled at
+        log_y:
+            interpolate log(y) (better relative accuracy when y spans decades, e.g., molecular weight)
+            default: True if y > 0 over x_range
+
+        Returns
+        -------
+        table:
+            the lookup table (also kept on the calibration)
+        """
+        if x_range is None:
+            x_range = self.x_bounds
+        if x_range is None:
+            raise ValueError("'x_range' is needed to compile a Calibration without 'x_bounds'.")
+        self._table = CalibrationTable(self.func, x_range, number_points, log_y)
+        self._cache.clear()
+        return self._table
+
+    def clear_cache(self):
+        self._cache.clear()
+
+    @staticmethod
+    def _get_key(x: np.ndarray, with_bounds: bool) -> tuple:
+        """ cheap key; a hit is confirmed by comparing the whole grid """
+        if x.size == 0:
+            return x.dtype.str, x.shape, with_bounds
+        return x.dtype.str, x.shape, with_bounds, x.flat[0].item(), x.flat[-1].item()
+
+    def _evaluate(self, x: int | float | np.ndarray) -> int | float | np.ndarray:
+        if self._table is None or not isinstance(x, np.ndarray):
+            return self.func(x)
+        y = self._table.get_y(x)
+        outside = np.isnan(y)
+        if np.any(outside):
+            y[outside] = self.func(x[outside])
+        return y
 
     def get_y(self, x: int | float | np.ndarray, with_bounds: bool = True) -> int | float | np.ndarray:
         """
@@ -107,7 +257,14 @@ class Calibration:
         -------
         returns 0 if outside of bounds
         """
-        y = self.func(x)
+        if isinstance(x, np.ndarray):
+            key = self._get_key(x, with_bounds)
+            cached = self._cache.get(key)
+            if cached is not None and np.array_equal(cached[0], x):
+                self._cache.move_to_end(key)
+                return cached[1].copy()
+
+        y = self._evaluate(x)
 
         if with_bounds:
             if isinstance(y, int) or isinstance(y, float):
@@ -121,4 +278,28 @@ class Calibration:
                 mask = y > self.y_bounds[1]
                 y[mask] = 0
 
+        if isinstance(x, np.ndarray) and isinstance(y, np.ndarray):
+            self._cache[key] = (x.copy(), y.copy())
+            self._cache.move_to_end(key)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
         return y
+
+    def get_x(self, y: int | float | np.ndarray) -> float | np.ndarray:
+        """
+        Inverse of the calibration (vectorized); compiles the calibration over x_bounds if not compiled yet.
+
+        Parameters
+        ----------
+        y:
+            values to invert
+
+        Returns
+        -------
+        x:
+            nan outside the range of the table
+        """
+        if self._table is None:
+            self.compile()
+        x = self._table.get_x(y)
+        return float(x) if x.ndim == 0 else x
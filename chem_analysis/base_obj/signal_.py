@@ -147,43 +147,30 @@ class Signal:
     def to_csv(self, path: str | pathlib.Path, headers: bool = False, encoding: str = "utf-8"):
         kwargs = {"encoding": encoding}
         if headers:
-            kwargs["headers"] = [self.x_label, self.y_label]
+            kwargs["header"] = f"{self.x_label},{self.y_label}"
+            kwargs["comments"] = ""
         np.savetxt(path, np.column_stack((self.x, self.y)), delimiter=",", **kwargs)
 
     def to_npy(self, path: str | pathlib.Path, **kwargs):
         np.save(path, np.column_stack((self.x, self.y)), **kwargs)
 
+    def to_dataset(self, path: str | pathlib.Path, compression: str = "zstd") -> str:
+        """
+        Add to a Parquet dataset of many Signals/SignalArrays (see `chem_analysis.utils.dataset_format`).
+        Every call writes a new file; save many signals in one file with `save_dataset`.
+        """
+        from chem_analysis.utils.dataset_format import save_dataset
 
-def load_csv(path: pathlib):
-    import csv
-
-    # Initialize variables to store data
-    data = []
-    x_label = None
-    y_label = None
-
-    # Read CSV file
-    with open(path, 'r') as file:
-        csv_reader = csv.reader(file)
-
-        # Check if the first row contains numbers
-        first_row = next(csv_reader, None)
-
-        if len(first_row) != 2:
-            raise ValueError("Data not correct format.")
+        return save_dataset(path, [self], compression)[0]
 
-        if any(cell.isalpha() for cell in first_row):
-            # If the first row contains non-numeric values, consider it as column labels
-            x_label, y_label = first_row
-        else:
-            # If the first row contains numbers, treat them as data and set labels to None
-            data.append([float(cell) for cell in first_row])
 
-        # Read the remaining rows
-        for row in csv_reader:
-            data.append([float(cell) for cell in row])
+def load_csv(path: str | pathlib.Path) -> tuple[np.ndarray, np.ndarray, str | None, str | None]:
+    """ x, y and labels (if the first row is a header) of a two column CSV file (see `utils.csv_format.read_csv`) """
+    from chem_analysis.utils.csv_format import read_csv
 
-    # Convert data to NumPy array
-    data_array = np.array(data)
+    data, header = read_csv(path)
+    if data.shape[1] != 2:
+        raise ValueError(f"Data not correct format.\n\tExpected: 2 columns\n\tGiven: {data.shape[1]}")
 
-    return data_array[:, 0], data_array[:, 1], x_label, y_label
+    x_label, y_label = header if header is not None else (None, None)
+    return data[:, 0], data[:, 1], x_label, y_label
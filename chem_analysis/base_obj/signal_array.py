@@ -5,6 +5,7 @@ import numpy as np
 
 from chem_analysis.processing.base import Processor
 from chem_analysis.base_obj.signal_ import Signal
+from chem_analysis.utils.buffers import BufferGrowing
 
 
 class SignalArray:
@@ -25,8 +26,8 @@ class SignalArray:
                  ):
         self.name = name
         self.x_raw = x_raw
-        self.time_raw = time_raw
-        self.data_raw = data_raw
+        self._time_raw = BufferGrowing(time_raw)
+        self._data_raw = BufferGrowing(data_raw)
         self.x_label = x_label or "x_axis"
         self.y_label = y_label or "time"
         self.z_label = z_label or "z_axis"
@@ -35,42 +36,112 @@ class SignalArray:
         self._x = None
         self._time = None
         self._data = None
+        self._data_stream: BufferGrowing | None = None  # processed rows when processing incrementally
+        self._number_processed = 0  # number of rows processed
+
+    @property
+    def time_raw(self) -> np.ndarray:
+        return self._time_raw.data
+
+    @time_raw.setter
+    def time_raw(self, time_raw: np.ndarray):
+        self._time_raw = BufferGrowing(time_raw)
+        self.processor.processed = False
+
+    @property
+    def data_raw(self) -> np.ndarray:
+        return self._data_raw.data
+
+    @data_raw.setter
+    def data_raw(self, data_raw: np.ndarray):
+        self._data_raw = BufferGrowing(data_raw)
+        self.processor.processed = False
 
     def _process(self):
         self._x, self._time, self._data = self.processor.run(self.x_raw, self.time_raw, self.data_raw)
+        self._data_stream = None
+        self._number_processed = self.number_of_signals
 
-    @property
-    def x(self) -> np.ndarray:
+    def _process_appended(self):
+        """ process only appended rows (falls back to processing everything if a method does not support it) """
+        if not self.processor.streamable:
+            self._process()
+            return
+
+        if self._data_stream is None:  # start streaming from the first row
+            self.processor.reset_stream()
+            self._number_processed = 0
+            self._data_stream = BufferGrowing(np.empty((0, self.data_raw.shape[1])))
+
+        x, data, n_revised = self.processor.run_stream(
+            self.x_raw, self.time_raw, self.data_raw[self._number_processed:]
+        )
+        self._data_stream.write(self._number_processed - n_revised, data)
+        self._number_processed = self.number_of_signals
+        self._x, self._time, self._data = x, self.time_raw, self._data_stream.data
+
+    def _check_processed(self):
         if not self.processor.processed:
             self._process()
+        elif self._number_processed != self.number_of_signals:
+            self._process_appended()
 
+    @property
+    def x(self) -> np.ndarray:
+        self._check_processed()
         return self._x
 
     @property
     def time(self) -> np.ndarray:
-        if not self.processor.processed:
-            self._process()
-
+        self._check_processed()
         return self._time
 
     @property
     def time_zeroed(self) -> np.ndarray:
-        if not self.processor.processed:
-            self._process()
-
+        self._check_processed()
         return self._time - self.time_raw[0]
 
     @property
     def data(self) -> np.ndarray:
-        if not self.processor.processed:
-            self._process()
-
+        self._check_processed()
         return self._data
 
     @property
     def number_of_signals(self):
         return len(self.time_raw)
 
+    def append(self, time_: float | np.ndarray, data: np.ndarray):
+        """
+        Add signals to the end of the array.
+
+        Memory grows geometrically, so appending is amortized O(rows added). If every method of the processor
+        supports streaming, only the new rows are processed (on next access of `x`, `time`, or `data`).
+
+        Parameters
+        ----------
+        time_:
+            time of each new signal
+            shape: [n] or scalar
+        data:
+            new signals
+            shape: [n, n_x] or [n_x]
+        """
+        time_ = np.atleast_1d(np.asarray(time_))
+        data = np.asarray(data)
+        if data.ndim == 1:
+            data = data.reshape(1, -1)
+        if data.shape[1] != self.data_raw.shape[1]:
+            raise ValueError(f"'data' must have the same number of points as x."
+                             f"\n\tExpected: {self.data_raw.shape[1]}"
+                             f"\n\tGiven: {data.shape[1]}")
+        if time_.shape[0] != data.shape[0]:
+            raise ValueError(f"'time_' and 'data' must have the same number of signals."
+                             f"\n\ttime_: {time_.shape[0]}"
+                             f"\n\tdata: {data.shape[0]}")
+
+        self._time_raw.append(time_)
+        self._data_raw.append(data)
+
     def pop(self, index: int) -> Signal:
         sig = self.get_signal(index)
         self.delete(index)
@@ -79,21 +150,21 @@ class SignalArray:
     def delete(self, index: int | Iterable):
         if isinstance(index, int):
             index = [index]
-        index.sort(reverse=True)  # delete largest to smallest to avoid issue of changing index
-        for i in index:
-            self.data_raw = np.delete(self.data_raw, i, axis=0)
-            self.time_raw = np.delete(self.time_raw, i)
-            self.processor.processed = False
+        index = list(index)
+        self.data_raw = np.delete(self.data_raw, index, axis=0)  # one reallocation for all indices
+        self.time_raw = np.delete(self.time_raw, index)
 
     def get_signal(self, index: int, processed: bool = False) -> Signal:
         if processed:
             sig = Signal(x_raw=self.x, y_raw=self.data[index, :], x_label=self.x_label,
                      y_label=self.y_label, name=f"time: {self.time[index]}", id_=index)
+            sig.time_ = self.time[index]
         else:
+            # only raw data is touched, so a memory mapped array only reads this row
             sig = Signal(x_raw=self.x_raw, y_raw=self.data_raw[index, :], x_label=self.x_label,
-                         y_label=self.y_label, name=f"time: {self.time[index]}", id_=index)
+                         y_label=self.y_label, name=f"time: {self.time_raw[index]}", id_=index)
             sig.processor = self.processor.get_copy()
-        sig.time_ = self.time[index]
+            sig.time_ = self.time_raw[index]
         return sig
 
     @classmethod
@@ -117,20 +188,41 @@ class SignalArray:
         return cls(x_raw=x, time_raw=time_, data_raw=data, x_label=x_label, z_label=z_label)
 
     @classmethod
-    def from_file(cls, path: str | pathlib.Path):
+    def from_file(cls, path: str | pathlib.Path, mmap_mode: str | None = None):
+        """
+        Load from file (.csv, .feather, .npy or an npy directory).
+
+        Parameters
+        ----------
+        path:
+            file or npy directory (see `to_npy_dir`)
+        mmap_mode:
+            'r', 'r+', 'c' memory maps the data instead of reading it into memory (.npy, .feather, npy directory);
+            .feather is read only, and npy directories are always memory mapped ('r') unless given
+        """
         from chem_analysis.utils.feather_format import feather_to_numpy
         from chem_analysis.utils.math import unpack_time_series
+        from chem_analysis.utils.npy_dir_format import is_npy_dir, load_npy_dir
+        from chem_analysis.utils.csv_format import read_csv
 
         if isinstance(path, str):
             path = pathlib.Path(path)
 
-        if path.suffix == ".csv":
-            data = np.loadtxt(path, delimiter=",")
+        name = None
+        if is_npy_dir(path):
+            x, time_, data, metadata = load_npy_dir(path, mmap_mode or "r")
+            x_label = metadata.get("x_label")
+            y_label = metadata.get("y_label")
+            z_label = metadata.get("z_label")
+            name = metadata.get("name")
+
+        elif path.suffix == ".csv":
+            data, _ = read_csv(path)
             x, time_, data = unpack_time_series(data)
             x_label = y_label = z_label = None
 
         elif path.suffix == ".feather":
-            data, names = feather_to_numpy(path)
+            data, names = feather_to_numpy(path, memory_map=mmap_mode is not None)
             x, time_, data = unpack_time_series(data)
             if names[0] != "0":
                 x_label = names[0]
@@ -140,13 +232,14 @@ class SignalArray:
                 x_label = y_label = z_label = None
 
         elif path.suffix == ".npy":
-            data = np.load(str(path))
+            data = np.load(str(path), mmap_mode=mmap_mode)
             x, time_, data = unpack_time_series(data)
             x_label = y_label = z_label = None
         else:
             raise NotImplemented("File type currently not supported.")
 
-        return cls(x_raw=x, time_raw=time_, data_raw=data, x_label=x_label, y_label=y_label, z_label=z_label)
+        return cls(x_raw=x, time_raw=time_, data_raw=data, x_label=x_label, y_label=y_label, z_label=z_label,
+                   name=name)
 
     def to_feather(self, path: str | pathlib.Path):
         from chem_analysis.utils.feather_format import numpy_to_feather
@@ -170,6 +263,58 @@ class SignalArray:
         np.savetxt(path, pack_time_series(self.x, self.time, self.data), **kwargs)  # noqa
 
     def to_npy(self, path: str | pathlib.Path, **kwargs):
-        from chem_analysis.utils.math import pack_time_series
-
-        np.save(path, pack_time_series(self.x, self.time, self.data), **kwargs)
+        """
+        Save packed time series (see `pack_time_series`); written in chunks of rows, so no full copy is made.
+        'kwargs' are the options of `np.save` ('allow_pickle', 'fix_imports'); they only apply to arrays of objects,
+        which are saved with `np.save`.
+        """
+        from chem_analysis.utils.npy_dir_format import get_chunk_rows
+
+        unknown = set(kwargs) - {"allow_pickle", "fix_imports"}
+        if unknown:
+            raise TypeError(f"'to_npy' got unexpected keyword arguments (np.save options: allow_pickle, fix_imports)."
+                            f"\n\tgiven: {sorted(unknown)}")
+
+        path = pathlib.Path(path)
+        if path.suffix != ".npy":
+            path = path.with_suffix(path.suffix + ".npy")  # same as np.save
+
+        x, time_, data = self.x, self.time, self.data
+        if data.dtype.hasobject:
+            from chem_analysis.utils.math import pack_time_series
+            np.save(path, pack_time_series(x, time_, data), **kwargs)
+            return
+
+        packed = np.lib.format.open_memmap(path, mode="w+", dtype=data.dtype, shape=(len(time_) + 1, len(x) + 1))
+        packed[0, 0] = 0
+        packed[0, 1:] = x
+        packed[1:, 0] = time_
+        chunk_rows = get_chunk_rows(packed.shape[1], data.dtype.itemsize)
+        for i in range(0, data.shape[0], chunk_rows):
+            packed[i + 1:i + 1 + chunk_rows, 1:] = data[i:i + chunk_rows]
+        packed.flush()
+
+    def to_npy_dir(self, path: str | pathlib.Path, chunk_rows: int = None):
+        """
+        Save to the native npy directory layout (a directory; see `chem_analysis.utils.npy_dir_format`).
+        Load it back memory mapped with `from_file`.
+        """
+        from chem_analysis.utils.npy_dir_format import save_npy_dir
+
+        metadata = {"x_label": self.x_label, "y_label": self.y_label, "z_label": self.z_label, "name": self.name}
+        save_npy_dir(path, self.x, self.time, self.data, metadata, chunk_rows)
+
+    def to_dataset(self, path: str | pathlib.Path, compression: str = "zstd", rows_per_group: int = None) -> str:
+        """
+        Add to a Parquet dataset of many Signals/SignalArrays (a directory; see `chem_analysis.utils.dataset_format`).
+        Load with `load_dataset` (filtered by name/time). Every call writes a new file; save many arrays in one file
+        with `save_dataset`.
+
+        Returns
+        -------
+        uid:
+            uid of the array in the dataset
+        """
+        from chem_analysis.utils.dataset_format import save_dataset
+
+        return save_dataset(path, [self], compression, rows_per_group)[0]
@@ -15,6 +15,9 @@ class Configuration:
         self._plotting_libraries = []
         self.sig_fig = 3
         self.table_format = "rounded_grid"
+        self.penalty_cache_size = 32  # number of Whittaker penalty matrices kept in memory
+        self.processor_cache_memory = 256 * 1024 ** 2  # bytes of intermediate results kept by each Processor
+        self.processor_disk_cache = None  # ResultCache used by every Processor without one (None: off)
 
         self._find_available_plotting_libraries()
 
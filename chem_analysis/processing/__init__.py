@@ -3,3 +3,5 @@ import chem_analysis.processing.re_sampling as re_sampling
 import chem_analysis.processing.baselines.base as baseline_correction
 import chem_analysis.processing.translations as translations
 import chem_analysis.processing.smoothing as smoothing
+import chem_analysis.processing.executors as executors
+import chem_analysis.processing.result_cache as result_cache
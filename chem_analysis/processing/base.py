@@ -2,13 +2,26 @@ from __future__ import annotations
 
 import abc
 import copy
+import hashlib
+from collections import OrderedDict
 
 import numpy as np
 
+from chem_analysis.config import global_config
 from chem_analysis.utils.code_for_subclassing import MixinSubClassList
+from chem_analysis.utils.parameters import MixinParameters
+from chem_analysis.processing.executors import Executor, SerialExecutor
+from chem_analysis.processing.result_cache import ResultCache
 
 
-class ProcessingMethod(MixinSubClassList, abc.ABC):
+class ProcessingMethod(MixinSubClassList, MixinParameters, abc.ABC):
+    """
+    Parameters are the arguments of `__init__` (see `chem_analysis.utils.parameters`): `get_parameters`, `to_dict`,
+    `from_dict`, `fingerprint` and `get_copy` only use them. Values computed when the method runs (e.g., the
+    baseline) are state: kept on the method for inspection, but never hashed, copied or sent to workers.
+    """
+    row_independent = False  # True: each row of an array is processed on its own (rows can be split across workers)
+    stream_lag = 0  # max number of earlier output rows `run_array_stream` may revise
 
     @abc.abstractmethod
     def run(self, x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
@@ -18,14 +31,104 @@ class ProcessingMethod(MixinSubClassList, abc.ABC):
     def run_array(self, x: np.ndarray, y: np.ndarray, z: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
         ...
 
+    def get_chunk_copy(self, rows: slice) -> ProcessingMethod:
+        """
+        Copy (parameters only) that runs `run_array` on 'rows' of an array (used by executors).
+        Override to slice parameters that have one entry per row.
+        """
+        return self.get_copy()
+
+    def merge_array_state(self, methods: list[ProcessingMethod]):
+        """
+        Combine results stored on copies of this method that each ran `run_array` on a chunk of rows
+        (in row order). Override when `run_array` stores per-row results.
+        """
+
+    @property
+    def streamable(self) -> bool:
+        """ True if `run_array_stream` is supported (rows can be processed as they are appended) """
+        return self.row_independent
+
+    def reset_stream(self, max_revised: int = 0):
+        """
+        Clear state carried between `run_array_stream` calls.
+
+        Parameters
+        ----------
+        max_revised:
+            max number of earlier rows a call may revise (sum of `stream_lag` of the methods before this one)
+        """
+
+    def run_array_stream(self, x: np.ndarray, y: np.ndarray, z: np.ndarray, n_revised: int = 0) \
+            -> tuple[np.ndarray, np.ndarray, int]:
+        """
+        Process rows appended to an array; state needed for the next call is kept on the method.
+
+        Parameters
+        ----------
+        x:
+            x axis
+        y:
+            time of each row of z
+        z:
+            rows to process; the first 'n_revised' rows replace the last rows given in earlier calls, the rest are new
+        n_revised:
+            number of revised rows at the start of z
+
+        Returns
+        -------
+        x:
+            x axis
+        z:
+            output rows; the first 'n_revised' rows replace the last rows returned by earlier calls
+        n_revised:
+            number of revised rows at the start of the output
+        """
+        if not self.row_independent:
+            raise NotImplementedError(f"'{type(self).__name__}' does not support streaming.")
+        x, _, z = self.run_array(x, y, z)
+        return x, z, n_revised
+
 
 class Processor:
     """
     Processor
+
+    Output of each step is cached (keyed by the parameters of that step and every step before it), so changing,
+    adding or removing a method only re-runs that method and the methods after it.
+
+    Attributes
+    ----------
+    executor: Executor
+        How methods are run over the rows of an array (serial, thread pool, process pool).
+    cache_memory: int | None
+        Max memory (bytes) of cached step outputs; least recently used steps are evicted first.
+        None uses `global_config.processor_cache_memory`; 0 turns caching off.
+    disk_cache: ResultCache | None
+        On-disk cache of final outputs keyed by the raw data and the method chain, shared between runs (see
+        `chem_analysis.processing.result_cache`). None uses `global_config.processor_disk_cache` (None: off).
+
+    Notes
+    -----
+    * Outputs of `run` are writable. Cached step outputs are read only and private: when the final output is
+      cached, `run` returns a copy of it (`cache_memory = 0` avoids the copy).
+    * Raw data is tracked by identity; set `processed = False` after editing raw data in place.
+    * Method parameters are hashed when they are set (see `chem_analysis.utils.parameters`); set a parameter again
+      after editing it in place.
+    * A result loaded from the disk cache skips running the methods; the state they store when they run (e.g., the
+      baseline) is loaded with it (see `chem_analysis.processing.result_cache`).
     """
-    def __init__(self, methods: list[ProcessingMethod] = None):
+    def __init__(self, methods: list[ProcessingMethod] = None, executor: Executor = None, cache_memory: int = None,
+                 disk_cache: ResultCache = None):
         self._methods: list[ProcessingMethod] = [] if methods is None else methods
-        self.processed = False
+        self.executor: Executor = executor if executor is not None else SerialExecutor()
+        self.cache_memory = cache_memory
+        self.disk_cache = disk_cache
+
+        self._processed = False
+        self._processed_key = None
+        self._cache: OrderedDict[int, tuple[str, tuple[np.ndarray, ...]]] = OrderedDict()
+        self._cache_inputs: tuple[np.ndarray, ...] | None = None
 
     def __repr__(self):
         return f"Processor: {len(self)} methods"
@@ -33,39 +136,208 @@ class Processor:
     def __len__(self):
         return len(self._methods)
 
+    def __getstate__(self) -> dict:
+        # cache is not copied or pickled
+        state = self.__dict__.copy()
+        state["_cache"] = OrderedDict()
+        state["_cache_inputs"] = None
+        return state
+
     @property
     def methods(self) -> list[ProcessingMethod]:
         return self._methods
 
+    @property
+    def processed(self) -> bool:
+        """ False if a method has been added/removed/changed since the last run. """
+        if not self._processed:
+            return False
+        return self._get_chain_keys()[-1] == self._processed_key
+
+    @processed.setter
+    def processed(self, processed: bool):
+        self._processed = processed
+        if not processed:  # requested from outside; assume the raw data may have changed
+            self.clear_cache()
+
+    @property
+    def cache_size(self) -> int:
+        """ memory used by cached step outputs (bytes) """
+        return sum(_get_nbytes(data) for _, data in self._cache.values())
+
+    def clear_cache(self):
+        self._cache.clear()
+        self._cache_inputs = None
+
+    def _invalidate(self, index: int):
+        """ remove cached output of step 'index' and every step after it """
+        for i in list(self._cache):
+            if i >= index:
+                del self._cache[i]
+        self._processed = False
+
     def add(self, *args: ProcessingMethod):
         self._methods += args
-        self.processed = False
+        self._processed = False
 
     def insert(self, index: int, method: ProcessingMethod):
         self._methods.insert(index, method)
-        self.processed = False
+        self._invalidate(index if index >= 0 else max(len(self._methods) - 1 + index, 0))
 
     def delete(self, method: int | ProcessingMethod):
         if isinstance(method, ProcessingMethod):
-            self._methods.remove(method)
+            index = self._methods.index(method)
         else:
-            self._methods.pop(method)
-        self.processed = False
+            index = method if method >= 0 else len(self._methods) + method
+        self._methods.pop(index)
+        self._invalidate(index)
+
+    def _get_chain_keys(self) -> list[str]:
+        """ key of each step depends on its parameters and the keys of all steps before it """
+        keys = [""]
+        for method in self._methods:
+            keys.append(_chain_key(keys[-1], method.fingerprint()))
+        return keys
+
+    def _get_cache_memory(self) -> int:
+        if self.cache_memory is None:
+            return global_config.processor_cache_memory
+        return self.cache_memory
+
+    def _get_disk_cache(self) -> ResultCache | None:
+        if self.disk_cache is None:
+            return global_config.processor_disk_cache
+        return self.disk_cache
+
+    def _store(self, index: int, key: str, data: tuple[np.ndarray, ...]) -> tuple[np.ndarray, ...]:
+        memory = self._get_cache_memory()
+        if _get_nbytes(data) > memory:
+            return data
+
+        data = tuple(_read_only(array) for array in data)
+        self._cache[index] = (key, data)
+        self._cache.move_to_end(index)
+        while self.cache_size > memory:
+            self._cache.popitem(last=False)
+        return data
+
+    def _get_start(self, keys: list[str]) -> tuple[int, tuple[np.ndarray, ...] | None]:
+        """ finds the last step with a valid cached output """
+        for i in reversed(range(len(self._methods))):
+            entry = self._cache.get(i)
+            if entry is not None and entry[0] == keys[i + 1]:
+                self._cache.move_to_end(i)
+                return i + 1, entry[1]
+
+        return 0, None
 
     def run(self, x: np.ndarray, y: np.ndarray, z: np.ndarray | None = None) \
             -> tuple[np.ndarray, np.ndarray] | tuple[np.ndarray, np.ndarray, np.ndarray]:
-        for method in self._methods:
+        data = (x, y) if z is None else (x, y, z)
+        if self._cache_inputs is None or len(self._cache_inputs) != len(data) or \
+                any(a is not b for a, b in zip(self._cache_inputs, data)):
+            self.clear_cache()
+            self._cache_inputs = data
+
+        keys = self._get_chain_keys()
+        start, cached = self._get_start(keys)
+        self._invalidate(start)
+
+        disk_cache = self._get_disk_cache()
+        disk_key = None
+        if disk_cache is not None and start < len(self._methods):
+            disk_key = disk_cache.get_key(keys[-1], data)
+            result = disk_cache.load(disk_key)
+            state = disk_cache.load_state(disk_key) if result is not None else None
+            if state is not None:  # loaded arrays are not kept in the memory cache, so they are returned as is
+                for method, method_state in zip(self._methods, state):
+                    method.set_state(method_state)
+                self._processed = True
+                self._processed_key = keys[-1]
+                return result
+
+        if cached is not None:
+            data = cached
+
+        for i in range(start, len(self._methods)):
+            method = self._methods[i]
             if z is None:
-                x, y = method.run(x, y)
+                data = method.run(*data)
             else:
-                x, y, z = method.run_array(x, y, z)
+                data = self.executor.run_array(method, *data)
+            data = self._store(i, keys[i + 1], data)
+
+        if disk_key is not None:
+            disk_cache.store(disk_key, data, [method.get_state() for method in self._methods])
+        self._processed = True
+        self._processed_key = keys[-1]
+        return self._get_output(data)
+
+    def _get_output(self, data: tuple[np.ndarray, ...]) -> tuple[np.ndarray, ...]:
+        """ cached arrays are never given out (a user editing an output would change the cache) """
+        entry = self._cache.get(len(self._methods) - 1)
+        if entry is None or entry[1] is not data:
+            return data
+        return tuple(np.array(array) if isinstance(array, np.ndarray) else array for array in data)
+
+    @property
+    def streamable(self) -> bool:
+        return all(method.streamable for method in self._methods)
+
+    def reset_stream(self):
+        max_revised = 0
+        for method in self._methods:
+            method.reset_stream(max_revised)
+            max_revised += method.stream_lag
+
+    def run_stream(self, x: np.ndarray, y: np.ndarray, z: np.ndarray) -> tuple[np.ndarray, np.ndarray, int]:
+        """
+        Process only rows appended since the last call (call `reset_stream` before the first call).
+        Time (y) is not changed by streaming methods.
+
+        Parameters
+        ----------
+        x:
+            x axis
+        y:
+            time of every row (old and new)
+        z:
+            new rows
+
+        Returns
+        -------
+        x:
+            x axis
+        z:
+            output rows; the first 'n_revised' rows replace the last rows returned by earlier calls
+        n_revised:
+            number of revised rows
+        """
+        n_revised = 0
+        for method in self._methods:
+            x, z, n_revised = method.run_array_stream(x, y[len(y) - z.shape[0]:], z, n_revised)
 
-        self.processed = True
-        if z is None:
-            return x, y
-        return x, y, z
+        self._processed = True
+        self._processed_key = self._get_chain_keys()[-1]
+        return x, z, n_revised
 
     def get_copy(self) -> Processor:
-        copy_ = copy.deepcopy(self)
-        copy_.processed = False
-        return copy_
+        """ new processor with copies of the methods' parameters (no results or cached outputs) """
+        return Processor([method.get_copy() for method in self._methods], copy.copy(self.executor),
+                         self.cache_memory, self.disk_cache)
+
+
+def _chain_key(previous_key: str, fingerprint_: str) -> str:
+    return hashlib.blake2b((previous_key + fingerprint_).encode(), digest_size=16).hexdigest()
+
+
+def _get_nbytes(data: tuple[np.ndarray, ...]) -> int:
+    return sum(array.nbytes for array in data if isinstance(array, np.ndarray))
+
+
+def _read_only(array: np.ndarray) -> np.ndarray:
+    if not isinstance(array, np.ndarray):
+        return array
+    view = array.view()
+    view.setflags(write=False)
+    return view
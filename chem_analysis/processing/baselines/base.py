@@ -1,3 +1,5 @@
+from __future__ import annotations
+
 import abc
 from typing import Iterable
 
@@ -9,6 +11,8 @@ from chem_analysis.processing.weigths.weights import DataWeight, DataWeightChain
 
 
 class BaselineCorrection(ProcessingMethod, abc.ABC):
+    row_independent = True
+
     def __init__(self, weights: DataWeight | Iterable[DataWeight] = None):
         if weights is not None and isinstance(weights, Iterable):
             weights = DataWeightChain(weights)
@@ -34,6 +38,10 @@ class BaselineCorrection(ProcessingMethod, abc.ABC):
         self._x = x
         return x, y, z - self._y
 
+    def merge_array_state(self, methods: list[BaselineCorrection]):
+        self._x = methods[0].x
+        self._y = np.concatenate([method.y for method in methods])
+
     @abc.abstractmethod
     def get_baseline(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
         ...
@@ -78,27 +86,36 @@ class Polynomial(BaselineCorrection):
         func_baseline = np.poly1d(params)
         return func_baseline(x)
 
+    def get_chunk_copy(self, rows: slice) -> Polynomial:
+        method = self.get_copy()
+        if method.poly_weights is not None and np.ndim(method.poly_weights) == 2:  # one row of weights per row
+            method.poly_weights = method.poly_weights[rows]
+        return method
+
     def get_baseline_array(self, x: np.ndarray, _: np.ndarray, z: np.ndarray) -> np.ndarray:
         baseline = np.empty_like(z)
 
-        if self.poly_weights is None:
-            self.poly_weights = np.ones_like(z[0, :])
+        poly_weights = self.poly_weights
+        if poly_weights is None:
+            poly_weights = np.ones_like(z[0, :])
 
-        if self.poly_weights.shape == z.shape:
+        if poly_weights.shape == z.shape:
             for i in range(z.shape[0]):
-                baseline[i, :] = self.get_baseline(x, z[i, :], self.poly_weights[i, :])
-        elif self.poly_weights.size == z.shape[1]:
+                baseline[i, :] = self.get_baseline(x, z[i, :], poly_weights[i, :])
+        elif poly_weights.size == z.shape[1]:
             for i in range(z.shape[0]):
-                baseline[i, :] = self.get_baseline(x, z[i, :], self.poly_weights)
+                baseline[i, :] = self.get_baseline(x, z[i, :], poly_weights)
         else:
             raise ValueError(f"{type(self).__name__}.poly_weights is wrong shape."
                              f"\n\texpected: {z.shape} or {z.shape[1]}"
-                             f"\n\tgiven: {self.poly_weights.shape}")
+                             f"\n\tgiven: {poly_weights.shape}")
 
         return baseline
 
 
 class Subtract(BaselineCorrection):
+    _parameter_attributes = {"y": "y_sub", "x": "x_sub"}
+
     def __init__(self,
                  y: np.ndarray,
                  x: np.ndarray = None,
@@ -125,6 +142,8 @@ class Subtract(BaselineCorrection):
 
 
 class SubtractOptimize(BaselineCorrection):
+    _parameter_attributes = {"y": "y_sub", "x": "x_sub"}
+
     def __init__(self,
                  y: np.ndarray,
                  x: np.ndarray = None,
@@ -154,6 +173,10 @@ class SubtractOptimize(BaselineCorrection):
         self.multiplier = self._get_multiplier(x_, y_, x_sub, y_sub)
         return self.multiplier * self.y_sub
 
+    def merge_array_state(self, methods: list[SubtractOptimize]):
+        super().merge_array_state(methods)
+        self.multiplier = np.concatenate([method.multiplier for method in methods])
+
     def _get_multiplier(self, x: np.ndarray, y: np.ndarray, x_sub: np.ndarray, y_sub: np.ndarray) -> float:
         if len(self.y_sub) == len(y):
             def func(m) -> float:
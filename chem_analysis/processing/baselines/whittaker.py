@@ -1,8 +1,12 @@
 from typing import Iterable
+from collections import OrderedDict
+import threading
 
 import numpy as np
 from scipy import sparse
+from scipy.linalg import solveh_banded, solve_banded
 
+from chem_analysis.config import global_config
 from chem_analysis.utils.math import MIN_FLOAT
 from chem_analysis.processing.weigths.weights import DataWeight
 import chem_analysis.utils.validation as validation
@@ -14,9 +18,241 @@ diagonals = [
         [-1, 3, -3, 1],
     ]
 
+# max number of points (rows * columns) solved in one banded system; bounds memory for large arrays
+_CHUNK_POINTS = 2 ** 21
 
-def asymmetric_least_squared(
-        y: np.ndarray,
+
+class PenaltyMatrix:
+    """ lambda * D^T D in upper banded form and as a sparse matrix (built on first access, then kept) """
+    __slots__ = ("banded", "_sparse")
+
+    def __init__(self, banded: np.ndarray, sparse_: sparse.csr_matrix = None):
+        self.banded = banded
+        self._sparse = sparse_
+
+    @property
+    def sparse(self) -> sparse.csr_matrix:
+        if self._sparse is None:
+            u = self.banded.shape[0] - 1
+            n_points = self.banded.shape[1]
+            upper = [self.banded[u - k, k:] for k in range(1, u + 1)]
+            self._sparse = sparse.diags(
+                [self.banded[u]] + upper + upper,
+                [0] + list(range(1, u + 1)) + list(range(-1, -u - 1, -1)),
+                shape=(n_points, n_points),
+                format="csr"
+            )
+        return self._sparse
+
+
+def build_penalty_matrix(n_points: int, lambda_: float, diff_order: int) -> PenaltyMatrix:
+    """
+    Builds the penalty matrix (lambda * D^T D).
+
+    Parameters
+    ----------
+    n_points:
+        number of data points
+    lambda_:
+        smoothing parameter
+    diff_order:
+        values: 1, 2, 3
+        order of the differential matrix
+
+    Returns
+    -------
+    penalty:
+        banded form is shape: [diff_order + 1, n_points] as used by `scipy.linalg.solveh_banded` (lower=False)
+    """
+    if diff_order not in (1, 2, 3):
+        raise ValueError(f'diff_order must be 1,2,3. \n\tgiven: {diff_order}')
+    if n_points <= diff_order:
+        raise ValueError(f"Need more than diff_order ({diff_order}) points.\n\tgiven: {n_points}")
+
+    diff_matrix = sparse.diags(
+        diagonals[diff_order-1],
+        list(range(diff_order + 1)),
+        shape=(n_points - diff_order, n_points)
+    )
+    penalty = (lambda_ * diff_matrix.T @ diff_matrix).tocsr()
+
+    penalty_banded = np.zeros((diff_order + 1, n_points))
+    for k in range(diff_order + 1):
+        penalty_banded[diff_order - k, k:] = penalty.diagonal(k)
+
+    # shared between callers through the cache, so don't allow edits
+    penalty_banded.setflags(write=False)
+    return PenaltyMatrix(penalty_banded)
+
+
+class PenaltyCache:
+    """
+    Least recently used (LRU) cache of penalty matrices keyed on (n_points, diff_order, lambda_).
+
+    Attributes
+    ----------
+    max_size: int | None
+        Max number of matrices kept; least recently used are evicted first.
+        None uses `global_config.penalty_cache_size`; 0 turns caching off.
+    hits: int
+        number of lookups found in the cache
+    misses: int
+        number of lookups that built a new matrix
+    """
+    def __init__(self, max_size: int = None):
+        self._max_size = max_size
+        self._cache: OrderedDict[tuple[int, int, float], PenaltyMatrix] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        return f"PenaltyCache: {len(self)}/{self.max_size} (hits: {self.hits}, misses: {self.misses})"
+
+    def __len__(self):
+        return len(self._cache)
+
+    @property
+    def max_size(self) -> int:
+        if self._max_size is None:
+            return global_config.penalty_cache_size
+        return self._max_size
+
+    @max_size.setter
+    def max_size(self, max_size: int | None):
+        if max_size is not None and max_size < 0:
+            raise ValueError(f"'{type(self).__name__}.max_size' must be 0 or greater.\n\tgiven: {max_size}")
+        self._max_size = max_size
+        with self._lock:
+            self._evict()
+
+    def _evict(self):
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    def get(self, n_points: int, diff_order: int, lambda_: float) -> PenaltyMatrix:
+        key = (int(n_points), int(diff_order), float(lambda_))
+        with self._lock:
+            penalty = self._cache.get(key)
+            if penalty is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return penalty
+
+        penalty = build_penalty_matrix(n_points, lambda_, diff_order)
+        with self._lock:
+            self.misses += 1
+            if self.max_size > 0:
+                self._cache[key] = penalty
+                self._evict()
+        return penalty
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+penalty_cache = PenaltyCache()
+
+
+def get_penalty_banded(n_points: int, lambda_: float, diff_order: int) -> np.ndarray:
+    """
+    Penalty matrix (lambda * D^T D) in upper banded form (cached; see `penalty_cache`).
+
+    Returns
+    -------
+    penalty_banded:
+        shape: [diff_order + 1, n_points] (read only)
+        format used by `scipy.linalg.solveh_banded` (lower=False)
+    """
+    return penalty_cache.get(n_points, diff_order, lambda_).banded
+
+
+def _symmetric_to_general_banded(ab: np.ndarray) -> np.ndarray:
+    """ upper symmetric banded form -> general banded form (for `scipy.linalg.solve_banded`) """
+    u = ab.shape[0] - 1
+    ab_full = np.zeros((2 * u + 1, ab.shape[1]))
+    ab_full[:u + 1] = ab
+    for k in range(1, u + 1):
+        ab_full[u + k, :-k] = ab[u - k, k:]
+    return ab_full
+
+
+def solve_whittaker_array(penalty_banded: np.ndarray, weights: np.ndarray, rhs: np.ndarray) -> np.ndarray:
+    """
+    Solves (W + lambda * D^T D) z = rhs for every row at once.
+
+    Each row is an independent block of a block-diagonal banded system, so all rows are solved with one
+    banded Cholesky (LAPACK pbtrf/pbtrs) call per chunk of rows.
+
+    Parameters
+    ----------
+    penalty_banded:
+        penalty matrix from `get_penalty_banded`
+    weights:
+        shape: [n_rows, n_points]
+        diagonal of W for each row
+    rhs:
+        shape: [n_rows, n_points]
+
+    Returns
+    -------
+    z:
+        shape: [n_rows, n_points]
+    """
+    n_rows, n_points = rhs.shape
+    out = np.empty((n_rows, n_points))
+    rows_per_chunk = max(1, _CHUNK_POINTS // n_points)
+    u = penalty_banded.shape[0] - 1
+
+    for start in range(0, n_rows, rows_per_chunk):
+        stop = min(start + rows_per_chunk, n_rows)
+        ab = np.tile(penalty_banded, (1, stop - start))
+        ab[-1] += weights[start:stop].ravel()
+        b = rhs[start:stop].ravel()
+        try:
+            z = solveh_banded(ab, b, check_finite=False)
+        except np.linalg.LinAlgError:  # not positive definite (e.g. many zero weights); fall back to LU
+            z = solve_banded((u, u), _symmetric_to_general_banded(ab), b, check_finite=False)
+        out[start:stop] = z.reshape(stop - start, n_points)
+
+    return out
+
+
+def _check_parameters(max_iter: int, diff_order: int, p: float = None):
+    if max_iter < 2:
+        raise ValueError("max_iter needs to be greater than 2")
+    if p is not None and (p < 0 or p > 1):
+        raise ValueError('p must be between 0 and 1')
+    if diff_order not in (1, 2, 3):
+        raise ValueError(f'diff_order must be 1,2,3. \n\tgiven: {diff_order}')
+
+
+def _get_weight_array(z: np.ndarray, weights: np.ndarray | None, name: str) -> np.ndarray:
+    if weights is None:
+        return np.ones(z.shape)
+
+    weights = np.asarray(weights)
+    validation.check_array_size(weights, z.shape, name)
+    validation.check_array_inf_nan(weights, name)
+    return weights.astype(np.float64, copy=True)
+
+
+def _single_row_params(params: dict) -> dict:
+    tolerances = params['tolerances'][0]
+    return {'weights': params['weights'][0], 'tolerances': tolerances[np.isfinite(tolerances)]}
+
+
+def _as_row(weights: np.ndarray | None) -> np.ndarray | None:
+    if weights is None:
+        return None
+    return np.asarray(weights)[np.newaxis, :]
+
+
+def asymmetric_least_squared_array(
+        z: np.ndarray,
         lambda_: float = 1e6,
         p: float = 1e-2,
         diff_order: int = 2,
@@ -25,12 +261,13 @@ def asymmetric_least_squared(
         weights: np.ndarray = None
 ) -> tuple[np.ndarray, dict]:
     """
-   Asymmetric least squared (AsLS) fitting.
+    Asymmetric least squared (AsLS) fitting for every row of z at once.
 
     Parameters
     ----------
-    y:
-        y data
+    z:
+        shape: [n_rows, n_points]
+        y data (one spectrum per row)
     lambda_:
         smoothing parameter
         larger values = smoother baselines
@@ -45,56 +282,91 @@ def asymmetric_least_squared(
     tol:
         error tolerance for termination
     weights:
-        weights
+        shape: [n_rows, n_points]
+        initial weights
 
     Returns
     -------
     baseline:
+        shape: [n_rows, n_points]
     params :
+        weights: final weights [n_rows, n_points]
+        tolerances: [n_rows, iterations]; nan after a row has converged
 
     """
-    # check inputs
-    if max_iter < 2:
-        raise ValueError("max_iter needs to be greater than 2")
-    if p < 0 or p > 1:
-        raise ValueError('p must be between 0 and 1')
-    if diff_order not in (1, 2, 3):
-        raise ValueError(f'diff_order must be 1,2,3. \n\tgiven: {diff_order}')
-    if weights is None:
-        weight_array = np.ones(y.shape[0])
-    else:
-        validation.check_array_size(weights, y.shape, "asymmetric_least_squared.weights")
-        validation.check_array_inf_nan(weights, "asymmetric_least_squared.weights")
-        weight_array = np.asarray(weights).copy()
-
-    # setup
-    diff_matrix = sparse.diags(
-        diagonals[diff_order-1],
-        list(range(diff_order + 1)),
-        shape=(y.shape[0] - diff_order, y.shape[0])
-    )
-    d = lambda_ * diff_matrix.T * diff_matrix
-    w = sparse.diags(weight_array)
-
-    # solve
-    tolerances = np.empty(max_iter + 1)
+    _check_parameters(max_iter, diff_order, p)
+    weight_array = _get_weight_array(z, weights, "asymmetric_least_squared.weights")
+    penalty = get_penalty_banded(z.shape[1], lambda_, diff_order)
+
+    # solve (only rows that have not converged are solved each iteration)
+    baseline = np.empty(z.shape)
+    tolerances = np.full((z.shape[0], max_iter + 1), np.nan)
+    active = np.arange(z.shape[0])
     for i in range(max_iter + 1):
-        baseline = sparse.linalg.spsolve(w + d, weight_array * y)
+        y = z[active]
+        w = weight_array[active]
+        baseline_ = solve_whittaker_array(penalty, w, w * y)
+        baseline[active] = baseline_
 
-        mask = y > baseline
+        mask = y > baseline_
         new_weights = p * mask + (1 - p) * np.logical_not(mask)
 
-        rel_difference = np.sum(np.abs(weight_array - new_weights)) / np.sum(np.abs(weight_array + new_weights))
-        tolerances[i] = rel_difference
-        if rel_difference < tol:
+        rel_difference = np.sum(np.abs(w - new_weights), axis=1) / np.sum(np.abs(w + new_weights), axis=1)
+        tolerances[active, i] = rel_difference
+        not_done = np.logical_not(rel_difference < tol)
+        active = active[not_done]
+        if active.size == 0:
             break
-        weight_array = new_weights
-        w.setdiag(weight_array)
+        weight_array[active] = new_weights[not_done]
 
-    params = {'weights': weight_array, 'tolerances': tolerances[:i + 1]}
+    params = {'weights': weight_array, 'tolerances': tolerances[:, :i + 1]}
     return baseline, params
 
 
+def asymmetric_least_squared(
+        y: np.ndarray,
+        lambda_: float = 1e6,
+        p: float = 1e-2,
+        diff_order: int = 2,
+        max_iter: int = 50,
+        tol: float = 1e-3,
+        weights: np.ndarray = None
+) -> tuple[np.ndarray, dict]:
+    """
+   Asymmetric least squared (AsLS) fitting.
+
+    Parameters
+    ----------
+    y:
+        y data
+    lambda_:
+        smoothing parameter
+        larger values = smoother baselines
+    p:
+        penalizing weighting factor
+        0 < p < 1
+    diff_order:
+        values: 1, 2, 3
+       order of the differential matrix
+    max_iter:
+        max number of fit iterations
+    tol:
+        error tolerance for termination
+    weights:
+        weights
+
+    Returns
+    -------
+    baseline:
+    params :
+
+    """
+    baseline, params = asymmetric_least_squared_array(
+        y[np.newaxis, :], lambda_, p, diff_order, max_iter, tol, _as_row(weights)
+    )
+    return baseline[0], _single_row_params(params)
+
+
 class AsymmetricLeastSquared(BaselineCorrection):
     def __init__(self,
                  lambda_=1e6,
@@ -130,9 +402,31 @@ class AsymmetricLeastSquared(BaselineCorrection):
         )
         return np.interp(x, x_, y_baseline)
 
+    def get_baseline_array(self, x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+        if self.weights is not None:  # mask is different for each row
+            return super().get_baseline_array(x, y, z)
 
-def improved_asymmetric_least_squared(
-        y: np.ndarray,
+        baseline, params = asymmetric_least_squared_array(
+            z,
+            self.lambda_,
+            self.p,
+            self.diff_order,
+            self.max_iter,
+            self.tol,
+        )
+        return baseline
+
+
+def _second_difference_edges(z: np.ndarray) -> np.ndarray:
+    d1_z = np.empty(z.shape)
+    d1_z[:, 0] = z[:, 0] - z[:, 1]
+    d1_z[:, -1] = z[:, -1] - z[:, -2]
+    d1_z[:, 1:-1] = 2 * z[:, 1:-1] - z[:, :-2] - z[:, 2:]
+    return d1_z
+
+
+def improved_asymmetric_least_squared_array(
+        z: np.ndarray,
         lambda_: float = 1e6,
         lambda_1: float = 1e-4,
         p: float = 1e-2,
@@ -140,17 +434,20 @@ def improved_asymmetric_least_squared(
         max_iter: int = 50,
         tol: float = 1e-3,
         weights: np.ndarray = None
-):
+) -> tuple[np.ndarray, dict]:
     """
-   Asymmetric least squared (AsLS) fitting.
+    Improved asymmetric least squared (IAsLS) fitting for every row of z at once.
 
     Parameters
     ----------
-    y:
-        y data
+    z:
+        shape: [n_rows, n_points]
+        y data (one spectrum per row)
     lambda_:
         smoothing parameter
         larger values = smoother baselines
+    lambda_1:
+        first derivative smoothing parameter
     p:
         penalizing weighting factor
         0 < p < 1
@@ -162,62 +459,93 @@ def improved_asymmetric_least_squared(
     tol:
         error tolerance for termination
     weights:
-        weights
+        shape: [n_rows, n_points]
+        initial weights
 
     Returns
     -------
     baseline:
+        shape: [n_rows, n_points]
     params :
+        weights: final weights [n_rows, n_points]
+        tolerances: [n_rows, iterations]; nan after a row has converged
 
     """
-    # check inputs
-    if max_iter < 2:
-        raise ValueError("max_iter needs to be greater than 2")
-    if p < 0 or p > 1:
-        raise ValueError('p must be between 0 and 1')
-    if diff_order not in (1, 2, 3):
-        raise ValueError(f'diff_order must be 1,2,3. \n\tgiven: {diff_order}')
-    if weights is None:
-        weight_array = np.ones(y.shape[0])
-    else:
-        validation.check_array_size(weights, y.shape, "asymmetric_least_squared.weights")
-        validation.check_array_inf_nan(weights, "asymmetric_least_squared.weights")
-        weight_array = np.asarray(weights).copy()
-
-    # setup
-    diff_matrix = sparse.diags(
-        diagonals[diff_order-1],
-        list(range(diff_order + 1)),
-        shape=(y.shape[0] - diff_order, y.shape[0])
-    )
-    d = lambda_ * diff_matrix.T * diff_matrix
-    w = sparse.diags(weight_array)
+    _check_parameters(max_iter, diff_order, p)
+    weight_array = _get_weight_array(z, weights, "asymmetric_least_squared.weights")
+    penalty = get_penalty_banded(z.shape[1], lambda_, diff_order)
 
     # solve
-    d1_y = y.copy()
-    d1_y[0] = y[0] - y[1]
-    d1_y[-1] = y[-1] - y[-2]
-    d1_y[1:-1] = 2 * y[1:-1] - y[:-2] - y[2:]
-    d1_y = lambda_1 * d1_y
-    tolerances = np.empty(max_iter + 1)
+    d1_z = lambda_1 * _second_difference_edges(z)
+    baseline = np.empty(z.shape)
+    tolerances = np.full((z.shape[0], max_iter + 1), np.nan)
+    active = np.arange(z.shape[0])
     for i in range(max_iter + 1):
-        weight_squared = weight_array * weight_array
-        baseline = sparse.linalg.spsolve(w + d, weight_squared * y + d1_y)
+        y = z[active]
+        w = weight_array[active]
+        baseline_ = solve_whittaker_array(penalty, w, w * w * y + d1_z[active])
+        baseline[active] = baseline_
 
-        mask = y > baseline
+        mask = y > baseline_
         new_weights = p * mask + (1 - p) * np.logical_not(mask)
 
-        rel_difference = np.sum(np.abs(weight_array - new_weights)) / np.sum(np.abs(weight_array + new_weights))
-        tolerances[i] = rel_difference
-        if rel_difference < tol:
+        rel_difference = np.sum(np.abs(w - new_weights), axis=1) / np.sum(np.abs(w + new_weights), axis=1)
+        tolerances[active, i] = rel_difference
+        not_done = np.logical_not(rel_difference < tol)
+        active = active[not_done]
+        if active.size == 0:
             break
-        weight_array = new_weights
-        w.setdiag(weight_array)
+        weight_array[active] = new_weights[not_done]
 
-    params = {'weights': weight_array, 'tolerances': tolerances[:i + 1]}
+    params = {'weights': weight_array, 'tolerances': tolerances[:, :i + 1]}
     return baseline, params
 
 
+def improved_asymmetric_least_squared(
+        y: np.ndarray,
+        lambda_: float = 1e6,
+        lambda_1: float = 1e-4,
+        p: float = 1e-2,
+        diff_order: int = 2,
+        max_iter: int = 50,
+        tol: float = 1e-3,
+        weights: np.ndarray = None
+):
+    """
+   Asymmetric least squared (AsLS) fitting.
+
+    Parameters
+    ----------
+    y:
+        y data
+    lambda_:
+        smoothing parameter
+        larger values = smoother baselines
+    p:
+        penalizing weighting factor
+        0 < p < 1
+    diff_order:
+        values: 1, 2, 3
+       order of the differential matrix
+    max_iter:
+        max number of fit iterations
+    tol:
+        error tolerance for termination
+    weights:
+        weights
+
+    Returns
+    -------
+    baseline:
+    params :
+
+    """
+    baseline, params = improved_asymmetric_least_squared_array(
+        y[np.newaxis, :], lambda_, lambda_1, p, diff_order, max_iter, tol, _as_row(weights)
+    )
+    return baseline[0], _single_row_params(params)
+
+
 class ImprovedAsymmetricLeastSquared(BaselineCorrection):
     def __init__(self,
                  lambda_: float = 1e6,
@@ -257,6 +585,100 @@ class ImprovedAsymmetricLeastSquared(BaselineCorrection):
         )
         return np.interp(x, x_, y_baseline)
 
+    def get_baseline_array(self, x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+        if self.weights is not None:  # mask is different for each row
+            return super().get_baseline_array(x, y, z)
+
+        baseline, params = improved_asymmetric_least_squared_array(
+            z,
+            self.lambda_,
+            self.lambda_1,
+            self.p,
+            self.diff_order,
+            self.max_iter,
+            self.tol
+        )
+        return baseline
+
+
+def reweighted_improved_asymmetric_least_squared_array(
+        z: np.ndarray,
+        lambda_: float = 1e6,
+        diff_order: int = 2,
+        max_iter: int = 50,
+        tol: float = 1e-3,
+        weights: np.ndarray = None
+) -> tuple[np.ndarray, dict]:
+    """
+    Improved reweighted Asymmetric least squared (AsLS) fitting for every row of z at once.
+
+    Parameters
+    ----------
+    z:
+        shape: [n_rows, n_points]
+        y data (one spectrum per row)
+    lambda_:
+        smoothing parameter
+        larger values = smoother baselines
+    diff_order:
+        values: 1, 2, 3
+       order of the differential matrix
+    max_iter:
+        max number of fit iterations
+    tol:
+        error tolerance for termination
+    weights:
+        shape: [n_rows, n_points]
+        initial weights
+
+    Returns
+    -------
+    baseline:
+        shape: [n_rows, n_points]
+    params :
+        weights: final weights [n_rows, n_points]
+        tolerances: [n_rows, iterations]; nan after a row has converged
+
+    """
+    _check_parameters(max_iter, diff_order)
+    weight_array = _get_weight_array(z, weights, "reweighted_improved_asymmetric_least_squared.weights")
+    penalty = get_penalty_banded(z.shape[1], lambda_, diff_order)
+
+    # solve
+    baseline = np.empty(z.shape)
+    tolerances = np.full((z.shape[0], max_iter + 1), np.nan)
+    active = np.arange(z.shape[0])
+    for i in range(max_iter + 1):
+        y = z[active]
+        w = weight_array[active]
+        baseline_ = solve_whittaker_array(penalty, w, w * y)
+        baseline[active] = baseline_
+
+        residual = y - baseline_
+        neg_mask = residual < 0
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            # standard deviation (ddof=1) of the negative residuals of each row
+            n_neg = np.sum(neg_mask, axis=1)
+            mean_neg = np.sum(residual * neg_mask, axis=1) / n_neg
+            std = np.sqrt(np.sum(((residual - mean_neg[:, np.newaxis]) * neg_mask) ** 2, axis=1) / (n_neg - 1))
+            std[n_neg < 2] = np.nan
+            std[std == 0] = MIN_FLOAT
+            std = std[:, np.newaxis]
+
+            inner = (np.exp(i-1) / std) * (residual - 2 * std)
+            new_weights = 0.5 * (1 - (inner / np.sqrt(1 + inner ** 2)))
+
+            rel_difference = np.sum(np.abs(w - new_weights), axis=1) / np.sum(np.abs(w + new_weights), axis=1)
+        tolerances[active, i] = rel_difference
+        not_done = np.logical_and(np.isfinite(rel_difference), np.logical_not(rel_difference < tol))
+        active = active[not_done]
+        if active.size == 0:
+            break
+        weight_array[active] = new_weights[not_done]
+
+    params = {'weights': weight_array, 'tolerances': tolerances[:, :i + 1]}
+    return baseline, params
+
 
 def reweighted_improved_asymmetric_least_squared(
         y: np.ndarray,
@@ -292,51 +714,10 @@ def reweighted_improved_asymmetric_least_squared(
     params :
 
     """
-    # check inputs
-    if max_iter < 2:
-        raise ValueError("max_iter needs to be greater than 2")
-    if diff_order not in (1, 2, 3):
-        raise ValueError(f'diff_order must be 1,2,3. \n\tgiven: {diff_order}')
-    if weights is None:
-        weight_array = np.ones(y.shape[0])
-    else:
-        validation.check_array_size(weights, y.shape, "reweighted_improved_asymmetric_least_squared.weights")
-        validation.check_array_inf_nan(weights, "reweighted_improved_asymmetric_least_squared.weights")
-        weight_array = np.asarray(weights).copy()
-
-    # setup
-    diff_matrix = sparse.diags(
-        diagonals[diff_order-1],
-        list(range(diff_order + 1)),
-        shape=(y.shape[0] - diff_order, y.shape[0])
+    baseline, params = reweighted_improved_asymmetric_least_squared_array(
+        y[np.newaxis, :], lambda_, diff_order, max_iter, tol, _as_row(weights)
     )
-    d = lambda_ * diff_matrix.T * diff_matrix
-    w = sparse.diags(weight_array)
-
-    # solve
-    tolerances = np.empty(max_iter + 1)
-    for i in range(max_iter + 1):
-        baseline = sparse.linalg.spsolve(w + d, weight_array * y)
-
-        residual = y - baseline
-        std = np.std(residual[residual < 0], ddof=1)
-        if std == 0:
-            std = MIN_FLOAT
-        inner = (np.exp(i-1) / std) * (residual - 2 * std)
-        new_weights = 0.5 * (1 - (inner / np.sqrt(1 + inner ** 2)))
-
-        rel_difference = np.sum(np.abs(weight_array - new_weights)) / np.sum(np.abs(weight_array + new_weights))
-        tolerances[i] = rel_difference
-        if not np.isfinite(rel_difference):
-            break
-        if rel_difference < tol:
-            break
-        weight_array = new_weights
-        w.setdiag(weight_array)
-
-    params = {'weights': weight_array, 'tolerances': tolerances[:i + 1]}
-
-    return baseline, params
+    return baseline[0], _single_row_params(params)
 
 
 class ReweightedImprovedAsymmetricLeastSquared(BaselineCorrection):
@@ -372,6 +753,97 @@ class ReweightedImprovedAsymmetricLeastSquared(BaselineCorrection):
         )
         return np.interp(x, x_, y_baseline)
 
+    def get_baseline_array(self, x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+        if self.weights is not None:  # mask is different for each row
+            return super().get_baseline_array(x, y, z)
+
+        baseline, params = reweighted_improved_asymmetric_least_squared_array(
+            z,
+            self.lambda_,
+            self.diff_order,
+            self.max_iter,
+            self.tol
+        )
+        return baseline
+
+
+def adaptive_asymmetric_least_squared_array(
+        z: np.ndarray,
+        lambda_: float = 1e6,
+        diff_order: int = 2,
+        max_iter: int = 50,
+        tol: float = 1e-3,
+        weights: np.ndarray = None
+) -> tuple[np.ndarray, dict]:
+    """
+    adaptive iteratively reweighted penalized least squares for every row of z at once.
+
+    Parameters
+    ----------
+    z:
+        shape: [n_rows, n_points]
+        y data (one spectrum per row)
+    lambda_:
+        smoothing parameter
+        larger values = smoother baselines
+    diff_order:
+        values: 1, 2, 3
+       order of the differential matrix
+    max_iter:
+        max number of fit iterations
+    tol:
+        error tolerance for termination
+    weights:
+        shape: [n_rows, n_points]
+        initial weights
+
+    Returns
+    -------
+    baseline:
+        shape: [n_rows, n_points]
+    params :
+        weights: final weights [n_rows, n_points]
+        tolerances: [n_rows, iterations]; nan after a row has converged
+
+    References
+    ----------
+    Baseline correction using adaptive iteratively reweighted penalized least squares.
+    Analyst, 2010, 135(5), 1138-1146.
+    DOI: https://doi.org/10.1039/B922045C
+
+    """
+    _check_parameters(max_iter, diff_order)
+    weight_array = _get_weight_array(z, weights, "adaptive_asymmetric_least_squared.weights")
+    penalty = get_penalty_banded(z.shape[1], lambda_, diff_order)
+
+    # solve
+    z_l1_norm = np.abs(z).sum(axis=1)
+    baseline = np.empty(z.shape)
+    tolerances = np.full((z.shape[0], max_iter + 1), np.nan)
+    active = np.arange(z.shape[0])
+    for i in range(max_iter + 1):
+        y = z[active]
+        w = weight_array[active]
+        baseline_ = solve_whittaker_array(penalty, w, w * y)
+        baseline[active] = baseline_
+
+        residual = y - baseline_
+        neg_mask = (residual < 0)
+        # same as abs(residual[neg_mask]).sum() since residual[neg_mask] are all negative
+        residual_l1_norm = -1 * np.sum(residual * neg_mask, axis=1)
+        rel_difference = residual_l1_norm / z_l1_norm[active]
+        tolerances[active, i] = rel_difference
+        not_done = np.logical_not(rel_difference < tol)
+        active = active[not_done]
+        if active.size == 0:
+            break
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            new_weights = np.exp(i * np.abs(residual[not_done]) / residual_l1_norm[not_done, np.newaxis])
+        weight_array[active] = new_weights * neg_mask[not_done]
+
+    params = {'weights': weight_array, 'tolerances': tolerances[:, :i + 1]}
+    return baseline, params
+
 
 def adaptive_asymmetric_least_squared(
         y: np.ndarray,
@@ -416,44 +888,10 @@ def adaptive_asymmetric_least_squared(
     DOI: https://doi.org/10.1039/B922045C
 
     """
-    # check inputs
-    if max_iter < 2:
-        raise ValueError("max_iter needs to be greater than 2")
-    if diff_order not in (1, 2, 3):
-        raise ValueError(f'diff_order must be 1,2,3. \n\tgiven: {diff_order}')
-    if weights is None:
-        weight_array = np.ones(y.shape[0])
-    else:
-        validation.check_array_size(weights, y.shape, "adaptive_asymmetric_least_squared.weights")
-        validation.check_array_inf_nan(weights, "adaptive_asymmetric_least_squared.weights")
-        weight_array = np.asarray(weights).copy()
-
-    # setup
-    diff_matrix = sparse.diags(
-        diagonals[diff_order-1],
-        list(range(diff_order + 1)),
-        shape=(y.shape[0] - diff_order, y.shape[0])
+    baseline, params = adaptive_asymmetric_least_squared_array(
+        y[np.newaxis, :], lambda_, diff_order, max_iter, tol, _as_row(weights)
     )
-    d = lambda_ * diff_matrix.T * diff_matrix
-    w = sparse.diags(weight_array)
-
-    # solve
-    y_l1_norm = np.abs(y).sum()
-    tolerances = np.empty(max_iter + 1)
-    for i in range(max_iter + 1):
-        baseline = sparse.linalg.spsolve(w + d, weight_array * y)
-
-        residual = y - baseline
-        neg_mask = (residual < 0)
-        # same as abs(residual[neg_mask]).sum() since residual[neg_mask] are all negative
-        residual_l1_norm = -1 * residual[neg_mask].sum()
-        if residual_l1_norm / y_l1_norm < tol:
-            break
-        weight_array = np.exp(i * abs(residual) / residual_l1_norm) * neg_mask
-        w.setdiag(weight_array)
-
-    params = {'weights': weight_array, 'tolerances': tolerances[:i + 1]}
-    return baseline, params
+    return baseline[0], _single_row_params(params)
 
 
 class AdaptiveAsymmetricLeastSquared(BaselineCorrection):
@@ -487,3 +925,16 @@ class AdaptiveAsymmetricLeastSquared(BaselineCorrection):
             self.tol
         )
         return np.interp(x, x_, y_baseline)
+
+    def get_baseline_array(self, x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+        if self.weights is not None:  # mask is different for each row
+            return super().get_baseline_array(x, y, z)
+
+        baseline, params = adaptive_asymmetric_least_squared_array(
+            z,
+            self.lambda_,
+            self.diff_order,
+            self.max_iter,
+            self.tol
+        )
+        return baseline
@@ -0,0 +1,275 @@
+"""
+Executors control how `Processor` runs a `ProcessingMethod` over the rows of a SignalArray.
+
+Only methods with `row_independent = True` are split; every other method is run serially on the whole array.
+A row independent method must:
+    * compute each output row only from the same input row
+    * return the same x for any subset of rows and return y unchanged
+    * keep the number of columns of z
+Parameters with one entry per row must be sliced in `ProcessingMethod.get_chunk_copy`.
+"""
+from __future__ import annotations
+
+import abc
+import concurrent.futures
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import TYPE_CHECKING, Callable, Iterable
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from chem_analysis.processing.base import ProcessingMethod
+
+
+class Executor(abc.ABC):
+    """ Runs `ProcessingMethod.run_array` """
+
+    def __repr__(self):
+        return f"{type(self).__name__}"
+
+    @abc.abstractmethod
+    def run_array(self, method: ProcessingMethod, x: np.ndarray, y: np.ndarray, z: np.ndarray) \
+            -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        ...
+
+    def get_chunks(self, number_rows: int) -> list[slice]:
+        """ chunks of rows given to a worker at a time """
+        return [slice(0, number_rows)]
+
+    def map(self, function: Callable, items: Iterable, callback: Callable[[int], None] = None) -> list:
+        """
+        Run `function(item)` for each item (e.g., files to load, starting points of a fit).
+        Returns the result of each item (in order). 'function' must be picklable for `ProcessExecutor`.
+        'callback(number_of_items_done)' is called as each item finishes (in any order).
+        """
+        results = []
+        for item in items:
+            results.append(function(item))
+            if callback is not None:
+                callback(len(results))
+        return results
+
+    def map_rows(self, function: Callable, x: np.ndarray, y: np.ndarray, z: np.ndarray,
+                 callback: Callable[[int], None] = None) -> list:
+        """
+        Run `function(x, y[chunk], z[chunk], first_row)` over chunks of the rows of an array (use `map` for
+        anything else).
+        Returns the result of each chunk (in row order). 'function' must be picklable for `ProcessExecutor`.
+        'callback(number_of_rows_done)' is called as each chunk finishes (in any order).
+        """
+        result = [function(x, y, z, 0)]
+        if callback is not None:
+            callback(z.shape[0])
+        return result
+
+
+class SerialExecutor(Executor):
+    """ Runs every method in the current thread (default). """
+
+    def run_array(self, method: ProcessingMethod, x: np.ndarray, y: np.ndarray, z: np.ndarray) \
+            -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return method.run_array(x, y, z)
+
+
+class ChunkedExecutor(Executor, abc.ABC):
+    def __init__(self, max_workers: int = None, chunk_size: int = None):
+        """
+
+        Parameters
+        ----------
+        max_workers:
+            number of workers
+            default: os.cpu_count()
+        chunk_size:
+            number of rows given to a worker at a time
+            default: rows are split into 4 chunks per worker
+        """
+        if max_workers is not None and max_workers < 1:
+            raise ValueError(f"'{type(self).__name__}.max_workers' must be 1 or greater.")
+        if chunk_size is not None and chunk_size < 1:
+            raise ValueError(f"'{type(self).__name__}.chunk_size' must be 1 or greater.")
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+
+    def __repr__(self):
+        return f"{type(self).__name__}(workers: {self.workers})"
+
+    @property
+    def workers(self) -> int:
+        return self.max_workers or os.cpu_count() or 1
+
+    def get_chunks(self, number_rows: int) -> list[slice]:
+        if self.workers == 1:
+            return super().get_chunks(number_rows)
+        chunk_size = self.chunk_size or math.ceil(number_rows / (self.workers * 4))
+        chunk_size = max(chunk_size, 1)
+        return [slice(i, min(i + chunk_size, number_rows)) for i in range(0, number_rows, chunk_size)]
+
+    def run_array(self, method: ProcessingMethod, x: np.ndarray, y: np.ndarray, z: np.ndarray) \
+            -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        chunks = self.get_chunks(z.shape[0])
+        if not method.row_independent or self.workers == 1 or len(chunks) < 2:
+            return method.run_array(x, y, z)
+
+        return self._run_chunks(method, x, y, z, chunks)
+
+    @abc.abstractmethod
+    def _run_chunks(self, method: ProcessingMethod, x: np.ndarray, y: np.ndarray, z: np.ndarray,
+                    chunks: list[slice]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        ...
+
+    @abc.abstractmethod
+    def _get_pool(self) -> concurrent.futures.Executor:
+        ...
+
+    def _get_map_pool(self, function: Callable) -> tuple[concurrent.futures.Executor, Callable]:
+        """ pool for `map` and the callable submitted with each item """
+        return self._get_pool(), function
+
+    def map(self, function: Callable, items: Iterable, callback: Callable[[int], None] = None) -> list:
+        # one task per item: idle workers take the next item, so items that take longer do not hold up a chunk
+        items = list(items)
+        if self.workers == 1 or len(items) < 2:
+            return super().map(function, items, callback)
+
+        pool, submitted = self._get_map_pool(function)
+        with pool:
+            futures = [pool.submit(submitted, item) for item in items]
+            if callback is not None:
+                for done, _ in enumerate(concurrent.futures.as_completed(futures), start=1):
+                    callback(done)
+            return [future.result() for future in futures]
+
+    def map_rows(self, function: Callable, x: np.ndarray, y: np.ndarray, z: np.ndarray,
+                 callback: Callable[[int], None] = None) -> list:
+        chunks = self.get_chunks(z.shape[0])
+        if self.workers == 1 or len(chunks) < 2:
+            return super().map_rows(function, x, y, z, callback)
+
+        with self._get_pool() as pool:
+            futures = {pool.submit(function, x, y[chunk], z[chunk], chunk.start): chunk for chunk in chunks}
+            if callback is not None:
+                done = 0
+                for future in concurrent.futures.as_completed(futures):
+                    done += futures[future].stop - futures[future].start
+                    callback(done)
+            return [future.result() for future in futures]
+
+
+def _run_chunk(method: ProcessingMethod, x: np.ndarray, y: np.ndarray, z: np.ndarray) \
+        -> tuple[ProcessingMethod, np.ndarray, np.ndarray, np.ndarray]:
+    # 'method' is a copy for this chunk; results stored on it are merged after all chunks are done
+    x, y, z = method.run_array(x, y, z)
+    return method, x, y, z
+
+
+class ThreadExecutor(ChunkedExecutor):
+    """
+    Splits rows across a thread pool.
+    Best for methods that spend their time in numpy/scipy (which release the GIL); rows are passed as views so
+    nothing is copied.
+    """
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(max_workers=self.workers)
+
+    def _run_chunks(self, method: ProcessingMethod, x: np.ndarray, y: np.ndarray, z: np.ndarray,
+                    chunks: list[slice]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        with self._get_pool() as pool:
+            futures = [pool.submit(_run_chunk, method.get_chunk_copy(chunk), x, y[chunk], z[chunk])
+                       for chunk in chunks]
+            results = [future.result() for future in futures]
+
+        methods, x_chunks, y_chunks, z_chunks = zip(*results)
+        z_out = np.empty((z.shape[0], z_chunks[0].shape[1]), dtype=z_chunks[0].dtype)
+        for chunk, z_chunk in zip(chunks, z_chunks):
+            z_out[chunk] = z_chunk
+
+        method.merge_array_state(list(methods))
+        return x_chunks[0], np.concatenate(y_chunks), z_out
+
+
+def _run_chunk_shared(
+        method: ProcessingMethod,
+        x: np.ndarray,
+        y: np.ndarray,
+        chunk: slice,
+        shape: tuple[int, int],
+        dtype_in: np.dtype,
+        dtype_out: np.dtype,
+        name_in: str,
+        name_out: str
+) -> tuple[ProcessingMethod, np.ndarray, np.ndarray]:
+    shm_in = shared_memory.SharedMemory(name=name_in)
+    shm_out = shared_memory.SharedMemory(name=name_out)
+    try:
+        z = np.ndarray(shape, dtype=dtype_in, buffer=shm_in.buf)
+        z_out = np.ndarray(shape, dtype=dtype_out, buffer=shm_out.buf)
+        method, x, y, z_chunk = _run_chunk(method, x, y, z[chunk])
+        z_out[chunk] = z_chunk
+        del z, z_out, z_chunk  # release the buffers before closing
+    finally:
+        shm_in.close()
+        shm_out.close()
+
+    return method, x, y
+
+
+_worker_function: Callable | None = None
+
+
+def _set_worker_function(function: Callable):
+    global _worker_function
+    _worker_function = function
+
+
+def _call_worker_function(item):
+    return _worker_function(item)
+
+
+class ProcessExecutor(ChunkedExecutor):
+    """
+    Splits rows across a process pool.
+    Best for methods with python loops per row. z is copied once into shared memory and every worker reads
+    its rows from, and writes its result to, shared memory; only the method and the row slice are sent to a worker.
+    """
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.workers)
+
+    def _get_map_pool(self, function: Callable) -> tuple[ProcessPoolExecutor, Callable]:
+        # the function (and data bound to it) is sent once to each worker; only items are sent with each task
+        pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_set_worker_function, initargs=(function,))
+        return pool, _call_worker_function
+
+    def _run_chunks(self, method: ProcessingMethod, x: np.ndarray, y: np.ndarray, z: np.ndarray,
+                    chunks: list[slice]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        dtype_out = np.result_type(z.dtype, np.float64)
+        shm_in = shared_memory.SharedMemory(create=True, size=max(z.nbytes, 1))
+        shm_out = shared_memory.SharedMemory(create=True, size=max(z.size * dtype_out.itemsize, 1))
+        try:
+            z_shared = np.ndarray(z.shape, dtype=z.dtype, buffer=shm_in.buf)
+            z_shared[:] = z
+            del z_shared
+
+            with self._get_pool() as pool:
+                futures = [
+                    pool.submit(_run_chunk_shared, method.get_chunk_copy(chunk), x, y[chunk], chunk, z.shape, z.dtype,
+                                dtype_out, shm_in.name, shm_out.name)
+                    for chunk in chunks
+                ]
+                results = [future.result() for future in futures]
+
+            z_out = np.ndarray(z.shape, dtype=dtype_out, buffer=shm_out.buf).copy()
+        finally:
+            shm_in.close()
+            shm_in.unlink()
+            shm_out.close()
+            shm_out.unlink()
+
+        methods, x_chunks, y_chunks = zip(*results)
+        method.merge_array_state(list(methods))
+        return x_chunks[0], np.concatenate(y_chunks), z_out
@@ -0,0 +1,192 @@
+"""
+On-disk cache of processed results, shared between runs (and processes).
+
+An entry is keyed by a hash of the raw data (dtype, shape and bytes of x, y (and z)) and of the processing chain (the
+fingerprint of every method, in order; see `ProcessingMethod.fingerprint`; functions are hashed by their code). An
+entry is a directory of .npy files (one per output array) and the state of each method (values stored on the method
+when it ran, e.g. the baseline; 'state.json' and 'state.npz'), so a result loaded from the cache can be inspected as
+if the methods had run.
+
+Invalidation: keys are content hashes, so changing the raw data or any parameter of any method gives a new key and the
+old entry is never read again; it ages out by the size bound (least recently used entries are deleted first).
+`CACHE_VERSION` is part of every key; bump it when the output of a method changes without a change of its parameters
+(e.g., a fix to its algorithm). `ResultCache.clear` deletes everything.
+"""
+import json
+import logging
+import os
+import pathlib
+import shutil
+import uuid
+
+import numpy as np
+
+from chem_analysis.utils.fingerprint import fingerprint
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 2
+FILE_STATE = "state.json"
+FILE_STATE_ARRAYS = "state.npz"
+EVICT_TO = 0.9  # when 'max_size' is passed, entries are deleted until the cache is this fraction of 'max_size'
+
+
+class ResultCache:
+    """
+    Attributes
+    ----------
+    path: pathlib.Path
+        cache directory
+    max_size: int
+        max bytes on disk; least recently used entries are deleted first (the size is tracked as entries are
+        stored, so the directory is only scanned when it passes 'max_size'; entries stored by other processes are
+        counted at the next scan)
+    mmap_mode: str | None
+        passed to `np.load` ('r' memory maps cached results instead of reading them (read only); 'c' copy on
+        write memory maps (writable, the cache is not changed))
+    """
+    def __init__(self, path: str | pathlib.Path, max_size: int = 1024 ** 3, mmap_mode: str | None = None):
+        self.path = pathlib.Path(path)
+        self.max_size = max_size
+        self.mmap_mode = mmap_mode
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._size: int | None = None  # running total of bytes on disk (None: not scanned yet)
+
+    def __repr__(self):
+        return f"ResultCache({self.path}, {len(self)} entries)"
+
+    def __len__(self):
+        return sum(1 for _ in self._entries())
+
+    def _entries(self) -> list[os.DirEntry]:
+        return [entry for entry in os.scandir(self.path) if entry.is_dir() and not entry.name.startswith(".")]
+
+    @staticmethod
+    def get_key(chain_key: str, data: tuple[np.ndarray, ...]) -> str:
+        """ key from the key of the processing chain and the raw data """
+        return fingerprint((CACHE_VERSION, chain_key, tuple(np.asarray(array) for array in data)))
+
+    @property
+    def size(self) -> int:
+        """ bytes on disk """
+        return sum(_get_size(entry.path) for entry in self._entries())
+
+    def load(self, key: str) -> tuple[np.ndarray, ...] | None:
+        """ cached result (None if not cached) """
+        path = self.path / key
+        try:
+            files = sorted(path.glob("*.npy"), key=lambda file: int(file.stem))
+            data = tuple(np.load(file, mmap_mode=self.mmap_mode, allow_pickle=False) for file in files)
+            os.utime(path)  # most recently used
+        except (OSError, ValueError):  # not cached, or deleted by another process while reading
+            return None
+        if not data:
+            return None
+        return data
+
+    def load_state(self, key: str) -> list[dict] | None:
+        """ state of each method stored with the result (None if not cached) """
+        path = self.path / key
+        try:
+            with open(path / FILE_STATE, "r", encoding="utf-8") as file:
+                state = json.load(file)
+            with np.load(path / FILE_STATE_ARRAYS, allow_pickle=False) as arrays:
+                return [{name: _from_state_value(value, arrays) for name, value in method_state.items()}
+                        for method_state in state]
+        except (OSError, ValueError, KeyError):  # not cached, or deleted by another process while reading
+            return None
+
+    def store(self, key: str, data: tuple[np.ndarray, ...], state: list[dict] = None):
+        """
+        add a result (written to a temporary directory then renamed, so readers never see a partial entry)
+
+        Parameters
+        ----------
+        key:
+            see `get_key`
+        data:
+            output arrays
+        state:
+            state of each method (see `MixinParameters.get_state`); values must be None, bool, int, float, str or
+            numpy arrays/scalars, else the result is not stored
+        """
+        path = self.path / key
+        if path.exists():
+            os.utime(path)
+            return
+
+        state_arrays = {}
+        if state is not None:
+            try:
+                state = [
+                    {name: _to_state_value(value, f"{i}.{name}", state_arrays) for name, value in method_state.items()}
+                    for i, method_state in enumerate(state)
+                ]
+            except TypeError as e:
+                logger.debug(f"Result cache: not stored; {e}")
+                return
+
+        temp = self.path / f".{key}.{uuid.uuid4().hex}"
+        temp.mkdir()
+        try:
+            for i, array in enumerate(data):
+                np.save(temp / f"{i}.npy", np.asarray(array), allow_pickle=False)
+            if state is not None:
+                with open(temp / FILE_STATE, "w", encoding="utf-8") as file:
+                    json.dump(state, file)
+                np.savez(temp / FILE_STATE_ARRAYS, **state_arrays)
+            size = _get_size(temp)
+            os.replace(temp, path)
+        except OSError:  # stored by another process at the same time
+            shutil.rmtree(temp, ignore_errors=True)
+            return
+
+        if self._size is None:
+            self._size = self.size
+        else:
+            self._size += size
+        if self._size > self.max_size:
+            self.evict(int(self.max_size * EVICT_TO))
+
+    def evict(self, max_size: int = None):
+        """ delete least recently used entries until the cache is within 'max_size' (default: 'self.max_size') """
+        if max_size is None:
+            max_size = self.max_size
+        entries = [(entry.stat().st_mtime, _get_size(entry.path), entry.path) for entry in self._entries()]
+        size = sum(entry[1] for entry in entries)
+        for _, entry_size, path in sorted(entries):
+            if size <= max_size:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            size -= entry_size
+            logger.debug(f"Result cache: evicted {path}")
+        self._size = size
+
+    def remove(self, key: str):
+        shutil.rmtree(self.path / key, ignore_errors=True)
+        self._size = None
+
+    def clear(self):
+        for entry in os.scandir(self.path):
+            shutil.rmtree(entry.path, ignore_errors=True)
+        self._size = 0
+
+
+def _to_state_value(value, name: str, arrays: dict[str, np.ndarray]):
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (np.ndarray, np.generic)) and not value.dtype.hasobject:
+        arrays[name] = np.asarray(value)
+        return {"array": name, "scalar": isinstance(value, np.generic)}
+    raise TypeError(f"state '{name}' can not be stored ({type(value).__name__}).")
+
+
+def _from_state_value(value, arrays):
+    if not isinstance(value, dict):
+        return value
+    array = arrays[value["array"]]
+    return array[()] if value["scalar"] else array
+
+
+def _get_size(path: str) -> int:
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
@@ -1,11 +1,76 @@
 import abc
 
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 
 from chem_analysis.processing.base import ProcessingMethod
 
+# max number of values (rows * points * window) held in memory at once
+_CHUNK_SIZE = 2 ** 22
+
+
+def rolling_window_despike(z: np.ndarray, window: int = 20, m: float = 2) -> np.ndarray:
+    """
+    Rolling window despike (vectorized).
+
+    Each point is compared to a window of points around it; if its distance from the window median is more than
+    `m` median absolute deviations, it is replaced by the median of the non-outlier points in the window.
+    Windows are clipped to the ends of the data (so they always have `window` points).
+
+    Parameters
+    ----------
+    z:
+        shape: [n_points] or [n_rows, n_points]
+        data; each row is despiked separately
+    window:
+        number of points in the window (odd values are increased by one)
+    m:
+        number of median absolute deviations from the median that make an outlier
+
+    Returns
+    -------
+    z:
+        despiked data (same shape as input)
+    """
+    z = np.asarray(z)
+    if z.ndim not in (1, 2):
+        raise ValueError(f"'z' must be 1D or 2D. \n\treceived: {z.shape}")
+    z_2d = z.reshape(1, -1) if z.ndim == 1 else z
+
+    n_points = z_2d.shape[1]
+    window = min(window + window % 2, n_points)
+    span = window // 2
+    starts = np.clip(np.arange(n_points) - span, 0, n_points - window)
+    position = (np.arange(n_points) - starts).reshape(1, -1, 1)  # location of each point in its window
+
+    out = z_2d.astype(np.result_type(z_2d.dtype, np.float64), copy=True)
+    rows_per_chunk = max(1, _CHUNK_SIZE // (n_points * window))
+    for start in range(0, z_2d.shape[0], rows_per_chunk):
+        rows = slice(start, start + rows_per_chunk)
+        windows = sliding_window_view(z_2d[rows], window, axis=1)[:, starts, :]  # [rows, n_points, window]
+        distance = np.abs(windows - np.median(windows, axis=-1, keepdims=True))
+        median_deviation = np.median(distance, axis=-1)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            distance_point = np.take_along_axis(distance, position, axis=-1)[:, :, 0]
+            outlier = (median_deviation != 0) & (distance_point / median_deviation > m)
+        if not np.any(outlier):
+            continue
+
+        # replace outliers with median of the non-outliers in their window
+        index_row, index_point = np.nonzero(outlier)
+        windows_outlier = windows[index_row, index_point]
+        not_outliers = np.logical_not(
+            distance[index_row, index_point] / median_deviation[index_row, index_point, np.newaxis] > m
+        )
+        out[start + index_row, index_point] = \
+            np.nanmedian(np.where(not_outliers, windows_outlier, np.nan), axis=1)
+
+    return out.reshape(z.shape)
+
 
 class Despike(ProcessingMethod, abc.ABC):
+    row_independent = True
 
     @abc.abstractmethod
     def run(self, x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
@@ -35,22 +100,11 @@ class RollingWindow(Despike):
         else:
             return data[pos]
 
-    def run(self, x: np.ndarray, y: np.ndarray, ) -> tuple[np.ndarray, np.ndarray]:
-        out = np.empty_like(y)
-
-        if self.window % 2 != 0:
-            self.window += 1
-
-        span = int(self.window / 2)
-        for i in range(len(y)):
-            if i < span:  # left edge
-                out[i] = self.window_calc(y[:self.window], i, self.m)
-            elif i > len(y) - span:  # right edge
-                out[i] = self.window_calc(y[self.window:], i - (len(y) - self.window), self.m)
-            else:  # middle
-                out[i] = self.window_calc(y[i - span:i + span], span, self.m)
+    def run(self, x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        return x, rolling_window_despike(y, self.window, self.m)
 
-        return x, out
+    def run_array(self, x: np.ndarray, y: np.ndarray, z: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return x, y, rolling_window_despike(z, self.window, self.m)
 
     @staticmethod
     def _test():
@@ -1,7 +1,7 @@
 import abc
 
 import numpy as np
-from scipy.ndimage import gaussian_filter
+from scipy.ndimage import gaussian_filter, gaussian_filter1d
 from scipy.signal import savgol_filter
 
 from chem_analysis.processing.base import ProcessingMethod
@@ -12,6 +12,8 @@ class Smoothing(ProcessingMethod, abc.ABC):
 
 
 class Gaussian(Smoothing):
+    row_independent = True
+
     def __init__(self, sigma: float | int = 10):
         """
 
@@ -26,9 +28,7 @@ class Gaussian(Smoothing):
         return x, gaussian_filter(y, self.sigma)
 
     def run_array(self, x: np.ndarray, y: np.ndarray, z: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
-        for i in range(z.shape[0]):
-            _, z[i, :] = self.run(x, z[i, :])
-        return x, y, z
+        return x, y, gaussian_filter1d(z, self.sigma, axis=1)
 
     # def run_2D(self, x: np.ndarray, y: np.ndarray, z: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
     #     return x, y, gaussian_filter(z, self.sigma)
@@ -67,11 +67,47 @@ class SavitzkyGolay(Smoothing):
         return x, savgol_filter(y, self.window_length, self.order)
 
     def run_array(self, x: np.ndarray, y: np.ndarray, z: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
-        if self.window_length > len(z.shape[0]):
+        if self.window_length > z.shape[0]:
             raise ValueError(f"'SavitzkyGolay.window_length'({self.window_length}) must be less than or "
-                             f"equal to the first dimension of z ({len(z.shape[0])}).")
+                             f"equal to the first dimension of z ({z.shape[0]}).")
         return x, y, savgol_filter(z, self.window_length, self.order, axis=0)
 
+    # streaming: outputs within 'window_length' rows of the end are revised when new rows arrive
+    @property
+    def streamable(self) -> bool:
+        return True
+
+    @property
+    def stream_lag(self) -> int:
+        return self.window_length
+
+    def reset_stream(self, max_revised: int = 0):
+        self._stream_tail = None  # last input rows (enough to recompute every output that can change)
+        self._stream_count = 0  # number of rows received
+        self._stream_max_revised = max_revised
+
+    def run_array_stream(self, x: np.ndarray, y: np.ndarray, z: np.ndarray, n_revised: int = 0) \
+            -> tuple[np.ndarray, np.ndarray, int]:
+        start = self._stream_count - n_revised  # first changed input row
+        if self._stream_tail is None:
+            tail, tail_start = z, 0
+        else:
+            tail_start = self._stream_count - self._stream_tail.shape[0]
+            tail = np.concatenate((self._stream_tail[:start - tail_start], z))
+
+        if tail.shape[0] < self.window_length:  # not enough rows to filter yet
+            out, out_start = tail, tail_start
+        else:
+            out = savgol_filter(tail, self.window_length, self.order, axis=0)
+            out_start = max(start - self.window_length, tail_start)
+            out = out[out_start - tail_start:]
+
+        n_keep = 2 * self.window_length + self._stream_max_revised
+        self._stream_tail = tail[-n_keep:].copy()
+        n_revised_out = self._stream_count - out_start
+        self._stream_count = start + z.shape[0]
+        return x, out, n_revised_out
+
     # def run_2D(self, x: np.ndarray, y: np.ndarray, z: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
     #     # TODO: double check if this truely does 2D
     #     if self.window_length > len(z.shape[0]) or self.window_length > len(z.shape[1]):
@@ -98,10 +134,41 @@ class ExponentialTime(Smoothing):
     def run(self, x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
         raise NotImplementedError("Only valid for SignalArrays")
 
-    def run_array(self, x: np.ndarray, y: np.ndarray, z: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    def _filter(self, z: np.ndarray, previous: np.ndarray | None) -> np.ndarray:
+        z_out = np.empty(z.shape, dtype=np.result_type(z.dtype, np.float64))
+        if z.shape[0] == 0:
+            return z_out
+        z_out[0, :] = z[0, :] if previous is None else self.a * previous + self._other_a * z[0, :]
         for row in range(1, z.shape[0]):
-            z[row, :] = self.a * z[row - 1, :] + self._other_a * z[row, :]
-        return x, y, z
+            z_out[row, :] = self.a * z_out[row - 1, :] + self._other_a * z[row, :]
+        return z_out
+
+    def run_array(self, x: np.ndarray, y: np.ndarray, z: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return x, y, self._filter(z, None)
+
+    # streaming: the last outputs are kept so revised input rows can be filtered again
+    @property
+    def streamable(self) -> bool:
+        return True
+
+    def reset_stream(self, max_revised: int = 0):
+        self._stream_outputs = None  # last 'max_revised' + 1 output rows
+        self._stream_max_revised = max_revised
+
+    def run_array_stream(self, x: np.ndarray, y: np.ndarray, z: np.ndarray, n_revised: int = 0) \
+            -> tuple[np.ndarray, np.ndarray, int]:
+        outputs = self._stream_outputs
+        if outputs is not None and n_revised > 0:
+            outputs = outputs[:-n_revised]
+        previous = outputs[-1] if outputs is not None and outputs.shape[0] > 0 else None
+
+        z_out = self._filter(z, previous)
+        if outputs is not None:
+            z_out_all = np.concatenate((outputs, z_out))
+        else:
+            z_out_all = z_out
+        self._stream_outputs = z_out_all[-(self._stream_max_revised + 1):].copy()
+        return x, z_out, n_revised
 
 
 class GaussianTime(Smoothing):
@@ -119,9 +186,7 @@ class GaussianTime(Smoothing):
         raise NotImplementedError("Only valid for SignalArrays")
 
     def run_array(self, x: np.ndarray, y: np.ndarray, z: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
-        for row in range(z.shape[1]):
-            z[:, row] = gaussian_filter(z[:, row], self.sigma)
-        return x, y, z
+        return x, y, gaussian_filter1d(z, self.sigma, axis=0)
 
     # def run_2D(self, x: np.ndarray, y: np.ndarray, z: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
     #     return x, y, gaussian_filter(z, self.sigma)
@@ -23,16 +23,16 @@ class Horizontal(Translations):
         self.shift_index = shift_index
         self.wrap = wrap
 
-    def _get_shift_index(self, x: np.ndarray):
+    def _get_shift_index(self, x: np.ndarray) -> int | np.ndarray:
         if self.shift_index is not None:
-            return
+            return self.shift_index
 
         if isinstance(self.shift_x, Sequence):
-            self.shift_index = np.zeros_like(self.shift_x, dtype=np.int32)
+            shift_index = np.zeros_like(self.shift_x, dtype=np.int32)
             for i in range(len(self.shift_x)):
-                self.shift_index[i] = self._get_shift_index_single(x, self.shift_x[i])
-        else:
-            self.shift_index = self._get_shift_index_single(x, self.shift_x)
+                shift_index[i] = self._get_shift_index_single(x, self.shift_x[i])
+            return shift_index
+        return self._get_shift_index_single(x, self.shift_x)
 
     @staticmethod
     def _get_shift_index_single(x: np.ndarray, shift_x: float) -> int:
@@ -49,49 +49,52 @@ class Horizontal(Translations):
     def run(self, x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
         if isinstance(self.shift_index, Sequence) or isinstance(self.shift_x, Sequence):
             raise ValueError("For x-y signals, provide single values for 'shift_index' and 'shift_x'.")
-        self._get_shift_index(x)
+        shift_index = self._get_shift_index(x)
 
-        if self.shift_index == 0:
+        if shift_index == 0:
             return x, y
 
         if self.wrap:
-            y = np.roll(y, self.shift_index)
+            y = np.roll(y, shift_index)
             return x, y
 
-        if self.shift_index > 0:
-            y = y[:-self.shift_index]
-            x = x[self.shift_index:]
+        if shift_index > 0:
+            y = y[:-shift_index]
+            x = x[shift_index:]
         else:
-            y = y[self.shift_index:]
-            x = x[:-self.shift_index]
+            y = y[shift_index:]
+            x = x[:-shift_index]
         return x, y
 
     def run_array(self, x: np.ndarray, y: np.ndarray, z: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
-        self._get_shift_index(x)
+        shift_index = self._get_shift_index(x)
 
-        if isinstance(self.shift_index, int):
-            if self.shift_index == 0:
+        if isinstance(shift_index, (int, np.integer)):
+            if shift_index == 0:
                 return x, y, z
             if self.wrap:
-                z = np.roll(z, self.shift_index, axis=1)
+                z = np.roll(z, shift_index, axis=1)
                 return x, y, z
-            if self.shift_index > 0:
-                z = z[:, -self.shift_index]
-                x = x[self.shift_index:]
+            if shift_index > 0:
+                z = z[:, -shift_index]
+                x = x[shift_index:]
             else:
-                z = z[:, self.shift_index:]
-                x = x[:-self.shift_index]
+                z = z[:, shift_index:]
+                x = x[:-shift_index]
             return x, y, z
 
         if not self.wrap:
             raise ValueError("'wrap must be true otherwise different x-axis are needed.")
+        z_out = np.empty_like(z)
         for i in range(z.shape[0]):
-            z[i, :] = np.roll(z[i, :], self.shift_index[i])
+            z_out[i, :] = np.roll(z[i, :], shift_index[i])
 
-        return x, y, z
+        return x, y, z_out
 
 
 class Subtract(Translations):
+    row_independent = True
+
     def __init__(self, y_subtract: np.ndarray, x_subtract: np.ndarray = None):
         self.y_subtract = y_subtract
         self.x_subtract = x_subtract  # TODO: add with interplation
@@ -103,7 +106,23 @@ class Subtract(Translations):
         return x, y, z - self.y_subtract
 
 
+def _get_range_index(x: np.ndarray, range_: tuple[float, float] | None, range_index: slice | None) -> slice:
+    if range_ is not None:
+        return get_slice(x, range_[0], range_[1])
+    if range_index is None:
+        return slice(0, -1)
+    return range_index
+
+
 class AlignMax(Translations):
+    """
+    Attributes (set when run)
+    -------------------------
+    x_value_index: int
+        index of the x value the max is aligned to
+    shift_index: int | np.ndarray
+        shift of the signal (of each row for arrays)
+    """
     def __init__(self,
                  range_: tuple[float, float] = None,
                  range_index: slice = None,
@@ -120,13 +139,10 @@ class AlignMax(Translations):
     def run(self, x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
         if self.x_value is None:
             raise ValueError("Set the 'AlignMax.x_value' you want to align the max to.")
-        if self.range_ is not None:
-            self.range_index = get_slice(x, self.range_[0], self.range_[1])
-        if self.range_index is None:
-            self.range_index = slice(0, -1)
+        range_index = _get_range_index(x, self.range_, self.range_index)
 
         # get shift index
-        max_indices = np.argmax(y[self.range_index]) + self.range_index.start
+        max_indices = np.argmax(y[range_index]) + range_index.start
         self.x_value_index = np.argmin(np.abs(x - self.x_value))
         self.shift_index = self.x_value_index - max_indices
 
@@ -134,19 +150,15 @@ class AlignMax(Translations):
         return translation.run(x, y)
 
     def run_array(self, x: np.ndarray, y: np.ndarray, z: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
-        if self.range_ is not None:
-            self.range_index = get_slice(x, self.range_[0], self.range_[1])
-        if self.range_index is None:
-            self.range_index = slice(0, -1)
+        range_index = _get_range_index(x, self.range_, self.range_index)
         if self.x_value is None:
             # use first spectra max as reference
-            self.x_value_index = np.argmax(z[0, self.range_index]) + self.range_index.start
-            self.x_value = x[self.x_value_index]
+            self.x_value_index = np.argmax(z[0, range_index]) + range_index.start
         else:
             self.x_value_index = np.argmin(np.abs(x - self.x_value))
 
         # get shift index
-        max_indices = np.argmax(z[:, self.range_index], axis=1) + self.range_index.start
+        max_indices = np.argmax(z[:, range_index], axis=1) + range_index.start
         self.shift_index = self.x_value_index - max_indices
 
         translation = Horizontal(shift_index=self.shift_index, wrap=self.wrap)
@@ -154,6 +166,12 @@ class AlignMax(Translations):
 
 
 class ScaleMax(Translations):
+    """
+    Attributes (set when run)
+    -------------------------
+    scale: float | np.ndarray
+        scale applied (to each row for arrays)
+    """
     def __init__(self,
                  range_: tuple[float, float] = None,
                  range_index: slice = None,
@@ -169,23 +187,18 @@ class ScaleMax(Translations):
     def run(self, x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
         if self.new_max_value is None:
             raise ValueError("Set the 'AlignMax.x_value' you want to align the max to.")
-        if self.range_ is not None:
-            self.range_index = get_slice(x, self.range_[0], self.range_[1])
-        if self.range_index is None:
-            self.range_index = slice(0, -1)
+        range_index = _get_range_index(x, self.range_, self.range_index)
 
-        self.scale = self.new_max_value / np.max(y[self.range_index])
+        self.scale = self.new_max_value / np.max(y[range_index])
         return x, y * self.scale
 
     def run_array(self, x: np.ndarray, y: np.ndarray, z: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
-        if self.range_ is not None:
-            self.range_index = get_slice(x, self.range_[0], self.range_[1])
-        if self.range_index is None:
-            self.range_index = slice(0, -1)
-        if self.new_max_value is None:
+        range_index = _get_range_index(x, self.range_, self.range_index)
+        new_max_value = self.new_max_value
+        if new_max_value is None:
             # use first spectra max as reference
-            self.new_max_value = np.max(z[0, self.range_index])
+            new_max_value = np.max(z[0, range_index])
 
         # get shift index
-        self.scale = self.new_max_value / np.max(z[:, self.range_index], axis=1)
+        self.scale = new_max_value / np.max(z[:, range_index], axis=1)
         return x, y, z * self.scale.reshape(-1, 1)
@@ -6,10 +6,11 @@ import numpy as np
 
 from chem_analysis.utils.math import get_slice
 from chem_analysis.utils.code_for_subclassing import MixinSubClassList
+from chem_analysis.utils.parameters import MixinParameters
 import chem_analysis.processing.weigths.penalty_functions as penalty_functions
 
 
-class DataWeight(MixinSubClassList, abc.ABC):
+class DataWeight(MixinSubClassList, MixinParameters, abc.ABC):
     def __init__(self, threshold: float = 0.5, normalized: bool = True):
         self.threshold = threshold
         self.normalized = normalized
@@ -125,7 +126,7 @@ class DataWeightChain(DataWeight):
         if weights is None:
             weights = []
         if not isinstance(weights, Iterable):
-            weights = list(weights)
+            weights = [weights]
         self.weights = weights
 
     def get_weights(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
@@ -6,6 +6,7 @@ import numpy as np
 from chem_analysis.base_obj.signal_array import SignalArray
 from chem_analysis.sec.sec_calibration import SECCalibration
 from chem_analysis.sec.sec_signal import SECSignal, SECTypes
+from chem_analysis.sec.sec_math_functions import calculate_mw_averages
 from chem_analysis.analysis.peak_SEC import PeakSEC
 
 
@@ -38,15 +39,31 @@ class SECSignalArray(SignalArray):
         else:
             sig = SECSignal(x_raw=self.x_raw, y_raw=self.data_raw[index, :], calibration=self.calibration,
                             type_=self.type_,
-                            x_label=self.x_label, y_label=self.y_label, name=f"time: {self.time[index]}", id_=index)
+                            x_label=self.x_label, y_label=self.y_label, name=f"time: {self.time_raw[index]}", id_=index)
             sig.processor = self.processor.get_copy()
 
-        sig.time = self.time[index]
+        sig.time = self.time[index] if processed else self.time_raw[index]
         return sig
 
+    def get_mw_averages(self, processed: bool = True) -> np.ndarray:
+        """
+        Mn, Mw, Mz, Mz+1 and D of every row (signal within the calibration bounds).
+
+        Returns
+        -------
+        averages:
+            shape: [n_rows]
+            dtype: MW_AVERAGES_DTYPE (mw_n, mw_w, mw_z, mw_z1, mw_d)
+        """
+        if self.calibration is None:
+            raise ValueError("'SECSignalArray.calibration' is needed to calculate molecular weights.")
+        x, data = (self.x, self.data) if processed else (self.x_raw, self.data_raw)
+        return calculate_mw_averages(self.calibration.get_y(np.array(x, dtype=np.float64)), data)
+
     @classmethod
-    def from_file(cls, path: str | pathlib.Path, calibration: SECCalibration = None) -> SECSignalArray:
-        class_ = super().from_file(path)
+    def from_file(cls, path: str | pathlib.Path, calibration: SECCalibration = None, mmap_mode: str | None = None) \
+            -> SECSignalArray:
+        class_ = super().from_file(path, mmap_mode)
         class_.calibration = calibration
 
         return class_
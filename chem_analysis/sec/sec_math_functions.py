@@ -1,22 +1,60 @@
 import numpy as np
 
-from chem_analysis.utils.math import check_for_flip
-
-
-def calculate_Mn_D_from_wi(mw_i: np.ndarray, wi: np.ndarray) -> tuple[float, float]:
-    """ calculate Mn and D from wi vs MW data (MW goes low to high) """
-    # flip data if giving backwards; it should be MW low to MW high
-    mw_i, wi = check_for_flip(mw_i, wi)
-
-    data_points = len(mw_i)
-    wi_d_mi = np.zeros(data_points)
-    wi_m_mi = np.zeros(data_points)
-    for i in range(data_points):
-        if mw_i[i] != 0:
-            wi_d_mi[i] = wi[i] / mw_i[i]
-        wi_m_mi[i] = wi[i] * mw_i[i]
-
-    mw_n = np.sum(wi) / np.sum(wi_d_mi)
-    mw_w = np.sum(wi_m_mi) / np.sum(wi)
-    mw_d = mw_w / mw_n
-    return mw_n, mw_d
+MW_AVERAGES_DTYPE = np.dtype([(name, np.float64) for name in ("mw_n", "mw_w", "mw_z", "mw_z1", "mw_d")])
+
+
+def calculate_mw_averages(mw_i: np.ndarray, wi: np.ndarray) -> np.ndarray:
+    """
+    Calculate the number (Mn), weight (Mw), z (Mz) and z+1 (Mz+1) average molecular weight and dispersity (D = Mw/Mn)
+    from wi vs MW data, for one or many signals at once (e.g. every row of a SECSignalArray).
+
+    Points with MW = 0 (outside the calibration) are excluded. Order of the points does not matter.
+
+    Parameters
+    ----------
+    mw_i:
+        molecular weight of each point
+        shape: [n] (same for every row) or [n_rows, n]
+    wi:
+        weight fraction of each point (any scale)
+        shape: [n] or [n_rows, n]
+
+    Returns
+    -------
+    averages:
+        shape: [] (1D wi) or [n_rows]
+        dtype: MW_AVERAGES_DTYPE (mw_n, mw_w, mw_z, mw_z1, mw_d)
+    """
+    mw_i = np.asarray(mw_i, dtype=np.float64)
+    wi = np.asarray(wi, dtype=np.float64)
+
+    # moments: sum(wi * mw_i^k) for k = -1, 0, 1, 2, 3
+    valid = mw_i != 0
+    powers = (
+        np.divide(1, mw_i, out=np.zeros_like(mw_i), where=valid),
+        valid.astype(np.float64),
+        mw_i,
+        mw_i ** 2,
+        mw_i ** 3
+    )
+    if mw_i.ndim == 1:
+        moments = wi @ np.stack(powers, axis=-1)  # every row in one matrix product
+    else:
+        moments = np.stack([np.einsum("...j,...j->...", wi, power) for power in powers], axis=-1)
+
+    averages = np.empty(moments.shape[:-1], dtype=MW_AVERAGES_DTYPE)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        averages["mw_n"] = moments[..., 1] / moments[..., 0]
+        averages["mw_w"] = moments[..., 2] / moments[..., 1]
+        averages["mw_z"] = moments[..., 3] / moments[..., 2]
+        averages["mw_z1"] = moments[..., 4] / moments[..., 3]
+        averages["mw_d"] = averages["mw_w"] / averages["mw_n"]
+    return averages
+
+
+def calculate_Mn_D_from_wi(mw_i: np.ndarray, wi: np.ndarray) -> tuple[float | np.ndarray, float | np.ndarray]:
+    """ calculate Mn and D from wi vs MW data (see `calculate_mw_averages`) """
+    averages = calculate_mw_averages(mw_i, wi)
+    if averages.ndim == 0:
+        return float(averages["mw_n"]), float(averages["mw_d"])
+    return averages["mw_n"], averages["mw_d"]
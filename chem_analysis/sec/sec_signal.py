@@ -37,8 +37,6 @@ class SECSignal(Signal):
         self.calibration = calibration
         self.type_ = type_
 
-        self._mw_i = None
-
     def __repr__(self):
         text = super().__repr__()
         if self.type_ is not SECTypes.UNKNOWN:
@@ -60,12 +58,10 @@ class SECSignal(Signal):
 
     @property
     def mw_i(self) -> np.ndarray | None:
+        """ molecular weight at each x (cached by the calibration per x grid, so it follows processing of x) """
         if self.calibration is None:
             return None
-        if self._mw_i is None:
-            self._mw_i = self.calibration.get_y(self.x)
-
-        return self._mw_i
+        return self.calibration.get_y(self.x)
 
     def _limits(self) -> tuple[int, int] | None:
         if not self.calibration:
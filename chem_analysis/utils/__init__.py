@@ -1,2 +1,4 @@
 import chem_analysis.utils.math as math
 import chem_analysis.utils.feather_format as feather
+import chem_analysis.utils.csv_format as csv_format
+import chem_analysis.utils.dataset_format as dataset
@@ -0,0 +1,70 @@
+import numpy as np
+
+
+class BufferGrowing:
+    """
+    Row buffer with amortized O(1) appends.
+
+    Rows are stored in an array with spare capacity that grows geometrically, so appending `k` rows only copies
+    `k` rows (plus, rarely, a reallocation).
+    The initial array is used as is (not copied) until more rows are needed than it has.
+    """
+    __slots__ = ("_buffer", "_length", "_view", "growth")
+
+    def __init__(self, data: np.ndarray, growth: float = 1.5):
+        """
+
+        Parameters
+        ----------
+        data:
+            initial rows; first dimension is rows
+        growth:
+            factor the capacity is increased by when full
+        """
+        if growth <= 1:
+            raise ValueError(f"'BufferGrowing.growth' must be greater than 1.\n\tgiven: {growth}")
+        self.growth = growth
+        self._buffer = data
+        self._length = data.shape[0]
+        self._view = data
+
+    def __repr__(self):
+        return f"BufferGrowing: {self._length} rows (capacity: {self.capacity})"
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def capacity(self) -> int:
+        return self._buffer.shape[0]
+
+    @property
+    def data(self) -> np.ndarray:
+        """ view of the filled rows; the same object is returned until the buffer is changed """
+        return self._view
+
+    def _reserve(self, length: int, dtype: np.dtype):
+        dtype = np.result_type(self._buffer.dtype, dtype)
+        if length <= self.capacity and dtype == self._buffer.dtype and self._buffer.flags.writeable:
+            return
+
+        capacity = max(length, int(self.capacity * self.growth) + 1)
+        buffer = np.empty((capacity,) + self._buffer.shape[1:], dtype=dtype)
+        buffer[:self._length] = self._buffer[:self._length]
+        self._buffer = buffer
+
+    def write(self, start: int, rows: np.ndarray):
+        """
+        Write rows starting at row 'start'; rows after the written ones are dropped.
+        'start' = len(buffer) appends; 'start' < len(buffer) replaces the last rows.
+        """
+        if not 0 <= start <= self._length:
+            raise ValueError(f"'start' must be between 0 and {self._length}.\n\tgiven: {start}")
+        rows = np.asarray(rows)
+        self._reserve(start + rows.shape[0], rows.dtype)
+        self._buffer[start:start + rows.shape[0]] = rows
+        self._length = start + rows.shape[0]
+        self._view = self._buffer if self._length == self.capacity else self._buffer[:self._length]
+
+    def append(self, rows: np.ndarray):
+        self.write(self._length, rows)
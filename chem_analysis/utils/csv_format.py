@@ -0,0 +1,161 @@
+"""
+Fast CSV reading of numeric data (pyarrow.csv)
+
+Blocks of the file are parsed on multiple threads straight into typed columns, instead of a Python `float()` per
+cell. The delimiter and whether the first row is a header are sniffed from the start of the file.
+`iter_csv_blocks` streams the file as blocks of rows, so files larger than memory can be processed.
+"""
+import csv
+import pathlib
+from typing import Iterator, Sequence
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+DELIMITERS = ",;\t"
+BLOCK_SIZE = 4 * 1024 ** 2  # bytes parsed at a time (per thread)
+
+
+def _is_number(text: str) -> bool:
+    try:
+        float(text)
+    except ValueError:
+        return False
+    return True
+
+
+def sniff_csv(path: str | pathlib.Path, delimiter: str = None, sample_size: int = 64 * 1024) \
+        -> tuple[str, list[str], bool, int]:
+    """
+    Sniff the delimiter and header of a CSV file from its start.
+
+    Parameters
+    ----------
+    path:
+        csv file
+    delimiter:
+        default: sniffed
+    sample_size:
+        number of bytes read (more if the first line is longer)
+
+    Returns
+    -------
+    delimiter:
+        given; else one of DELIMITERS (default: ',')
+    first_row:
+        cells of the first row
+    header:
+        True if the first row is not all numbers (column names)
+    line_length:
+        length of the first line (bytes); a block must hold a whole line
+    """
+    with open(path, "rb") as file:
+        sample = file.read(sample_size)
+        while b"\n" not in sample:  # very wide file: read until the end of the first line
+            more = file.read(sample_size)
+            if not more:
+                break
+            sample += more
+
+    lines = [line.decode("utf-8-sig", errors="ignore") for line in sample.splitlines()[:20] if line.strip()]
+    if not lines:
+        raise ValueError(f"CSV file is empty.\n\tpath: {path}")
+    if delimiter is None:
+        try:
+            delimiter = csv.Sniffer().sniff("\n".join(lines[:-1] or lines), delimiters=DELIMITERS).delimiter
+        except csv.Error:
+            delimiter = ","
+
+    first_row = next(csv.reader([lines[0]], delimiter=delimiter))
+    header = not all(_is_number(cell) for cell in first_row if cell.strip())
+    return delimiter, first_row, header, len(sample.split(b"\n", 1)[0])
+
+
+def _get_options(path: str | pathlib.Path, delimiter: str | None, header: bool | None, use_threads: bool) \
+        -> tuple[pa_csv.ReadOptions, pa_csv.ParseOptions, pa_csv.ConvertOptions, list[str] | None]:
+    delimiter, first_row, sniffed_header, line_length = sniff_csv(path, delimiter)
+    if header is None:
+        header = sniffed_header
+
+    # every column parsed as float64 (no type inference; blocks of a stream all get the same type)
+    names = first_row if header else [f"f{i}" for i in range(len(first_row))]
+    column_types = {name: pa.float64() for name in names} if len(set(names)) == len(names) else None
+    read_options = pa_csv.ReadOptions(
+        use_threads=use_threads,
+        block_size=max(BLOCK_SIZE, 4 * line_length),
+        autogenerate_column_names=not header
+    )
+    parse_options = pa_csv.ParseOptions(delimiter=delimiter)
+    convert_options = pa_csv.ConvertOptions(column_types=column_types)
+    return read_options, parse_options, convert_options, [name.strip() for name in first_row] if header else None
+
+
+def _to_numpy(columns: Sequence[pa.ChunkedArray | pa.Array], dtype: np.dtype) -> np.ndarray:
+    """ columns -> 2D array [n_rows, n_columns] """
+    n_rows = len(columns[0]) if columns else 0
+    data = np.empty((n_rows, len(columns)), dtype=dtype)
+    for i, column in enumerate(columns):
+        if not (pa.types.is_floating(column.type) or pa.types.is_integer(column.type) or pa.types.is_null(column.type)):
+            raise ValueError(f"CSV column {i} is not numeric.\n\ttype: {column.type}")
+        data[:, i] = column.to_numpy(zero_copy_only=False)
+    return data
+
+
+def read_csv(
+        path: str | pathlib.Path,
+        delimiter: str = None,
+        header: bool = None,
+        dtype: np.dtype = np.float64,
+        use_threads: bool = True
+) -> tuple[np.ndarray, list[str] | None]:
+    """
+    Read a CSV file of numbers into a 2D array.
+
+    Parameters
+    ----------
+    path:
+        csv file
+    delimiter:
+        default: sniffed
+    header:
+        first row is column names
+        default: sniffed (a first row with any cell that is not a number)
+    dtype:
+        dtype of the data; empty cells are nan
+    use_threads:
+        parse blocks of the file on multiple threads
+
+    Returns
+    -------
+    data:
+        shape: [n_rows, n_columns]
+    header:
+        column names (None if no header)
+    """
+    read_options, parse_options, convert_options, header = _get_options(path, delimiter, header, use_threads)
+    table = pa_csv.read_csv(path, read_options=read_options, parse_options=parse_options,
+                            convert_options=convert_options)
+    return _to_numpy(table.columns, dtype), header
+
+
+def iter_csv_blocks(
+        path: str | pathlib.Path,
+        delimiter: str = None,
+        header: bool = None,
+        dtype: np.dtype = np.float64,
+        use_threads: bool = True
+) -> Iterator[np.ndarray]:
+    """
+    Stream a CSV file of numbers as blocks of rows (about `BLOCK_SIZE` bytes of the file each); see `read_csv`.
+
+    Yields
+    ------
+    block:
+        shape: [n_rows_block, n_columns]
+    """
+    read_options, parse_options, convert_options, _ = _get_options(path, delimiter, header, use_threads)
+    with pa_csv.open_csv(path, read_options=read_options, parse_options=parse_options,
+                         convert_options=convert_options) as reader:
+        for batch in reader:
+            yield _to_numpy(batch.columns, dtype)
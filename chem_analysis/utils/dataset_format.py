@@ -0,0 +1,312 @@
+"""
+Columnar dataset of many Signals and SignalArrays (Apache Parquet)
+
+A directory with one Parquet file per call to `save_dataset` ('<file id>.parquet'; ids sort in the order saved), one
+table row per signal:
+    * array: uid of the Signal/SignalArray the row belongs to ('<file id>-<index in the call>')
+    * name: name of the Signal/SignalArray
+    * row: row of the SignalArray (0 for a Signal)
+    * time: time of the row (null for a Signal)
+    * data: y values of the row (list of float64)
+
+x, labels, class, calibration and processing information of every item are stored once in the Parquet metadata of
+its file (a json object keyed by uid).
+
+Files are compressed, and written in row groups (each SignalArray starts a new row group; consecutive Signals share
+one), so the row group statistics of 'time' and 'name' let `read_dataset_table`/`load_dataset` skip row groups that
+do not match a filter (predicate pushdown), and only the columns asked for are read (projection). E.g., loading the
+runs of one day out of a year of data only reads those row groups; listing what is in the dataset (columns: name,
+time) never reads 'data'.
+"""
+import base64
+import importlib
+import json
+import pathlib
+import time
+import uuid
+from typing import Sequence
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from chem_analysis.utils.npy_dir_format import get_chunk_rows
+
+METADATA_KEY = b"chem_analysis"
+SCHEMA = pa.schema([
+    ("array", pa.string()),
+    ("name", pa.string()),
+    ("row", pa.int64()),
+    ("time", pa.float64()),
+    ("data", pa.large_list(pa.float64())),
+])
+
+
+def _encode_array(array_: np.ndarray) -> str:
+    return base64.b64encode(np.ascontiguousarray(array_, dtype="<f8").tobytes()).decode("ascii")
+
+
+def _decode_array(text: str) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(text), dtype="<f8")
+
+
+def _get_metadata(obj) -> dict:
+    from chem_analysis.base_obj.signal_array import SignalArray
+
+    metadata = {
+        "class": f"{type(obj).__module__}:{type(obj).__qualname__}",
+        "name": obj.name,
+        "x_label": obj.x_label,
+        "y_label": obj.y_label,
+        "x": _encode_array(obj.x),
+        "processing": [{"method": type(method).__qualname__, "fingerprint": method.fingerprint()}
+                       for method in obj.processor.methods],
+    }
+    if isinstance(obj, SignalArray):
+        metadata["z_label"] = obj.z_label
+
+    calibration = getattr(obj, "calibration", None)
+    if calibration is not None:
+        metadata["calibration"] = {
+            "name": repr(calibration),
+            "x_bounds": None if calibration.x_bounds is None else [float(v) for v in calibration.x_bounds],
+            "y_bounds": None if calibration.y_bounds is None else [float(v) for v in calibration.y_bounds],
+        }
+    return metadata
+
+
+def _get_batch(uid: str, name: str, rows: np.ndarray, time_: np.ndarray | None, z: np.ndarray) -> pa.RecordBatch:
+    z = np.ascontiguousarray(z, dtype=np.float64)
+    offsets = np.arange(0, z.size + 1, max(z.shape[1], 1), dtype=np.int64)[:z.shape[0] + 1]
+    data = pa.LargeListArray.from_arrays(pa.array(offsets), pa.array(z.ravel()))
+    time_ = pa.nulls(len(rows), pa.float64()) if time_ is None else pa.array(time_, pa.float64())
+    return pa.RecordBatch.from_arrays(
+        [pa.array([uid] * len(rows), pa.string()), pa.array([name] * len(rows), pa.string()),
+         pa.array(rows, pa.int64()), time_, data],
+        schema=SCHEMA
+    )
+
+
+def _get_signals_batch(signals: list[tuple[str, str, np.ndarray]]) -> pa.RecordBatch:
+    """ one row per Signal (uid, name, y); rows may have different lengths """
+    uids, names, ys = zip(*signals)
+    offsets = np.concatenate(([0], np.cumsum([len(y) for y in ys]))).astype(np.int64)
+    values = np.concatenate([np.asarray(y, dtype=np.float64) for y in ys])
+    data = pa.LargeListArray.from_arrays(pa.array(offsets), pa.array(values))
+    return pa.RecordBatch.from_arrays(
+        [pa.array(uids, pa.string()), pa.array(names, pa.string()), pa.array(np.zeros(len(uids), dtype=np.int64)),
+         pa.nulls(len(uids), pa.float64()), data],
+        schema=SCHEMA
+    )
+
+
+def save_dataset(
+        path: str | pathlib.Path,
+        items: Sequence,
+        compression: str = "zstd",
+        rows_per_group: int = None
+) -> list[str]:
+    """
+    Add Signals/SignalArrays (processed data) to a dataset as one new Parquet file; existing files are kept.
+
+    Parameters
+    ----------
+    path:
+        directory (created if it does not exist)
+    items:
+        Signals and/or SignalArrays
+    compression:
+        Parquet compression ('zstd', 'snappy', 'gzip', 'lz4', 'none')
+    rows_per_group:
+        rows per Parquet row group (smallest unit skipped by filters); SignalArrays are written one row group at a
+        time, so memory mapped arrays are never loaded whole
+        default: rows that fit in CHUNK_MEMORY
+
+    Returns
+    -------
+    uids:
+        uid of each item (the 'array' column)
+    """
+    from chem_analysis.base_obj.signal_array import SignalArray
+
+    items = list(items)
+    if not items:
+        return []
+    path = pathlib.Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+
+    file_id = f"{time.time_ns():016x}{uuid.uuid4().hex[:8]}"
+    uids = [f"{file_id}-{i:08x}" for i in range(len(items))]
+    metadata = {uid: _get_metadata(item) for uid, item in zip(uids, items)}
+    schema = SCHEMA.with_metadata({METADATA_KEY: json.dumps(metadata).encode("utf-8")})
+
+    with pq.ParquetWriter(path / f"{file_id}.parquet", schema, compression=compression) as writer:
+        signals = []  # consecutive Signals are written together
+        for uid, item in zip(uids, items):
+            name = str(item.name) if item.name is not None else ""
+            if isinstance(item, SignalArray):
+                if signals:
+                    writer.write_batch(_get_signals_batch(signals))
+                    signals = []
+                time_, z = item.time, item.data
+                chunk_rows = rows_per_group or get_chunk_rows(z.shape[1], 8)
+                for start in range(0, z.shape[0], chunk_rows):
+                    rows = np.arange(start, min(start + chunk_rows, z.shape[0]))
+                    writer.write_batch(_get_batch(uid, name, rows, time_[rows], z[start:start + chunk_rows]))
+                continue
+
+            signals.append((uid, name, item.y))
+            if len(signals) >= (rows_per_group or get_chunk_rows(len(item.y), 8)):
+                writer.write_batch(_get_signals_batch(signals))
+                signals = []
+        if signals:
+            writer.write_batch(_get_signals_batch(signals))
+
+    return uids
+
+
+def get_filter(names: Sequence[str] = None, time_range: Sequence[float | None] = None,
+               filter_: ds.Expression = None) -> ds.Expression | None:
+    """
+    Filter expression for `read_dataset_table`/`load_dataset`.
+
+    Parameters
+    ----------
+    names:
+        keep only these names
+    time_range:
+        (start, stop); inclusive, None for open ended
+    filter_:
+        any other `pyarrow.dataset` expression (combined with 'and')
+    """
+    expressions = []
+    if names is not None:
+        expressions.append(ds.field("name").isin(list(names)))
+    if time_range is not None:
+        if len(time_range) != 2:
+            raise ValueError(f"'time_range' must be (start, stop).\n\tgiven: {time_range}")
+        if time_range[0] is not None:
+            expressions.append(ds.field("time") >= time_range[0])
+        if time_range[1] is not None:
+            expressions.append(ds.field("time") <= time_range[1])
+    if filter_ is not None:
+        expressions.append(filter_)
+
+    if not expressions:
+        return None
+    expression = expressions[0]
+    for e in expressions[1:]:
+        expression = expression & e
+    return expression
+
+
+def read_dataset_table(
+        path: str | pathlib.Path,
+        columns: Sequence[str] = None,
+        names: Sequence[str] = None,
+        time_range: Sequence[float | None] = None,
+        filter_: ds.Expression = None
+) -> pa.Table:
+    """
+    Read rows of a dataset as an Arrow table; only matching row groups and the given columns are read.
+
+    Parameters
+    ----------
+    path:
+        dataset directory
+    columns:
+        columns to read ('array', 'name', 'row', 'time', 'data')
+        default: all
+    names, time_range, filter_:
+        see `get_filter`
+    """
+    dataset = ds.dataset(pathlib.Path(path), format="parquet", schema=SCHEMA)
+    return dataset.to_table(columns=None if columns is None else list(columns),
+                            filter=get_filter(names, time_range, filter_))
+
+
+def _get_class(class_path: str):
+    from chem_analysis.base_obj.signal_ import Signal
+    from chem_analysis.base_obj.signal_array import SignalArray
+
+    module_name, qualname = class_path.split(":")
+    if module_name.split(".")[0] != "chem_analysis":
+        raise ValueError(f"Only chem_analysis classes can be loaded from a dataset.\n\tgiven: {class_path}")
+    class_ = importlib.import_module(module_name)
+    for attr in qualname.split("."):
+        class_ = getattr(class_, attr)
+    if not (isinstance(class_, type) and issubclass(class_, (Signal, SignalArray))):
+        raise ValueError(f"Not a Signal or SignalArray.\n\tgiven: {class_path}")
+    return class_
+
+
+def load_dataset(
+        path: str | pathlib.Path,
+        names: Sequence[str] = None,
+        time_range: Sequence[float | None] = None,
+        filter_: ds.Expression = None,
+        calibration=None
+) -> list:
+    """
+    Load Signals/SignalArrays from a dataset; SignalArrays only keep the rows that match the filter.
+
+    Parameters
+    ----------
+    path:
+        dataset directory
+    names, time_range, filter_:
+        see `get_filter` (a Signal has no time, so it is dropped by 'time_range')
+    calibration:
+        set on loaded objects that have a calibration (a calibration function can not be saved; the bounds are
+        kept in the metadata)
+
+    Returns
+    -------
+    items:
+        Signals/SignalArrays in the order they were saved
+    """
+    path = pathlib.Path(path)
+    table = read_dataset_table(path, names=names, time_range=time_range, filter_=filter_)
+    if table.num_rows == 0:
+        return []
+
+    data = table.column("data").combine_chunks()
+    offsets = data.offsets.to_numpy()
+    values = data.values.to_numpy()
+    uids = table.column("array").to_numpy(zero_copy_only=False)
+    rows = table.column("row").to_numpy()
+    times = table.column("time").to_numpy(zero_copy_only=False)
+
+    _, first, inverse = np.unique(uids, return_index=True, return_inverse=True)
+    file_metadata = {}  # file id: {uid: metadata}
+    items = []
+    for group in np.argsort(first):
+        indexes = np.flatnonzero(inverse == group)
+        indexes = indexes[np.argsort(rows[indexes], kind="stable")]
+        uid = uids[indexes[0]]
+        file_id = uid.rsplit("-", 1)[0]
+        if file_id not in file_metadata:
+            file_metadata[file_id] = json.loads(pq.read_schema(path / f"{file_id}.parquet").metadata[METADATA_KEY])
+        metadata = file_metadata[file_id][uid]
+        x = _decode_array(metadata["x"])
+
+        if np.all(np.diff(indexes) == 1):  # rows are one block in 'values' (no copy)
+            z = values[offsets[indexes[0]]:offsets[indexes[-1] + 1]]
+        else:
+            z = np.concatenate([values[offsets[i]:offsets[i + 1]] for i in indexes])
+        z = z.reshape(len(indexes), len(x))
+
+        class_ = _get_class(metadata["class"])
+        if "z_label" in metadata:
+            item = class_(x_raw=x, time_raw=times[indexes].astype(np.float64), data_raw=z,
+                          x_label=metadata["x_label"], y_label=metadata["y_label"], z_label=metadata["z_label"],
+                          name=metadata["name"])
+        else:
+            item = class_(x_raw=x, y_raw=z[0], x_label=metadata["x_label"], y_label=metadata["y_label"],
+                          name=metadata["name"])
+        if calibration is not None and hasattr(item, "calibration"):
+            item.calibration = calibration
+        items.append(item)
+
+    return items
@@ -39,29 +39,70 @@ def numpy_to_feather(array_: np.ndarray, file_path: str | pathlib.Path, headers:
             writer.write_batch(batch)
 
 
-def feather_to_numpy(file_path: str | pathlib.Path) -> tuple[np.ndarray, list[str]]:
+def feather_to_numpy(file_path: str | pathlib.Path, memory_map: bool = False) -> tuple[np.ndarray, list[str]]:
     """
 
     Parameters
     ----------
     file_path:
         feather file
+    memory_map:
+        True: return a read only view of the memory mapped file (no data is read until it is accessed).
+        Falls back to a copy if the columns are not evenly spaced in the file (chunked or with nulls).
 
     Returns
     -------
-
+    data:
+        each column of the file is a row of data
+    names:
+        column names
     """
     if isinstance(file_path, pathlib.Path):
         file_path = str(file_path)
 
     source = pa.memory_map(file_path, 'r')
     table = pa.ipc.RecordBatchStreamReader(source).read_all()
+    if memory_map:
+        source.seek(0)
+        data = _memory_mapped_view(table, source.read_buffer())
+        if data is not None:
+            return data, table.column_names
+
     data = np.empty(np.flip(table.shape))
     for i, col in enumerate(table):
         data[i, :] = col.to_numpy()
     return data, table.column_names
 
 
+def _memory_mapped_view(table: pa.Table, buffer: pa.Buffer) -> np.ndarray | None:
+    """ 2D view of the table columns if they are equally spaced in the buffer; else None """
+    if table.num_columns == 0 or table.num_rows == 0:
+        return None
+
+    type_ = table.schema.types[0]
+    if not pa.types.is_floating(type_) and not pa.types.is_integer(type_):
+        return None
+
+    addresses = []
+    for col in table.columns:
+        if col.type != type_ or col.num_chunks != 1 or col.null_count != 0 or col.chunk(0).offset != 0:
+            return None
+        addresses.append(col.chunk(0).buffers()[1].address)
+
+    dtype = np.dtype(type_.to_pandas_dtype())
+    addresses = np.array(addresses) - buffer.address
+    stride = int(addresses[1] - addresses[0]) if len(addresses) > 1 else table.num_rows * dtype.itemsize
+    if stride < table.num_rows * dtype.itemsize or np.any(np.diff(addresses) != stride):
+        return None
+
+    data = np.ndarray(
+        (table.num_columns, table.num_rows), dtype=dtype, buffer=buffer, offset=int(addresses[0]),
+        strides=(stride, dtype.itemsize)
+    )
+    data.flags.writeable = False
+    return data
+
+
 def unpack_and_merge_time_series_feather_files(paths: Sequence[str | pathlib.Path]) \
         -> tuple[np.ndarray, np.ndarray, np.ndarray]:
     if len(paths) == 0:
@@ -70,7 +111,7 @@ def unpack_and_merge_time_series_feather_files(paths: Sequence[str | pathlib.Pat
     z_data = []
     time_data = []
     for path in paths:
-        x, time_, z = unpack_time_series(feather_to_numpy(path))
+        x, time_, z = unpack_time_series(feather_to_numpy(path)[0])
         z_data.append(z)
         time_data.append(time_)
 
@@ -4,10 +4,9 @@ import datetime
 
 
 def check_if_recent(folder: str, pattern: str = "temp*") -> int:
-    os.chdir(folder)
-    files = glob.glob(pattern)
+    files = glob.glob(pattern, root_dir=folder)
     now = datetime.datetime.now()
-    times = [os.path.getmtime(file) - now for file in files]
+    times = [os.path.getmtime(os.path.join(folder, file)) - now for file in files]
 
     for file, time in zip(files, times):
         if time < 1:
@@ -0,0 +1,128 @@
+import enum
+import functools
+import hashlib
+import types
+
+import numpy as np
+
+
+def _update(hasher, value, seen: set[int]):
+    if value is None or isinstance(value, (bool, int, float, complex, str, bytes, slice, enum.Enum)):
+        hasher.update(repr(value).encode())
+    elif isinstance(value, np.ndarray):
+        hasher.update(f"ndarray{value.dtype.str}{value.shape}".encode())
+        if value.dtype.hasobject:
+            for v in value.ravel():
+                _update(hasher, v, seen)
+        else:
+            hasher.update(np.ascontiguousarray(value).data)
+    elif isinstance(value, np.generic):
+        hasher.update(repr(value.item()).encode())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        hasher.update(f"{type(value).__name__}[".encode())
+        items = sorted(value, key=repr) if isinstance(value, (set, frozenset)) else value
+        for v in items:
+            _update(hasher, v, seen)
+        hasher.update(b"]")
+    elif isinstance(value, dict):
+        hasher.update(b"{")
+        for k in sorted(value, key=repr):
+            _update(hasher, k, seen)
+            _update(hasher, value[k], seen)
+        hasher.update(b"}")
+    elif isinstance(value, functools.partial):
+        hasher.update(b"partial(")
+        _update(hasher, (value.func, value.args, value.keywords), seen)
+        hasher.update(b")")
+    elif isinstance(value, types.MethodType):
+        hasher.update(b"method(")
+        _update(hasher, (value.__func__, value.__self__), seen)
+        hasher.update(b")")
+    elif isinstance(value, types.FunctionType):
+        _update_function(hasher, value, seen)
+    elif isinstance(value, types.CodeType):
+        hasher.update(value.co_code)
+        _update(hasher, (value.co_consts, value.co_names), seen)
+    elif isinstance(value, (types.BuiltinFunctionType, type)):
+        hasher.update(f"{value.__module__}.{value.__qualname__}".encode())
+    elif isinstance(value, types.ModuleType):
+        hasher.update(f"module {value.__name__}".encode())
+    elif hasattr(value, "__dict__"):
+        if id(value) in seen:  # reference cycle
+            hasher.update(b"<cycle>")
+            return
+        seen.add(id(value))
+        hasher.update(f"{type(value).__module__}.{type(value).__qualname__}(".encode())
+        _update(hasher, {k: v for k, v in vars(value).items() if not k.startswith("_")}, seen)
+        hasher.update(b")")
+    else:
+        hasher.update(repr(value).encode())
+
+
+def _update_function(hasher, function: types.FunctionType, seen: set[int]):
+    """
+    Functions are hashed by their code (not only their name), so two lambdas, or a function that is edited between
+    runs, do not collide: bytecode, constants, defaults, closure values and the globals the code uses.
+    """
+    hasher.update(f"function {function.__module__}.{function.__qualname__}".encode())
+    if id(function) in seen:  # recursion
+        return
+    seen.add(id(function))
+
+    closure = []
+    for cell in function.__closure__ or ():
+        try:
+            closure.append(cell.cell_contents)
+        except ValueError:  # empty cell
+            closure.append(None)
+    _update(hasher, (function.__code__, function.__defaults__, function.__kwdefaults__, tuple(closure)), seen)
+
+    for name in sorted(_get_names(function.__code__)):
+        if name in function.__globals__:
+            hasher.update(name.encode())
+            _update_global(hasher, function.__globals__[name], seen)
+
+
+def _get_names(code: types.CodeType) -> set[str]:
+    """ global (and attribute) names used by code and the code nested in it """
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names |= _get_names(const)
+    return names
+
+
+def _update_global(hasher, value, seen: set[int]):
+    """ values (numbers, arrays, ...) and functions are hashed; other objects only by type """
+    if value is None or isinstance(value, (bool, int, float, complex, str, bytes, np.ndarray, np.generic,
+                                           types.FunctionType, functools.partial, types.ModuleType, type)):
+        _update(hasher, value, seen)
+    elif isinstance(value, (list, tuple)):
+        hasher.update(f"{type(value).__name__}[".encode())
+        for v in value:
+            _update_global(hasher, v, seen)
+        hasher.update(b"]")
+    else:
+        hasher.update(f"{type(value).__module__}.{type(value).__qualname__}".encode())
+
+
+def fingerprint(obj) -> str:
+    """
+    Stable hash of an object's value.
+
+    Objects are hashed by type and public attributes (names not starting with '_'), numpy arrays by dtype, shape
+    and data, functions by their code (see `_update_function`), and `functools.partial` by function and arguments.
+
+    Parameters
+    ----------
+    obj:
+        object to hash
+
+    Returns
+    -------
+    hash:
+        hex digest
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    _update(hasher, obj, set())
+    return hasher.hexdigest()
@@ -1,24 +1,140 @@
+import glob
+import pathlib
 import re
+from typing import Callable, Sequence
+
+from chem_analysis.processing.executors import Executor, SerialExecutor
+
 
 def atoi(text):
     return int(text) if text.isdigit() else text
 
 
 def natural_keys(text):
-    """ sorts in human order """
-    return [atoi(c) for c in re.split(r'(\d+)', text)][1]
+    """ sorts in human order ('run2' before 'run10') """
+    return [atoi(c) for c in re.split(r'(\d+)', text)]
 
 
 def get_files(path, pattern: str = "*.csv", sort_fun=natural_keys) -> list[str]:
-    """ Returns a list of file names. """
-    import glob
-    import os
+    """ Returns a list of file names (relative to 'path'); the working directory is not changed. """
+    file_list = glob.glob(pattern, root_dir=path)
+    file_list.sort(key=sort_fun)
+    return file_list
 
-    # Find all json files
-    file_list = []
-    os.chdir(path)
-    for files in glob.glob(pattern):
-        file_list.append(files)  # filename with extension
 
-    file_list.sort(key=sort_fun)
-    return file_list
\ No newline at end of file
+def get_paths(path: str | pathlib.Path | Sequence[str | pathlib.Path], pattern: str = "*") -> list[pathlib.Path]:
+    """
+    Paths to load.
+
+    Parameters
+    ----------
+    path:
+        directory (entries matching 'pattern', in natural order), glob (e.g., 'data/run_*.csv'; natural order), or
+        a list of paths (order kept)
+    pattern:
+        for a directory
+
+    Returns
+    -------
+    paths:
+        files/folders
+    """
+    if isinstance(path, (str, pathlib.Path)):
+        path_ = pathlib.Path(path)
+        if path_.is_dir():
+            return [path_ / name for name in get_files(path_, pattern)]
+        if glob.has_magic(str(path)):
+            return [pathlib.Path(name) for name in sorted(glob.glob(str(path)), key=natural_keys)]
+        return [path_]
+
+    return [pathlib.Path(p) for p in path]
+
+
+def load_file(path: str | pathlib.Path):
+    """
+    Load one file/folder as a Signal; the format is detected from the path:
+        * Bruker folder ('acqus' and 'fid'): `NMRSignal.from_bruker`
+        * Spinsolve folder ('data.1d', 'spectrum.1d' or 'spectrum_processed.1d'): `NMRSignal.from_spinsolve`
+        * Spinsolve folder with only 'spectrum_processed.csv': `NMRSignal.from_spinsolve_csv`
+        * .csv, .feather or .npy file: `Signal.from_file`
+    """
+    path = pathlib.Path(path)
+    if path.is_dir():
+        from chem_analysis.nmr.nmr_signal import NMRSignal
+
+        if (path / "acqus").exists():
+            return NMRSignal.from_bruker(path)
+        if any((path / name).exists() for name in ("data.1d", "spectrum.1d", "spectrum_processed.1d")):
+            return NMRSignal.from_spinsolve(path)
+        if (path / "spectrum_processed.csv").exists():
+            return NMRSignal.from_spinsolve_csv(path)
+        raise ValueError(f"Folder format not recognized.\n\tpath: {path}")
+
+    from chem_analysis.base_obj.signal_ import Signal
+    return Signal.from_file(path)
+
+
+def load_signals(
+        path: str | pathlib.Path | Sequence[str | pathlib.Path],
+        pattern: str = "*",
+        loader: Callable = load_file,
+        executor: Executor = None,
+        progress: Callable[[int, int], None] = None
+) -> list:
+    """
+    Load many files/folders (CSV, feather, Spinsolve, Bruker, ...) across the workers of an executor.
+
+    Parameters
+    ----------
+    path:
+        directory, glob or list of paths (see `get_paths`)
+    pattern:
+        entries of a directory to load
+    loader:
+        path -> Signal (must be picklable for `ProcessExecutor`)
+        default: format detected from the path (see `load_file`)
+    executor:
+        how files are split across workers (e.g., `ThreadExecutor()` or `ProcessExecutor()` for parsers with python
+        loops); each file is a task, so a worker that is done takes the next file
+        default: serial
+    progress:
+        'progress(number_loaded, total)' is called as each file is loaded
+
+    Returns
+    -------
+    signals:
+        in the order of the paths
+    """
+    paths = get_paths(path, pattern)
+    if len(paths) == 0:
+        raise ValueError(f"No files found.\n\tpath: {path}\n\tpattern: {pattern}")
+
+    if executor is None:
+        executor = SerialExecutor()
+    callback = None if progress is None else lambda done: progress(done, len(paths))
+    return executor.map(loader, paths, callback)
+
+
+def load_signal_array(
+        path: str | pathlib.Path | Sequence[str | pathlib.Path],
+        pattern: str = "*",
+        loader: Callable = load_file,
+        executor: Executor = None,
+        progress: Callable[[int, int], None] = None,
+        array_type: type = None
+):
+    """
+    Load many files/folders as one SignalArray (one row per file, in the order of the paths; all must have the same
+    x). See `load_signals`.
+
+    Parameters
+    ----------
+    array_type:
+        SignalArray class (e.g., `NMRSignalArray`)
+        default: SignalArray
+    """
+    if array_type is None:
+        from chem_analysis.base_obj.signal_array import SignalArray
+        array_type = SignalArray
+
+    return array_type.from_signals(load_signals(path, pattern, loader, executor, progress))
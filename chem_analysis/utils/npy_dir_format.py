@@ -0,0 +1,136 @@
+"""
+Native on-disk layout for SignalArray: a directory of .npy files
+
+A directory with:
+    * metadata.json: labels, name, shape and dtype
+    * x.npy: shape [n_x]
+    * time.npy: shape [n_time]
+    * data.npy: shape [n_time, n_x] (row major, so every signal is one contiguous block)
+
+data.npy is one file so it can be memory mapped as a single contiguous array; it is not split into chunk files and
+can not be appended to. It is written a block of rows at a time (never copied whole) and read back memory mapped, so
+arrays can be larger than RAM and only the pages of the signals that are accessed are read.
+"""
+import json
+import mmap
+import pathlib
+
+import numpy as np
+
+FILE_METADATA = "metadata.json"
+FILE_X = "x.npy"
+FILE_TIME = "time.npy"
+FILE_DATA = "data.npy"
+CHUNK_MEMORY = 64 * 1024 ** 2  # bytes written at a time
+
+
+def is_npy_dir(path: str | pathlib.Path) -> bool:
+    path = pathlib.Path(path)
+    return path.is_dir() and (path / FILE_METADATA).exists()
+
+
+def get_chunk_rows(n_columns: int, itemsize: int, memory: int = CHUNK_MEMORY) -> int:
+    """ number of rows that fit in 'memory' bytes """
+    return max(1, memory // max(n_columns * itemsize, 1))
+
+
+def is_memory_mapped(array: np.ndarray) -> bool:
+    """
+    True if the data of 'array' (or of the arrays it is a view of) is a memory mapped file: `np.memmap`, `mmap`, or a
+    pyarrow buffer (memory mapped feather files; see `SignalArray.from_file`).
+    """
+    base = array
+    while base is not None:
+        if isinstance(base, (np.memmap, mmap.mmap)) or type(base).__module__.startswith("pyarrow"):
+            return True
+        base = getattr(base, "base", None)
+    return False
+
+
+def save_npy_dir(
+        path: str | pathlib.Path,
+        x: np.ndarray,
+        time_: np.ndarray,
+        z: np.ndarray,
+        metadata: dict = None,
+        chunk_rows: int = None
+):
+    """
+    Save to the native npy directory layout.
+
+    Parameters
+    ----------
+    path:
+        directory (created if it does not exist)
+    x:
+        shape: [n_x]
+    time_:
+        shape: [n_time]
+    z:
+        shape: [n_time, n_x]
+        can be a memory mapped array; only 'chunk_rows' rows are in memory at a time
+    metadata:
+        json serializable information (labels, name, ...)
+    chunk_rows:
+        number of rows written at a time
+        default: rows that fit in CHUNK_MEMORY
+    """
+    if x.shape[0] != z.shape[1]:
+        raise ValueError(f"'x.shape[0]' must equal 'z.shape[1]'\n\tx shape:{x.shape}\n\tz shape:{z.shape}")
+    if time_.shape[0] != z.shape[0]:
+        raise ValueError(f"'time_.shape[0]' must equal 'z.shape[0]'\n\ttime shape:{time_.shape}\n\tz shape:{z.shape}")
+
+    path = pathlib.Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    np.save(path / FILE_X, x)
+    np.save(path / FILE_TIME, time_)
+
+    chunk_rows = chunk_rows or get_chunk_rows(z.shape[1], z.dtype.itemsize)
+    data = np.lib.format.open_memmap(path / FILE_DATA, mode="w+", dtype=z.dtype, shape=z.shape)
+    for i in range(0, z.shape[0], chunk_rows):
+        data[i:i + chunk_rows] = z[i:i + chunk_rows]
+    data.flush()
+    del data
+
+    metadata = dict(metadata or {})
+    metadata.update(shape=list(z.shape), dtype=z.dtype.str)
+    with open(path / FILE_METADATA, "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=2)
+
+
+def load_npy_dir(path: str | pathlib.Path, mmap_mode: str | None = "r") \
+        -> tuple[np.ndarray, np.ndarray, np.ndarray, dict]:
+    """
+    Load the native npy directory layout.
+
+    Parameters
+    ----------
+    path:
+        directory
+    mmap_mode:
+        passed to `np.load` for data ('r', 'r+', 'c' or None to read into memory)
+
+    Returns
+    -------
+    x:
+        shape: [n_x]
+    time_:
+        shape: [n_time]
+    z:
+        shape: [n_time, n_x]
+    metadata:
+        information saved with the data
+    """
+    path = pathlib.Path(path)
+    with open(path / FILE_METADATA, "r", encoding="utf-8") as f:
+        metadata = json.load(f)
+
+    x = np.load(path / FILE_X)
+    time_ = np.load(path / FILE_TIME)
+    z = np.load(path / FILE_DATA, mmap_mode=mmap_mode)
+    if list(z.shape) != metadata["shape"]:
+        raise ValueError(f"Data shape does not match metadata."
+                         f"\n\tExpected: {tuple(metadata['shape'])}"
+                         f"\n\tGiven: {z.shape}")
+
+    return x, time_, z, metadata
@@ -0,0 +1,204 @@
+"""
+Declarative parameters of processing methods and data weights.
+
+The parameters of a class are the arguments of its `__init__`, stored on the instance under the same name (or the
+name given in `_parameter_attributes`). Everything else on the instance is state (values computed when it runs) and
+is not part of its spec, hash or copies.
+
+The hash (`fingerprint`) is cached and only recomputed when a parameter is set, so editing a parameter in place
+(e.g., `method.y[:10] = 0` or `weight.x_spans.append(...)`) is not seen; set it again (`method.y = y`) instead.
+"""
+import enum
+import functools
+import importlib
+import inspect
+import types
+
+import numpy as np
+
+from chem_analysis.utils.fingerprint import fingerprint
+
+
+@functools.cache
+def _get_parameter_names(cls: type) -> tuple[str, ...]:
+    signature = inspect.signature(cls.__init__)
+    return tuple(
+        name for name, parameter in list(signature.parameters.items())[1:]
+        if parameter.kind not in (inspect.Parameter.VAR_POSITIONAL, inspect.Parameter.VAR_KEYWORD)
+    )
+
+
+@functools.cache
+def _get_parameter_attributes(cls: type) -> frozenset[str]:
+    return frozenset(cls._parameter_attributes.get(name, name) for name in _get_parameter_names(cls))
+
+
+def _get_path(obj) -> str:
+    return f"{obj.__module__}:{obj.__qualname__}"
+
+
+def _import_path(path: str):
+    module_name, qualname = path.split(":")
+    if module_name.split(".")[0] not in ("chem_analysis", "numpy", "scipy"):
+        raise ValueError(f"Only chem_analysis, numpy and scipy objects can be loaded.\n\tgiven: {path}")
+    obj = importlib.import_module(module_name)
+    for attr in qualname.split("."):
+        obj = getattr(obj, attr)
+    return obj
+
+
+class MixinParameters:
+    _parameter_attributes: dict[str, str] = {}  # parameter name -> attribute name (if they differ)
+
+    def __setattr__(self, name: str, value):
+        super().__setattr__(name, value)
+        if name in _get_parameter_attributes(type(self)):
+            self.__dict__.pop("_parameter_hash", None)
+
+    @classmethod
+    def get_parameter_names(cls) -> tuple[str, ...]:
+        """ names of the parameters (arguments of __init__) """
+        return _get_parameter_names(cls)
+
+    def get_parameters(self) -> dict:
+        """ parameters (values are not copied) """
+        return {name: getattr(self, self._parameter_attributes.get(name, name))
+                for name in self.get_parameter_names()}
+
+    def get_spec(self) -> dict:
+        """ class and parameters; parameters that have parameters (e.g., weights) are given as their spec """
+        return {"class": _get_path(type(self)),
+                "parameters": {name: _get_spec(value) for name, value in self.get_parameters().items()}}
+
+    def fingerprint(self) -> str:
+        """
+        stable hash of the class and parameters (state is not included); cached until a parameter is set
+        (parameters with parameters, e.g. weights, are hashed on their own, so editing them is seen)
+        """
+        parameters = self.get_parameters()
+        parameter_hash = self.__dict__.get("_parameter_hash")
+        if parameter_hash is None:
+            parameter_hash = fingerprint({"class": _get_path(type(self)),
+                                          "parameters": {name: _get_spec(value, nested=False)
+                                                         for name, value in parameters.items()}})
+            self.__dict__["_parameter_hash"] = parameter_hash
+
+        nested = []
+        for value in parameters.values():
+            _get_nested(value, nested)
+        if not nested:
+            return parameter_hash
+        return fingerprint((parameter_hash, [obj.fingerprint() for obj in nested]))
+
+    def to_dict(self) -> dict:
+        """ json serializable spec (see `from_dict`) """
+        return _to_serializable(self.get_spec())
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """ new object from `to_dict` output """
+        class_ = _import_path(data["class"])
+        if not (isinstance(class_, type) and issubclass(class_, cls)):
+            raise ValueError(f"'{data['class']}' is not a {cls.__name__}.")
+        return class_(**{name: _from_serializable(value) for name, value in data["parameters"].items()})
+
+    def get_state(self) -> dict:
+        """ state: everything on the instance that is not a parameter (values are not copied) """
+        parameter_attributes = _get_parameter_attributes(type(self))
+        return {name: value for name, value in vars(self).items()
+                if name not in parameter_attributes and name != "_parameter_hash"}
+
+    def set_state(self, state: dict):
+        """ set state from `get_state` """
+        self.__dict__.update(state)
+
+    def get_copy(self):
+        """
+        New object with the same parameters and no state. Parameters with parameters are copied the same way;
+        containers are copied; numpy arrays are shared.
+        """
+        return type(self)(**{name: _copy_parameter(value) for name, value in self.get_parameters().items()})
+
+
+def _get_spec(value, nested: bool = True):
+    """ 'nested=False': parameters with parameters are left out (only their position is kept) """
+    if isinstance(value, MixinParameters):
+        return value.get_spec() if nested else "<parameters>"
+    if isinstance(value, (list, tuple)):
+        return type(value)(_get_spec(v, nested) for v in value)
+    if isinstance(value, dict):
+        return {k: _get_spec(v, nested) for k, v in value.items()}
+    return value
+
+
+def _get_nested(value, nested: list):
+    """ parameters with parameters in 'value' (in order) """
+    if isinstance(value, MixinParameters):
+        nested.append(value)
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            _get_nested(v, nested)
+    elif isinstance(value, dict):
+        for v in value.values():
+            _get_nested(v, nested)
+
+
+def _copy_parameter(value):
+    if isinstance(value, MixinParameters):
+        return value.get_copy()
+    if isinstance(value, (list, tuple)):
+        return type(value)(_copy_parameter(v) for v in value)
+    if isinstance(value, dict):
+        return {k: _copy_parameter(v) for k, v in value.items()}
+    return value
+
+
+def _to_serializable(value):
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, dict):
+        if "class" in value and "parameters" in value:  # spec
+            return {"class": value["class"],
+                    "parameters": {k: _to_serializable(v) for k, v in value["parameters"].items()}}
+        if not all(isinstance(k, str) for k in value):
+            raise TypeError(f"Only dicts with str keys can be serialized.\n\tgiven keys: {list(value)}")
+        return {"dict": {k: _to_serializable(v) for k, v in value.items()}}
+    if isinstance(value, list):
+        return [_to_serializable(v) for v in value]
+    if isinstance(value, tuple):
+        return {"tuple": [_to_serializable(v) for v in value]}
+    if isinstance(value, np.ndarray):
+        if value.dtype.hasobject:
+            raise TypeError("numpy arrays of objects can not be serialized.")
+        return {"ndarray": value.tolist(), "dtype": value.dtype.str}
+    if isinstance(value, slice):
+        return {"slice": [_to_serializable(value.start), _to_serializable(value.stop), _to_serializable(value.step)]}
+    if isinstance(value, enum.Enum):
+        return {"enum": _get_path(type(value)), "name": value.name}
+    if isinstance(value, (types.FunctionType, types.BuiltinFunctionType)):
+        return {"function": _get_path(value)}
+    raise TypeError(f"Parameter can not be serialized.\n\tgiven: {type(value).__name__}")
+
+
+def _from_serializable(value):
+    if isinstance(value, list):
+        return [_from_serializable(v) for v in value]
+    if not isinstance(value, dict):
+        return value
+    if "class" in value and "parameters" in value:
+        return MixinParameters.from_dict(value)
+    if "dict" in value:
+        return {k: _from_serializable(v) for k, v in value["dict"].items()}
+    if "tuple" in value:
+        return tuple(_from_serializable(v) for v in value["tuple"])
+    if "ndarray" in value:
+        return np.array(value["ndarray"], dtype=value["dtype"])
+    if "slice" in value:
+        return slice(*value["slice"])
+    if "enum" in value:
+        return _import_path(value["enum"])[value["name"]]
+    if "function" in value:
+        return _import_path(value["function"])
+    raise ValueError(f"Unknown serialized value.\n\tgiven: {value}")
@@ -0,0 +1,70 @@
+"""
+Micro-benchmark of MCA constraints.
+
+Run (from the repository root): python -m tests.benchmark_constraints
+
+For each constraint: time per call of `transform` with copy=True and of `transform_inplace`, and peak memory allocated by
+`transform_inplace` (as a fraction of the size of A; should stay well below 1, as in-place constraints must not
+allocate arrays the size of A). `test_analysis.py::test_constraints_inplace_allocation` checks the allocations.
+"""
+import copy
+import timeit
+import tracemalloc
+
+import numpy as np
+
+import chem_analysis.analysis.multi_component_analysis.constraints as constraints
+
+SHAPE = (20000, 6)  # C of a 20000 spectra array with 6 components
+
+
+def get_constraints() -> dict[str, constraints.Constraint]:
+    return {
+        "Nonneg": constraints.ConstraintNonneg(),
+        "Nonneg(index)": constraints.ConstraintNonneg(index=[0, 2]),
+        "CumsumNonneg": constraints.ConstraintCumsumNonneg(axis=0),
+        "ZeroEndPoints": constraints.ConstraintZeroEndPoints(axis=0, span=5),
+        "ZeroCumSumEndPoints": constraints.ConstraintZeroCumSumEndPoints(nodes=[5000, 10000], axis=0),
+        "Norm": constraints.ConstraintNorm(),
+        "Norm(fix)": constraints.ConstraintNorm(fix=[0]),
+        "ReplaceZeros": constraints.ConstraintReplaceZeros(feature=0),
+        "Planarize": constraints.ConstraintPlanarize(target=[0, 1], shape=(100, 200)),
+        "Conv": constraints.ConstraintConv(),
+        "Conv(index)": constraints.ConstraintConv(index=[0, 1]),
+        "Range": constraints.ConstraintRange([None, (0, 0.5), (None, 0.3)]),
+        "Pipeline(Nonneg, Range, Conv)": constraints.ConstraintPipeline(
+            [constraints.ConstraintNonneg(), constraints.ConstraintRange([None, (0, 0.5)]),
+             constraints.ConstraintConv()]
+        ),
+    }
+
+
+def peak_allocation(constraint: constraints.Constraint, A: np.ndarray) -> float:
+    """
+    peak memory allocated by `transform_inplace` / A.nbytes (after a warm-up call for scratch arrays, which only
+    `ConstraintPipeline` keeps)
+    """
+    constraint.transform_inplace(A.copy())
+    A = A.copy()
+    tracemalloc.start()
+    constraint.transform_inplace(A)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / A.nbytes
+
+
+def main(number: int = 200):
+    A = np.random.default_rng(0).random(SHAPE)
+    print(f"A: {SHAPE}; time per call (us)")
+    print(f"{'constraint':<32}{'copy':>12}{'in place':>12}{'peak alloc':>12}")
+    for name, constraint in get_constraints().items():
+        constraint_copy = copy.copy(constraint)
+        constraint_copy.copy = True
+        time_copy = timeit.timeit(lambda: constraint_copy.transform(A), number=number) / number
+        work = A.copy()
+        time_inplace = timeit.timeit(lambda: constraint.transform_inplace(work), number=number) / number
+        print(f"{name:<32}{time_copy * 1e6:>12.1f}{time_inplace * 1e6:>12.1f}{peak_allocation(constraint, A):>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+import numpy as np
+
+from chem_analysis.analysis.change_detection.change_detection import CUSUM
+
+
+def test_cusum_running_statistics_and_events():
+    rng = np.random.default_rng(0)
+    data = rng.normal(size=(200, 3))
+    data[120:, 1] += 6  # step change in channel 1
+
+    cusum = CUSUM(n=31)
+    events = list(cusum.stream(data[:150]))
+    window = data[150 - 31:150]
+    assert np.allclose(cusum.mean, window.mean(axis=0))
+    assert np.allclose(cusum.standard_deviation, window.std(axis=0))
+
+    assert any(event.channel == 1 and event.state is CUSUM.States.up and event.index >= 120 for event in events)
+    assert all(event.channel != 1 or event.index >= 120 for event in events)
+
+    single = CUSUM(n=31)
+    states = [single.add_data(value) for value in data[:, 1]]
+    assert CUSUM.States.up in states
+
+
+def test_peak_stats_array_matches_single_peak():
+    import chem_analysis.utils.math as general_math
+    from chem_analysis.analysis.peak import PeakBounded, PeakParent, get_peak_stats_array
+
+    x = np.linspace(0, 100, 2001)
+    y = np.exp(-(x - 30) ** 2 / 8) + 0.5 * np.exp(-(x - 60) ** 2 / 20) * (1 + 0.3 * (x > 60))
+    parent = PeakParent(x, y)
+    peaks = [PeakBounded(parent, slice(500, 800)), PeakBounded(parent, slice(1000, 1500)),
+             PeakBounded(parent, slice(550, 620))]  # cut before the right side reaches half height
+
+    stats = get_peak_stats_array(peaks)
+    for peak, values in zip(peaks, stats):
+        y_norm = peak.y / np.trapz(x=peak.x, y=peak.y)
+        mean = general_math.get_mean_of_pdf(peak.x, y_norm=y_norm)
+        std = general_math.get_standard_deviation_of_pdf(peak.x, y_norm=y_norm, mean=mean)
+        assert np.isclose(values["area"], np.trapz(x=peak.x, y=peak.y))
+        assert np.isclose(values["mean"], mean)
+        assert np.isclose(values["std"], std)
+        assert np.isclose(values["skew"], general_math.get_skew_of_pdf(peak.x, y_norm=y_norm, mean=mean,
+                                                                       standard_deviation=std))
+        assert np.isclose(values["fwhm"], general_math.get_full_width_at_height(peak.x, peak.y))
+        assert np.isclose(values["asym"], general_math.get_asymmetry_factor(peak.x, peak.y))
+        assert peak.stats.values is peak.stats.values  # cached
+        assert peak.stats.max_loc == peak.x[np.argmax(peak.y)]
+
+    peaks[0].bounds = slice(520, 780)  # cache is invalidated
+    assert np.isclose(peaks[0].stats.area, np.trapz(x=x[520:780], y=y[520:780]))
+
+    parent.y = 2 * y  # signal processed again (new y); same bounds
+    assert np.isclose(peaks[0].stats.area, 2 * np.trapz(x=x[520:780], y=y[520:780]))
+
+
+def test_find_peaks_array_matches_single_signal():
+    from chem_analysis.base_obj.signal_array import SignalArray
+    from chem_analysis.analysis.peaks_array import find_peaks_array
+    from chem_analysis.analysis.boundary_detection.boundary_detection import rolling_ball_n_points
+    from chem_analysis.processing.executors import ThreadExecutor
+
+    x = np.linspace(0, 100, 1000)
+    z = np.array([np.exp(-(x - 30 - i) ** 2 / 4) + 0.5 * np.exp(-(x - 70) ** 2 / 9) for i in range(6)])
+    array = SignalArray(x_raw=x, time_raw=np.arange(6, dtype=float), data_raw=z)
+
+    result = find_peaks_array(array, height=0.1)
+    parallel = find_peaks_array(array, executor=ThreadExecutor(max_workers=2, chunk_size=2), height=0.1)
+
+    assert np.array_equal(result.number_of_peaks, np.full(6, 2))
+    assert np.array_equal(result.data, parallel.data)
+    row = result.get_row(3)
+    assert np.array_equal(row["index"], [np.argmax(z[3] * (x < 50)), np.argmax(z[3] * (x > 50))])
+    lb, ub = rolling_ball_n_points(row["index"][0], x, z[3])
+    assert row["lb"][0] == lb and row["ub"][0] == ub
+    assert np.isclose(row["area"][0], np.trapz(x=x[lb:ub], y=z[3, lb:ub]))
+
+
+def _rolling_ball_loop(peak_index, x, y, n, poly_degree, max_derivative, n_points_with_pos_slope, min_height):
+    """ reference: walk out from the peak fitting a polynomial at every step """
+    min_height = min_height * y[peak_index]
+    lb_index, count = 0, 0
+    for i in range(peak_index - n, 0, -1):
+        derivative = np.polynomial.Polynomial.fit(x[i:i + n], y[i:i + n], poly_degree).deriv(poly_degree)(x[i])
+        count = count + 1 if derivative < max_derivative else 0
+        if count >= n_points_with_pos_slope:
+            lb_index = i + count
+            break
+        if y[i] < min_height:
+            lb_index = i
+            break
+
+    ub_index, count = len(x), 0
+    for i in range(peak_index + n, len(x)):
+        derivative = np.polynomial.Polynomial.fit(x[i - n:i], y[i - n:i], poly_degree).deriv(poly_degree)(x[i])
+        count = count + 1 if derivative > max_derivative else 0
+        if count >= n_points_with_pos_slope:
+            ub_index = i + count
+            break
+        if y[i] < min_height:
+            ub_index = i
+            break
+    return lb_index, ub_index
+
+
+def test_rolling_ball_bounds_matches_loop():
+    from chem_analysis.analysis.boundary_detection.boundary_detection import rolling_ball_bounds
+
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 100, 500)
+    y = sum(rng.random() * np.exp(-(x - center) ** 2 / 10) for center in (20, 45, 50, 80)) + 0.01 * rng.random(500)
+    peaks = np.array([100, 225, 250, 400, 5, 495])
+
+    for n, poly_degree, n_points, min_height in ((2, 1, 1, 0.01), (5, 2, 3, 0.05), (4, 1, 2, 0.2)):
+        lb, ub = rolling_ball_bounds(peaks, x, y, n=n, poly_degree=poly_degree, n_points_with_pos_slope=n_points,
+                                     min_height=min_height)
+        for peak, lb_index, ub_index in zip(peaks, lb, ub):
+            if peak - n <= 0 or peak + n >= len(x):
+                continue
+            expected = _rolling_ball_loop(peak, x, y, n, poly_degree, 0, n_points, min_height)
+            assert (lb_index, ub_index) == expected
+
+
+def test_peak_deconvolution_jacobian_multi_start():
+    from chem_analysis.analysis.line_fitting import peak_deconvolution, PeaksMultiple, DistributionNormalPeak, \
+        DistributionCauchyPeak, DistributionVoigtPeak
+
+    x = np.linspace(0, 20, 400)
+    true_peaks = [DistributionNormalPeak(x, 5, 6, 0.8), DistributionVoigtPeak(x, 3, 10, 0.7, 0.4),
+                  DistributionCauchyPeak(x, 2, 14, 0.6)]
+    multipeak = PeaksMultiple(true_peaks)
+    args = np.array(multipeak.get_args())
+    step = 1e-6
+    numeric = np.column_stack([(multipeak.evaluate(x, args + h) - multipeak.evaluate(x, args - h)) / (2 * step)
+                               for h in np.eye(len(args)) * step])
+    assert np.allclose(multipeak.jacobian(x, *args), numeric, atol=1e-6)
+
+    y = multipeak.evaluate(x, args)
+    guess = [DistributionNormalPeak(x, 1, 4, 1), DistributionVoigtPeak(x, 1, 11, 1, 1),
+             DistributionCauchyPeak(x, 1, 15, 1)]
+    result = peak_deconvolution(guess, x, y, n_starts=6, seed=0)
+    assert np.allclose(result.multipeak.get_args(), args, rtol=1e-3)
+
+
+def test_peak_deconvolution_array_warm_start():
+    from chem_analysis.analysis.line_fitting import peak_deconvolution_array, DistributionNormal, \
+        DistributionNormalPeak
+    from chem_analysis.base_obj.signal_array import SignalArray
+    from chem_analysis.processing.executors import ThreadExecutor
+
+    x = np.linspace(0, 20, 300)
+    time_ = np.arange(40.)
+    area_1 = 5 * np.exp(-time_ / 20)
+    area_2 = 6 - area_1
+    data = np.array([DistributionNormal(a1, 6, 0.8)(x) + DistributionNormal(a2, 10, 1.2)(x)
+                     for a1, a2 in zip(area_1, area_2)])
+    array = SignalArray(x, time_, data)
+
+    peaks = [DistributionNormalPeak(x, 1, 5, 1), DistributionNormalPeak(x, 1, 11, 1)]
+    for executor in (None, ThreadExecutor(max_workers=2)):
+        result = peak_deconvolution_array(peaks, array, executor=executor)
+        assert result.args.shape == (40, 6) and result.covariance.shape == (40, 6, 6)
+        assert np.all(result.success)
+        assert np.allclose(result.get_arg(0, "scale"), area_1, rtol=1e-4)
+        assert np.allclose(result.get_arg(1, "scale"), area_2, rtol=1e-4)
+    assert peaks[0].get_args() == (1, 5, 1)
+
+
+def test_peak_deconvolution_array_restarts_bad_warm_start():
+    from chem_analysis.analysis.line_fitting import peak_deconvolution_array, DistributionNormal, \
+        DistributionNormalPeak
+    from chem_analysis.base_obj.signal_array import SignalArray
+
+    # row 0 has a spurious shoulder that the fit from the guess gets wrong; the second peak grows afterwards
+    x = np.linspace(0, 20, 400)
+    area_2 = np.linspace(0.5, 3, 10)
+    data = np.array([DistributionNormal(3, 10, 0.6)(x) + DistributionNormal(a2, 4, 0.2)(x) for a2 in area_2])
+    data[0] = DistributionNormal(3, 10, 0.6)(x) + DistributionNormal(1.5, 11.5, 0.6)(x)
+    array = SignalArray(x, np.arange(10.), data)
+
+    peaks = [DistributionNormalPeak(x, 1, 10, 1), DistributionNormalPeak(x, 1, 4, 1)]
+    carried = peak_deconvolution_array(peaks, array, restart_tolerance=np.inf)
+    assert np.all(np.diff(carried.residual) > 0)  # wrong peak carried forward from row 0
+
+    result = peak_deconvolution_array(peaks, array)
+    cold = peak_deconvolution_array(peaks, array, warm_start=False)
+    assert np.all(result.residual[1:] < 1e-12)
+    assert np.allclose(result.get_arg(1, "scale")[1:], area_2[1:], rtol=1e-4)
+    assert np.allclose(result.args[1:], cold.args[1:], rtol=1e-4)
+
+
+def test_fast_nnls_matches_nnls():
+    from chem_analysis.analysis.multi_component_analysis import NonNegativeLeastSquares, FastNonNegativeLeastSquares, \
+        MultiComponentAnalysis
+
+    rng = np.random.default_rng(0)
+    A = rng.random((200, 5))
+    A[:, 1] = 0.9 * A[:, 0] + 0.1 * A[:, 1]  # correlated columns
+    B = A @ np.maximum(rng.normal(size=(5, 300)), 0) + rng.normal(0, 0.5, (200, 300))
+    expected = NonNegativeLeastSquares().fit(A, B)
+    assert np.allclose(FastNonNegativeLeastSquares().fit(A, B), expected, atol=1e-9)
+    assert np.allclose(FastNonNegativeLeastSquares().fit(A, B[:, 0]), expected[0], atol=1e-9)
+    assert np.allclose(FastNonNegativeLeastSquares(max_iter=1).fit(A, B), expected, atol=1e-9)  # fallback
+
+    A_deficient = np.column_stack((A, A[:, 0] + A[:, 2]))  # rank deficient
+    x = FastNonNegativeLeastSquares().fit(A_deficient, B)
+    x_expected = NonNegativeLeastSquares().fit(A_deficient, B)
+    assert np.all(x >= 0)
+    assert np.allclose(np.sum((A_deficient @ x.T - B) ** 2, axis=0),
+                       np.sum((A_deficient @ x_expected.T - B) ** 2, axis=0), rtol=1e-9)
+
+    C = np.column_stack((np.linspace(0, 1, 50), np.linspace(1, 0, 50)))
+    ST = np.zeros((2, 80))
+    ST[0, 20:40] = 1
+    ST[1, 40:60] = 2
+    mca = MultiComponentAnalysis(c_regressor=FastNonNegativeLeastSquares(), st_regressor=FastNonNegativeLeastSquares())
+    result = mca.fit(C @ ST, ST=ST + 0.1)
+    assert np.mean((result.D - C @ ST) ** 2) < 1e-6
+
+
+def test_mca_fit_many_ranked_and_warm_start():
+    from chem_analysis.analysis.multi_component_analysis import FastNonNegativeLeastSquares, MultiComponentAnalysis
+
+    rng = np.random.default_rng(0)
+    x = np.arange(120)
+    ST = np.array([np.exp(-(x - center) ** 2 / 50) for center in (40, 70)])
+    t = np.linspace(0, 1, 60)
+    C = np.column_stack((np.exp(-3 * t), 1 - np.exp(-3 * t)))
+    D = C @ ST
+
+    mca = MultiComponentAnalysis(c_regressor=FastNonNegativeLeastSquares(), st_regressor=FastNonNegativeLeastSquares(),
+                                 max_iters=20)
+    initial = [ST + 0.1, rng.random((2, 120)), rng.random((2, 120)) * 100]
+    results = mca.fit_many(D, ST=initial, abandon_after=3, abandon_tolerance=1000)
+    assert len(results) == 3
+    errors = [result.min_error for result in results if not result.abandoned]
+    assert errors == sorted(errors)
+    assert results[0].min_error < 1e-6
+    assert all(len(result.error) == result.total_iters + 1 for result in results)
+    assert any(result.abandoned for result in results)
+
+    D_appended = np.vstack((D, C[-1:] @ ST))
+    warm = mca.fit_many(D_appended, previous=results[0])[0]
+    assert warm.C.shape == (61, 2)
+    assert warm.min_error < 1e-6
+
+
+def test_mca_fit_many_threads_match_serial():
+    from chem_analysis.analysis.multi_component_analysis import MultiComponentAnalysis, ConstraintNonneg, \
+        ConstraintCumsumNonneg, ConstraintZeroEndPoints
+    from chem_analysis.processing.executors import ThreadExecutor
+
+    # large enough that numpy releases the GIL inside the constraints
+    rng = np.random.default_rng(0)
+    x = np.arange(3000)
+    ST = np.array([np.exp(-(x - center) ** 2 / 2e4) for center in (1000, 1800, 2200)])
+    t = np.linspace(0, 1, 400)
+    C = np.column_stack((np.exp(-3 * t), 1 - np.exp(-3 * t), t))
+    D = C @ ST + rng.normal(0, 1e-3, (400, 3000))
+
+    mca = MultiComponentAnalysis(c_constraints=[ConstraintNonneg()],
+                                 st_constraints=[ConstraintZeroEndPoints(axis=0, span=5), ConstraintCumsumNonneg(axis=0),
+                                                 ConstraintNonneg()],
+                                 max_iters=5)
+    initial = ST + rng.random((4, 3, 3000)) * 0.2  # stacked estimates
+    serial = mca.fit_many(D, ST=initial)
+    threaded = mca.fit_many(D, ST=initial, executor=ThreadExecutor(max_workers=4))
+    for result, expected in zip(threaded, serial):
+        assert np.array_equal(result.C, expected.C)
+        assert np.array_equal(result.ST, expected.ST)
+        assert np.array_equal(result.error, expected.error)
+
+
+def test_mca_low_memory_error_and_history():
+    from chem_analysis.analysis.multi_component_analysis import MultiComponentAnalysis, NonNegativeLeastSquares, \
+        mean_square_error, mean_square_error_gram
+
+    rng = np.random.default_rng(1)
+    C = rng.random((50, 3))
+    ST = rng.random((3, 80))
+    D = C @ ST + rng.normal(0, 0.05, (50, 80))
+    assert np.isclose(mean_square_error_gram(D, C, ST), mean_square_error(D, C @ ST))
+
+    results = []
+    for low_memory in (False, True):
+        mca = MultiComponentAnalysis(c_regressor=NonNegativeLeastSquares(), st_regressor=NonNegativeLeastSquares(),
+                                     max_iters=10, low_memory=low_memory, history_every=4)
+        results.append(mca.fit(D, ST=ST + 0.1))
+    assert np.allclose(results[0].error, results[1].error)
+    assert [iter_ for iter_, _, _ in results[1].history] == [0, 4, 8]
+
+
+def test_randomized_svd_out_of_core(tmp_path):
+    from chem_analysis.analysis.multi_component_analysis import randomized_svd
+
+    rng = np.random.default_rng(0)
+    x = np.arange(300)
+    ST = np.array([np.exp(-(x - center) ** 2 / 800) for center in (60, 140, 220)])
+    t = np.linspace(0, 1, 500)
+    C = np.column_stack((np.exp(-3 * t), 1 - np.exp(-3 * t), 0.3 * t))
+    D = C @ ST + rng.normal(0, 0.01, (500, 300))
+
+    result = randomized_svd(D, number_of_components=8, seed=0)
+    assert np.allclose(result.singular_values[:3], np.linalg.svd(D, compute_uv=False)[:3])
+    assert result.estimate_number_of_components() == 3
+    assert result.get_ST().shape == (3, 300)
+
+    np.save(tmp_path / "D.npy", D)
+    D_memory_mapped = np.load(tmp_path / "D.npy", mmap_mode="r")
+    result_out_of_core = randomized_svd(D_memory_mapped, number_of_components=8, chunk_rows=64, seed=0)
+    assert np.allclose(result_out_of_core.singular_values, result.singular_values)
+
+    centered = randomized_svd(D_memory_mapped, number_of_components=3, center=True, chunk_rows=64, seed=0)
+    assert np.allclose(centered.singular_values[:2], np.linalg.svd(D - D.mean(axis=0), compute_uv=False)[:2])
+
+
+def test_constraints_inplace_allocation():
+    import tracemalloc
+    from chem_analysis.analysis.multi_component_analysis import constraints
+
+    A = np.random.default_rng(0).normal(0.5, 0.5, (20000, 6))
+    pipeline = constraints.ConstraintPipeline(
+        [constraints.ConstraintNonneg(), constraints.ConstraintRange([None, (0.1, 0.5)]),
+         constraints.ConstraintNonneg(index=[3]), constraints.ConstraintNorm(fix=[0])]
+    )
+    expected = A
+    for constraint in pipeline.constraints:
+        constraint.copy = True
+        expected = constraint.transform(expected)
+    assert np.allclose(pipeline.transform(A), expected)
+
+    # scratch arrays are kept by the pipeline (one per fit), not by the constraints
+    scratch = constraints.ConstraintPipeline([constraints.ConstraintZeroEndPoints(axis=0, span=5),
+                                              constraints.ConstraintCumsumNonneg(axis=0)])
+    for constraint in (*pipeline.constraints, pipeline, constraints.ConstraintConv(), scratch,
+                       constraints.ConstraintZeroCumSumEndPoints(nodes=[5000], axis=0)):
+        constraint.transform_inplace(A.copy())  # scratch arrays
+        A_ = A.copy()
+        tracemalloc.start()
+        constraint.transform_inplace(A_)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        assert peak < 0.5 * A.nbytes, type(constraint).__name__
@@ -16,6 +16,127 @@ def generate_signal():
     return x,y
 
 
+def test_signal_array_memory_mapped_round_trip(tmp_path):
+    from chem_analysis.base_obj.signal_array import SignalArray
+    from chem_analysis.utils.npy_dir_format import is_memory_mapped
+
+    x, y = generate_signal()
+    array = SignalArray(x_raw=x, time_raw=np.arange(y.shape[0], dtype=float), data_raw=y, x_label="x", name="test")
+
+    array.to_npy(tmp_path / "data.npy", allow_pickle=False)
+    array.to_feather(tmp_path / "data.feather")
+    array.to_npy_dir(tmp_path / "npy_dir", chunk_rows=2)
+    for path in ("data.npy", "data.feather", "npy_dir"):
+        loaded = SignalArray.from_file(tmp_path / path, mmap_mode="r")
+        assert not loaded.data_raw.flags.writeable  # memory mapped; not a copy
+        assert is_memory_mapped(loaded.data_raw) and is_memory_mapped(loaded.data)
+        assert np.array_equal(loaded.data_raw, y)
+        assert np.array_equal(loaded.x_raw, x)
+        assert np.array_equal(loaded.get_signal(1).y_raw, y[1])
+
+    assert SignalArray.from_file(tmp_path / "npy_dir").name == "test"
+    assert not is_memory_mapped(array.data_raw)
+
+
+def test_csv_round_trip(tmp_path):
+    from chem_analysis.base_obj.signal_ import Signal
+    from chem_analysis.base_obj.signal_array import SignalArray
+    from chem_analysis.utils.csv_format import iter_csv_blocks
+
+    x, y = generate_signal()
+    signal = Signal(x_raw=x, y_raw=y[0], x_label="time", y_label="intensity")
+    signal.to_csv(tmp_path / "signal.csv", headers=True)
+    loaded = Signal.from_file(tmp_path / "signal.csv")
+    assert (loaded.x_label, loaded.y_label) == ("time", "intensity")
+    assert np.allclose(loaded.y_raw, y[0])
+
+    array = SignalArray(x_raw=x, time_raw=np.arange(y.shape[0], dtype=float), data_raw=y)
+    array.to_csv(tmp_path / "array.csv", delimiter=";")
+    loaded = SignalArray.from_file(tmp_path / "array.csv")
+    assert np.allclose(loaded.data_raw, y) and np.allclose(loaded.x_raw, x)
+
+    blocks = list(iter_csv_blocks(tmp_path / "array.csv"))
+    assert np.allclose(np.concatenate(blocks)[1:, 1:], y)
+
+
+def test_load_signal_array_directory(tmp_path):
+    import os
+    from chem_analysis.base_obj.signal_ import Signal
+    from chem_analysis.processing.executors import ThreadExecutor, ProcessExecutor
+    from chem_analysis.utils.load_data import load_signal_array
+
+    x, y = generate_signal()
+    for i in (10, 2, 1):  # natural order: 1, 2, 10
+        Signal(x_raw=x, y_raw=y[i % 3]).to_csv(tmp_path / f"run_{i}.csv")
+
+    cwd = os.getcwd()
+    for executor in (None, ThreadExecutor(max_workers=2), ProcessExecutor(max_workers=2)):
+        progress = []
+        array = load_signal_array(tmp_path, "*.csv", executor=executor, progress=lambda *args: progress.append(args))
+        assert np.allclose(array.data_raw, y[[1, 2, 1]])
+        assert progress == [(1, 3), (2, 3), (3, 3)]  # per file
+    assert os.getcwd() == cwd
+
+
+def test_dataset_filter_round_trip(tmp_path):
+    from chem_analysis.base_obj.signal_ import Signal
+    from chem_analysis.base_obj.signal_array import SignalArray
+    import pyarrow.parquet as pq
+    from chem_analysis.utils.dataset_format import load_dataset, read_dataset_table, save_dataset
+
+    x, y = generate_signal()
+    day_1 = SignalArray(x_raw=x, time_raw=np.arange(3, dtype=float), data_raw=y, name="day_1")
+    day_2 = SignalArray(x_raw=x[:500], time_raw=np.arange(10, 13, dtype=float), data_raw=y[:, :500], name="day_2")
+    day_1.to_dataset(tmp_path, rows_per_group=1)
+    day_2.to_dataset(tmp_path)
+    Signal(x_raw=x, y_raw=y[0], name="signal").to_dataset(tmp_path)
+
+    table = read_dataset_table(tmp_path, columns=["name", "time"])  # projection: no data read
+    assert table.column_names == ["name", "time"] and table.num_rows == 7
+
+    loaded = load_dataset(tmp_path, time_range=(1, 10))
+    assert [array.name for array in loaded] == ["day_1", "day_2"]
+    assert np.array_equal(loaded[0].time_raw, [1, 2]) and np.array_equal(loaded[0].data_raw, y[1:])
+    assert np.array_equal(loaded[1].x_raw, x[:500]) and np.array_equal(loaded[1].data_raw, y[:1, :500])
+
+    signal, = load_dataset(tmp_path, names=["signal"])
+    assert isinstance(signal, Signal) and np.array_equal(signal.y_raw, y[0])
+
+    # one file per call; a row group per SignalArray chunk, consecutive Signals share one
+    signals = [Signal(x_raw=x, y_raw=y[i], name=f"signal_{i}") for i in range(3)]
+    uids = save_dataset(tmp_path / "one_call", [day_1, *signals, day_2], rows_per_group=2)
+    file, = (tmp_path / "one_call").glob("*.parquet")
+    assert pq.ParquetFile(file).metadata.num_row_groups == 2 + 2 + 2
+    loaded = load_dataset(tmp_path / "one_call")
+    assert [item.name for item in loaded] == ["day_1", "signal_0", "signal_1", "signal_2", "day_2"]
+    assert np.array_equal(loaded[2].y_raw, y[1]) and np.array_equal(loaded[4].data_raw, y[:, :500])
+    assert read_dataset_table(tmp_path / "one_call", columns=["array"]).column("array").unique().to_pylist() == uids
+
+
+def test_signal_array_append_processes_new_rows():
+    from chem_analysis.base_obj.signal_array import SignalArray
+    from chem_analysis.processing.baselines import Polynomial
+    from chem_analysis.processing.smoothing import SavitzkyGolay, ExponentialTime
+
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 1, 200)
+    data = rng.random((40, 200)) + x
+    time_ = np.arange(40, dtype=float)
+
+    array = SignalArray(x_raw=x, time_raw=time_[:3], data_raw=data[:3])
+    array.processor.add(Polynomial(degree=1), SavitzkyGolay(window_length=7, order=2), ExponentialTime(a=0.7),
+                        SavitzkyGolay(window_length=5, order=2))
+    for i in range(3, 40, 4):
+        array.append(time_[i:i + 4], data[i:i + 4])
+        array.data  # noqa: process the new rows
+
+    expected = SignalArray(x_raw=x, time_raw=time_, data_raw=data)
+    expected.processor = array.processor.get_copy()
+    assert array.number_of_signals == 40
+    assert np.array_equal(array.time, time_)
+    assert np.allclose(array.data, expected.data)
+
+
 def local_run():
     df = pd.DataFrame(data=y.T, index=x)
     df.columns = ["RI", "UV", "LS"]
@@ -0,0 +1,280 @@
+import numpy as np
+from scipy import sparse
+
+import chem_analysis.processing.baselines.whittaker as whittaker
+from chem_analysis.processing.base import Processor
+from chem_analysis.processing.baselines.base import Polynomial
+from chem_analysis.processing.executors import ThreadExecutor, ProcessExecutor
+
+
+def generate_array(n_rows: int = 6, n_points: int = 400) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 1, n_points)
+    time_ = np.arange(n_rows, dtype=float)
+    z = np.empty((n_rows, n_points))
+    for i in range(n_rows):
+        z[i, :] = 3 * x ** 2 + i * 0.1 + 2 * np.exp(-(x - 0.3 - 0.02 * i) ** 2 / 0.001) + \
+                  0.02 * rng.standard_normal(n_points)
+    return x, time_, z
+
+
+def test_whittaker_banded_solve_matches_sparse():
+    _, _, z = generate_array()
+    weights = np.random.default_rng(1).random(z.shape) + 0.1
+    penalty = whittaker.get_penalty_banded(z.shape[1], 1e5, 2)
+
+    result = whittaker.solve_whittaker_array(penalty, weights, weights * z)
+
+    diff_matrix = sparse.diags([1, -2, 1], [0, 1, 2], shape=(z.shape[1] - 2, z.shape[1]))
+    for i in range(z.shape[0]):
+        a = sparse.diags(weights[i]) + 1e5 * diff_matrix.T @ diff_matrix
+        expected = sparse.linalg.spsolve(a.tocsc(), weights[i] * z[i])
+        assert np.allclose(result[i], expected)
+
+
+def test_asymmetric_least_squared_array_matches_rows():
+    x, time_, z = generate_array()
+    method = whittaker.AsymmetricLeastSquared(lambda_=1e5)
+
+    baseline = method.get_baseline_array(x, time_, z)
+
+    for i in range(z.shape[0]):
+        assert np.allclose(baseline[i], method.get_baseline(x, z[i]))
+
+
+def test_penalty_cache_lru_eviction():
+    cache = whittaker.PenaltyCache(max_size=2)
+    first = cache.get(100, 2, 1e5)
+    assert cache.get(100, 2, 1e5) is first
+    cache.get(200, 2, 1e5)
+    cache.get(100, 2, 1e5)  # mark as recently used
+    cache.get(300, 2, 1e5)  # evicts n_points=200
+
+    assert len(cache) == 2
+    assert cache.hits == 2 and cache.misses == 3
+    cache.get(200, 2, 1e5)
+    assert cache.misses == 4
+    assert not first.banded.flags.writeable
+    expected = 1e5 * sparse.diags([1, -2, 1], [0, 1, 2], shape=(98, 100)).T @ \
+        sparse.diags([1, -2, 1], [0, 1, 2], shape=(98, 100))
+    assert np.allclose(first.sparse.toarray(), expected.toarray())
+    assert first.sparse is first.sparse  # built once
+
+
+def test_executors_match_serial():
+    x, time_, z = generate_array(n_rows=9)
+    expected = Processor([Polynomial(degree=2)]).run(x, time_, z.copy())[2]
+
+    for executor in (ThreadExecutor(max_workers=2, chunk_size=2), ProcessExecutor(max_workers=2, chunk_size=4)):
+        method = Polynomial(degree=2)
+        processor = Processor([method], executor=executor)
+        _, time_out, z_out = processor.run(x, time_, z.copy())
+
+        assert np.allclose(z_out, expected)
+        assert np.array_equal(time_out, time_)
+        assert method.y.shape == z.shape
+
+
+def test_executors_map_items_in_order():
+    import functools
+    from chem_analysis.processing.executors import SerialExecutor
+
+    items = list(range(20))
+    for executor in (SerialExecutor(), ThreadExecutor(max_workers=3), ProcessExecutor(max_workers=2)):
+        done = []
+        assert executor.map(functools.partial(pow, 2), items, done.append) == [2 ** i for i in items]
+        assert sorted(done) == list(range(1, 21))
+
+
+def test_executors_split_per_row_parameters():
+    x, time_, z = generate_array(n_rows=9)
+    poly_weights = np.random.default_rng(3).random(z.shape) + 0.1
+    expected = Processor([Polynomial(degree=2, poly_weights=poly_weights)]).run(x, time_, z)[2]
+
+    method = Polynomial(degree=2, poly_weights=poly_weights)
+    z_out = Processor([method], executor=ThreadExecutor(max_workers=4, chunk_size=2)).run(x, time_, z)[2]
+    assert np.allclose(z_out, expected)
+    assert method.poly_weights is poly_weights
+
+
+class CountingPolynomial(Polynomial):
+    def __init__(self, degree: int = 1, weights=None):
+        super().__init__(degree, weights=weights)
+        self._count = 0
+
+    def get_baseline_array(self, x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+        self._count += 1
+        return super().get_baseline_array(x, y, z)
+
+    def get_state(self) -> dict:
+        state = super().get_state()
+        del state["_count"]  # counts calls; not a result
+        return state
+
+
+def test_processor_only_reruns_changed_steps():
+    from chem_analysis.processing.smoothing import Gaussian
+
+    x, time_, z = generate_array()
+    baseline = CountingPolynomial(degree=2)
+    smoothing = Gaussian(sigma=2)
+    processor = Processor([baseline, smoothing])
+
+    _, _, z_out = processor.run(x, time_, z)
+    assert processor.processed
+    z_out[:] = 0  # outputs are writable copies; the cache is not changed
+    assert np.allclose(processor.run(x, time_, z)[2], Processor([Polynomial(degree=2), Gaussian(sigma=2)]).run(
+        x, time_, z)[2])
+    assert baseline._count == 1
+
+    smoothing.sigma = 4
+    assert not processor.processed
+    _, _, z_out = processor.run(x, time_, z)
+    expected = Processor([Polynomial(degree=2), Gaussian(sigma=4)], cache_memory=0).run(x, time_, z)[2]
+    assert np.allclose(z_out, expected)
+    assert baseline._count == 1
+
+    processor.delete(1)
+    processor.run(x, time_, z)
+    assert baseline._count == 1
+
+    baseline.degree = 1
+    processor.run(x, time_, z)
+    assert baseline._count == 2
+
+    processor.processed = False  # raw data may have changed
+    processor.run(x, time_, z)
+    assert baseline._count == 3
+
+
+def test_processor_reruns_changed_penalty_function():
+    from functools import partial
+    from chem_analysis.processing.weigths.weights import Distance
+    from chem_analysis.processing.weigths.penalty_functions import penalty_function_polynomial
+
+    x, time_, z = generate_array()
+    weight = Distance(reference_value=1, penalty_function=partial(penalty_function_polynomial, power=3))
+    baseline = CountingPolynomial(degree=2, weights=weight)
+    processor = Processor([baseline])
+    processor.run(x, time_, z)
+
+    weight.penalty_function = partial(penalty_function_polynomial, power=5)
+    assert not processor.processed
+    processor.run(x, time_, z)
+    assert baseline._count == 2
+
+    weight.penalty_function = lambda x_: x_ ** 2
+    processor.run(x, time_, z)
+    weight.penalty_function = lambda x_: x_ ** 4
+    processor.run(x, time_, z)
+    assert baseline._count == 4
+
+
+def test_fingerprint_cached_until_parameter_set():
+    from chem_analysis.processing.baselines.base import Subtract
+
+    y = np.ones(100)
+    method = Subtract(y=y)
+    key = method.fingerprint()
+    assert method.__dict__["_parameter_hash"] == key
+
+    method.multiplier = 2
+    assert "_parameter_hash" not in method.__dict__ and method.fingerprint() != key
+    method.multiplier = 1
+    assert method.fingerprint() == key
+
+    y[0] = 2  # edit in place: not seen until the parameter is set again
+    assert method.fingerprint() == key
+    method.y_sub = y
+    assert method.fingerprint() != key
+
+
+def test_processor_disk_cache(tmp_path):
+    from chem_analysis.processing.result_cache import ResultCache
+    from chem_analysis.processing.weigths.weights import Distance
+
+    x, time_, z = generate_array()
+    cache = ResultCache(tmp_path, max_size=10 * z.nbytes)
+    expected = Processor([Polynomial(degree=2)]).run(x, time_, z)
+
+    baseline = CountingPolynomial(degree=2)
+    Processor([CountingPolynomial(degree=2)], disk_cache=cache).run(x, time_, z)
+    result = Processor([baseline], disk_cache=cache).run(x, time_, z.copy())  # new run; same content
+    assert baseline._count == 0 and len(cache) == 1
+    assert all(np.array_equal(a, b) for a, b in zip(result, expected))
+    assert np.allclose(baseline.y, z - expected[2])  # state is loaded with the result
+
+    Processor([baseline], disk_cache=cache).run(x, time_, z + 1)  # new raw data
+    Processor([CountingPolynomial(degree=1)], disk_cache=cache).run(x, time_, z)  # new parameters
+    assert baseline._count == 1 and len(cache) == 3
+
+    entry_size = cache.size // 3
+    cache.max_size = int(1.5 * entry_size)
+    cache.evict()
+    assert len(cache) == 1 and cache.size <= cache.max_size
+
+    cache.max_size = int(2.5 * entry_size)  # storing past max_size evicts least recently used entries
+    for i in range(2, 5):
+        Processor([Polynomial(degree=2)], disk_cache=cache).run(x, time_, z + i)
+    assert len(cache) == 2 and cache.size <= cache.max_size
+
+    weight = Distance(reference_value=1, penalty_function=lambda x_: x_ ** 2)
+    Processor([Polynomial(degree=2, weights=weight)], disk_cache=cache).run(x, time_, z)
+    weight = Distance(reference_value=1, penalty_function=lambda x_: x_ ** 4)  # same qualname; new code
+    method = CountingPolynomial(degree=2, weights=weight)
+    Processor([method], disk_cache=cache).run(x, time_, z)
+    assert method._count == 1
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_rolling_window_despike_matches_loop():
+    from chem_analysis.processing.smoothing.despike import RollingWindow
+
+    x, time_, z = generate_array(n_rows=3)
+    rng = np.random.default_rng(2)
+    z[rng.integers(0, z.shape[0], 30), rng.integers(0, z.shape[1], 30)] += 5  # spikes
+    method = RollingWindow(window=15, m=3)
+    window, span = 16, 8
+
+    expected = np.empty_like(z)
+    for row in range(z.shape[0]):
+        for i in range(z.shape[1]):
+            start = min(max(i - span, 0), z.shape[1] - window)
+            expected[row, i] = method.window_calc(z[row, start:start + window], i - start, method.m)
+
+    _, _, z_out = method.run_array(x, time_, z)
+    assert np.allclose(z_out, expected)
+    assert np.allclose(method.run(x, z[0])[1], expected[0])
+    assert method.window == 15
+
+
+def test_method_parameters_round_trip():
+    import json
+    from chem_analysis.processing.base import ProcessingMethod
+    from chem_analysis.processing.baselines.base import SubtractOptimize
+    from chem_analysis.processing.smoothing.smoothing import Gaussian
+    from chem_analysis.processing.weigths.weights import Spans
+
+    x, time_, z = generate_array(n_rows=3)
+    methods = [
+        Polynomial(degree=2, weights=[Spans(x_spans=((0.2, 0.4),), invert=True)]),
+        Gaussian(sigma=3),
+        SubtractOptimize(y=z[0], x=x, bounds=(0, 2)),
+    ]
+    for method in methods:
+        key = method.fingerprint()
+        new = ProcessingMethod.from_dict(json.loads(json.dumps(method.to_dict())))
+        assert type(new) is type(method) and new.fingerprint() == key
+
+        method.run_array(x, time_, z)
+        assert method.fingerprint() == key  # state is not a parameter
+        assert method.get_copy().fingerprint() == key
+
+    copy_ = methods[0].get_copy()
+    assert copy_.y is None and copy_.weights is not methods[0].weights
+
+    processor = Processor(methods)
+    new = processor.get_copy()
+    assert [m.fingerprint() for m in new.methods] == [m.fingerprint() for m in methods]
+    assert np.allclose(new.run(x, time_, z)[2], processor.run(x, time_, z)[2])
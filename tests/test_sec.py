@@ -30,5 +30,49 @@ def main():
     ca_sec.plot(signal)
 
 
+def test_mw_averages_vectorized():
+    from chem_analysis.sec.sec_math_functions import calculate_mw_averages, calculate_Mn_D_from_wi
+
+    mw_i = np.array([0, 1_000, 2_000, 4_000, 0])  # 0: outside calibration
+    wi = np.array([[5, 1, 2, 1, 5], [0, 1, 1, 1, 0]], dtype=float)
+    averages = calculate_mw_averages(mw_i, wi)
+    assert averages.shape == (2,)
+    mw_n = 4 / (1 / 1_000 + 2 / 2_000 + 1 / 4_000)
+    mw_w = (1_000 + 4_000 + 4_000) / 4
+    mw_z = (1_000 ** 2 + 2 * 2_000 ** 2 + 4_000 ** 2) / (mw_w * 4)
+    assert np.allclose([averages[0]["mw_n"], averages[0]["mw_w"], averages[0]["mw_z"], averages[0]["mw_d"]],
+                       [mw_n, mw_w, mw_z, mw_w / mw_n])
+    assert np.allclose(calculate_mw_averages(np.tile(mw_i, (2, 1)), wi).tolist(), averages.tolist())
+    assert np.allclose(calculate_Mn_D_from_wi(mw_i, wi[1]), (averages[1]["mw_n"], averages[1]["mw_d"]))
+
+    calibration = ca_sec.ConventionalCalibration(lambda time_: 10 ** (10 - 0.5 * time_), mw_bounds=(1_000, 1e8))
+    time_ = np.linspace(2, 12, 200)
+    array = ca_sec.SECSignalArray(time_, np.arange(3.), np.exp(-(time_[np.newaxis, :] - [[6], [7], [8]]) ** 2),
+                                  calibration=calibration)
+    mw_n = array.get_mw_averages()["mw_n"]
+    assert mw_n.shape == (3,) and np.all(np.diff(mw_n) < 0)
+
+
+def test_calibration_compile():
+    func = lambda time_: 10 ** (0.0167 * time_ ** 2 - 0.9225 * time_ + 14.087)
+    calibration = ca_sec.ConventionalCalibration(func, mw_bounds=(900, 319_000))
+    assert calibration.x_bounds[0] < calibration.x_bounds[1]
+    assert np.allclose(sorted(func(np.array(calibration.x_bounds))), (900, 319_000))
+
+    time_ = np.linspace(5, 25, 1000)
+    mw_i = calibration.get_y(time_)
+    calibration.compile()
+    mw_i_table = calibration.get_y(time_)
+    assert np.array_equal(mw_i == 0, mw_i_table == 0)
+    assert np.allclose(mw_i_table, mw_i, rtol=1e-8)
+    assert np.allclose(func(calibration.get_x(np.array([1_000, 10_000, 100_000]))), [1_000, 10_000, 100_000])
+
+    expected = mw_i_table.copy()
+    mw_i_table[:] = 0  # results are copies of the cache
+    assert np.array_equal(calibration.get_y(time_), expected)
+    signal = ca_sec.SECSignal(time_, np.ones_like(time_), calibration=calibration)
+    assert np.array_equal(signal.mw_i, expected)
+
+
 if __name__ == "__main__":
     main()